@@ -0,0 +1,64 @@
+import os
+import random
+
+import pytest
+
+from sorter import renamer
+
+pytest.importorskip("pytest_benchmark")
+
+# FILEFLOW_BENCH_NAMES=1000000 reproduces a large migration.
+NAMES = int(os.environ.get("FILEFLOW_BENCH_NAMES", "100000"))
+
+_WORDS = ["invoice", "Report", "final", "draft", "Scan", "holiday", "budget"]
+_UNICODE = ["résumé", "Müller", "café", "日本語", "Ærø", "naïve"]
+
+
+def make_corpus(n, per_dir=200, seed=0):
+    """Return ``(parent, stem)`` pairs shaped like a downloads/photo library.
+
+    Directories hold *per_dir* files each; stems are mostly camera and
+    scanner names, a fifth are words with spaces and punctuation and about
+    one in twenty contains non-ASCII letters.
+    """
+    rng = random.Random(seed)
+    pairs = []
+    for i in range(n):
+        if i % per_dir == 0:
+            parent = f"{rng.choice(_WORDS)} {2000 + rng.randrange(25)}"
+            if rng.random() < 0.05:
+                parent = f"{rng.choice(_UNICODE)} {parent}"
+        roll = rng.random()
+        if roll < 0.05:
+            stem = f"{rng.choice(_UNICODE)} {rng.choice(_WORDS)} {i}"
+        elif roll < 0.25:
+            stem = f"{rng.choice(_WORDS)} {rng.choice(_WORDS)} ({rng.randrange(9)})"
+        elif roll < 0.6:
+            stem = f"IMG_{rng.randrange(10000):04d}"
+        else:
+            stem = f"DSC{i:07d}"
+        pairs.append((parent, stem))
+    return pairs
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return make_corpus(NAMES)
+
+
+def _run(slug, corpus):
+    for parent, stem in corpus:
+        slug(parent)
+        slug(stem)
+
+
+def test_slugify_uncached(benchmark, corpus):
+    benchmark.pedantic(_run, args=(renamer._slugify, corpus), rounds=1)
+
+
+def test_slug_memoised(benchmark, corpus):
+    def run():
+        renamer._slug.cache_clear()
+        _run(renamer._slug, corpus)
+
+    benchmark.pedantic(run, rounds=3)
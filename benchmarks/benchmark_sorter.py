@@ -13,6 +13,21 @@ def setup_tree(tmp_path, n=10_000):
     return base
 
 
+def setup_nested_tree(tmp_path, dirs=100, per_dir=100):
+    base = tmp_path / "nested"
+    for d in range(dirs):
+        sub = base / f"dir_{d % 10}" / f"sub_{d}"
+        sub.mkdir(parents=True, exist_ok=True)
+        for i in range(per_dir):
+            (sub / f"file_{i}.txt").write_bytes(b"x")
+    return base
+
+
 def test_scan_speed(benchmark, tmp_path):
     root = setup_tree(tmp_path)
     benchmark(lambda: scan_paths([root]))
+
+
+def test_scan_nested_speed(benchmark, tmp_path):
+    root = setup_nested_tree(tmp_path)
+    benchmark(lambda: scan_paths([root]))
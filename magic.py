@@ -4,3 +4,8 @@ from __future__ import annotations
 def from_file(path: str, mime: bool = False) -> str:
     """Dummy implementation returning empty string."""
     return ""
+
+
+def from_buffer(buffer: bytes, mime: bool = False) -> str:
+    """Dummy implementation returning empty string."""
+    return ""
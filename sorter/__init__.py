@@ -13,9 +13,19 @@ __version__ = "1.0.0"
 
 _EXPORTS: Dict[str, Tuple[str, str]] = {
     "scan_paths": ("scanner", "scan_paths"),
+    "iter_paths": ("scanner", "iter_paths"),
+    "scan_records": ("scanner", "scan_records"),
+    "iter_records": ("scanner", "iter_records"),
+    "FileRecord": ("scanner", "FileRecord"),
+    "scan_changes": ("scanner", "scan_changes"),
+    "ScanIndex": ("scan_index", "ScanIndex"),
+    "ContentCache": ("cache", "ContentCache"),
+    "LibraryIndex": ("library", "LibraryIndex"),
     "find_duplicates": ("dupes", "find_duplicates"),
+    "iter_duplicate_groups": ("dupes", "iter_duplicate_groups"),
     "classify": ("classifier", "classify"),
     "classify_file": ("classifier", "classify_file"),
+    "CompiledRuleSet": ("classifier", "CompiledRuleSet"),
     "load_config": ("config", "load_config"),
     "get_config": ("config", "get_config"),
     "get_rules": ("config", "get_rules"),
@@ -24,8 +34,11 @@ _EXPORTS: Dict[str, Tuple[str, str]] = {
     "build_report": ("reporter", "build_report"),
     "ReviewQueue": ("review", "ReviewQueue"),
     "generate_name": ("renamer", "generate_name"),
+    "generate_names": ("renamer", "generate_names"),
+    "NameAllocator": ("renamer", "NameAllocator"),
     "Mover": ("mover", "Mover"),
     "move_with_log": ("mover", "move_with_log"),
+    "resume_moves": ("mover", "resume_moves"),
     "plan_moves": ("planner", "plan_moves"),
     "Planner": ("planner", "Planner"),
     "rollback": ("rollback", "rollback"),
@@ -48,8 +61,17 @@ __all__ = list(_EXPORTS)
 
 __all__ = [
     "scan_paths",
+    "iter_paths",
+    "scan_records",
+    "iter_records",
+    "FileRecord",
+    "scan_changes",
+    "ScanIndex",
+    "ContentCache",
+    "LibraryIndex",
     "classify",
     "classify_file",
+    "CompiledRuleSet",
     "load_config",
     "get_config",
     "get_rules",
@@ -58,11 +80,15 @@ __all__ = [
     "build_report",
     "ReviewQueue",
     "generate_name",
+    "generate_names",
+    "NameAllocator",
     "Mover",
     "move_with_log",
+    "resume_moves",
     "plan_moves",
     "Planner",
     "find_duplicates",
+    "iter_duplicate_groups",
     "rollback",
     "build_dashboard",
     "main",
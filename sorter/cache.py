@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Any, Final, Optional, Protocol, Tuple
+
+_DEFAULT_DB_NAME: Final = "cache.db"
+_DEFAULT_MAX_ENTRIES: Final = 200_000
+_BATCH_SIZE: Final = 1_000
+# Files modified this recently may change again within the same mtime tick,
+# so their results are not cached.
+_RACY_NS: Final = 2_000_000_000
+# Recently used entries are not touched again, which keeps repeat runs over
+# a static archive free of writes.
+_TOUCH_AFTER_NS: Final = 86_400 * 1_000_000_000
+_DAY_NS: Final = 86_400 * 1_000_000_000
+
+# table -> (key columns, value column)
+_TABLES: Final = {
+    "mime": (("dev", "ino"), "mime"),
+    "hashes": (("dev", "ino", "algorithm"), "digest"),
+}
+
+_Key = Tuple[Any, ...]
+
+
+class _StatLike(Protocol):
+    @property
+    def st_dev(self) -> int: ...
+
+    @property
+    def st_ino(self) -> int: ...
+
+    @property
+    def st_size(self) -> int: ...
+
+    @property
+    def st_mtime_ns(self) -> int: ...
+
+
+class ContentCache:
+    """Results of content sniffing kept across runs, keyed by inode.
+
+    MIME types and content hashes are stored in separate tables. An entry is
+    only returned while the file's size and mtime match the ones it was
+    stored with. Writes are buffered and flushed in batches; the least
+    recently used entries of a table are evicted once it holds more than
+    *max_entries*.
+    """
+
+    def __init__(
+        self,
+        db_path: pathlib.Path | None = None,
+        *,
+        max_entries: int = _DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        if db_path is None:
+            db_path = pathlib.Path.home() / ".file-sorter" / _DEFAULT_DB_NAME
+        db_path = db_path.expanduser()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending: dict[str, dict[_Key, tuple[int, int, str, int]]] = {
+            table: {} for table in _TABLES
+        }
+        self._touched: dict[str, dict[_Key, int]] = {table: {} for table in _TABLES}
+        self._create_schema()
+
+    def __del__(self) -> None:  # pragma: no cover - destructor
+        try:
+            self.flush()
+            self._conn.close()
+        except Exception:
+            pass
+
+    # ---------- public API ------------
+    def get_mime(self, st: _StatLike) -> Optional[str]:
+        """Return the cached MIME type for the file *st* describes."""
+        return self._get("mime", (st.st_dev, st.st_ino), st)
+
+    def put_mime(self, st: _StatLike, mime: str) -> None:
+        """Remember *mime* for the file *st* describes."""
+        self._put("mime", (st.st_dev, st.st_ino), st, mime)
+
+    def get_hash(self, st: _StatLike, algorithm: str) -> Optional[str]:
+        """Return the cached *algorithm* digest for the file *st* describes."""
+        return self._get("hashes", (st.st_dev, st.st_ino, algorithm), st)
+
+    def put_hash(self, st: _StatLike, algorithm: str, digest: str) -> None:
+        """Remember the *algorithm* *digest* of the file *st* describes."""
+        self._put("hashes", (st.st_dev, st.st_ino, algorithm), st, digest)
+
+    def flush(self) -> None:
+        """Write buffered entries and evict beyond ``max_entries``."""
+        with self._lock:
+            self._flush()
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of entries per table."""
+        with self._lock:
+            self._flush()
+            return {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in _TABLES
+            }
+
+    def prune(
+        self,
+        *,
+        max_entries: int | None = None,
+        unused_days: float | None = None,
+    ) -> int:
+        """Drop entries beyond *max_entries* per table or unused for
+        *unused_days*; return how many were removed."""
+        removed = 0
+        with self._lock:
+            self._flush()
+            with self._conn:
+                for table in _TABLES:
+                    if unused_days is not None:
+                        cutoff = time.time_ns() - int(unused_days * _DAY_NS)
+                        removed += self._conn.execute(
+                            f"DELETE FROM {table} WHERE used_ns < ?", (cutoff,)
+                        ).rowcount
+                    removed += self._evict(table, max_entries)
+            self._conn.execute("VACUUM")
+        return removed
+
+    def __len__(self) -> int:
+        return sum(self.stats().values())
+
+    # ---------- internals ------------
+    def _get(self, table: str, key: _Key, st: _StatLike) -> Optional[str]:
+        keys, value = _TABLES[table]
+        with self._lock:
+            row = self._pending[table].get(key)
+            if row is None:
+                where = " AND ".join(f"{col} = ?" for col in keys)
+                row = self._conn.execute(
+                    f"SELECT size, mtime_ns, {value}, used_ns FROM {table}"
+                    f" WHERE {where}",
+                    key,
+                ).fetchone()
+            if row is None or (row[0], row[1]) != (st.st_size, st.st_mtime_ns):
+                return None
+            now = time.time_ns()
+            if now - row[3] > _TOUCH_AFTER_NS:
+                self._touched[table][key] = now
+                self._flush_if_full()
+            return row[2]
+
+    def _put(self, table: str, key: _Key, st: _StatLike, value: str) -> None:
+        now = time.time_ns()
+        if st.st_mtime_ns > now - _RACY_NS:
+            return
+        with self._lock:
+            self._pending[table][key] = (st.st_size, st.st_mtime_ns, value, now)
+            self._flush_if_full()
+
+    def _flush_if_full(self) -> None:
+        queued = sum(map(len, self._pending.values()))
+        queued += sum(map(len, self._touched.values()))
+        if queued >= _BATCH_SIZE:
+            self._flush()
+
+    def _flush(self) -> None:
+        with self._conn:
+            for table, (keys, value) in _TABLES.items():
+                pending, touched = self._pending[table], self._touched[table]
+                if not pending and not touched:
+                    continue
+                where = " AND ".join(f"{col} = ?" for col in keys)
+                self._conn.executemany(
+                    f"UPDATE {table} SET used_ns = ? WHERE {where}",
+                    [(used, *key) for key, used in touched.items()],
+                )
+                columns = ", ".join((*keys, "size", "mtime_ns", value, "used_ns"))
+                marks = ", ".join("?" * (len(keys) + 4))
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({marks})",
+                    [(*key, *entry) for key, entry in pending.items()],
+                )
+                if pending:
+                    self._evict(table, self.max_entries)
+                pending.clear()
+                touched.clear()
+
+    def _evict(self, table: str, max_entries: int | None) -> int:
+        if max_entries is None:
+            return 0
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        excess = count - max_entries
+        if excess <= 0:
+            return 0
+        return self._conn.execute(
+            f"DELETE FROM {table} WHERE rowid IN"
+            f" (SELECT rowid FROM {table} ORDER BY used_ns LIMIT ?)",
+            (excess,),
+        ).rowcount
+
+    def _create_schema(self) -> None:
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS mime (
+                    dev      INTEGER NOT NULL,
+                    ino      INTEGER NOT NULL,
+                    size     INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    mime     TEXT NOT NULL,
+                    used_ns  INTEGER NOT NULL,
+                    PRIMARY KEY (dev, ino)
+                );
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS hashes (
+                    dev       INTEGER NOT NULL,
+                    ino       INTEGER NOT NULL,
+                    algorithm TEXT NOT NULL,
+                    size      INTEGER NOT NULL,
+                    mtime_ns  INTEGER NOT NULL,
+                    digest    TEXT NOT NULL,
+                    used_ns   INTEGER NOT NULL,
+                    PRIMARY KEY (dev, ino, algorithm)
+                );
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS mime_used ON mime (used_ns)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS hashes_used ON hashes (used_ns)"
+            )
+
+
+__all__ = ["ContentCache"]
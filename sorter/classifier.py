@@ -1,12 +1,12 @@
 from __future__ import annotations
 
 import pathlib
-from typing import Any, Dict, Optional, Union
+import weakref
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple, Union
 
 from pydantic import BaseModel
 
 import logging
-import magic  # python-magic
 
 try:  # optional ML modules
     from . import supervised  # type: ignore
@@ -17,7 +17,9 @@ try:
     from . import clustering  # type: ignore
 except ImportError:  # pragma: no cover - optional dep missing
     clustering = None  # type: ignore
+from .cache import ContentCache
 from .config import Settings
+from .header import FileHeader
 
 log = logging.getLogger(__name__)
 
@@ -25,16 +27,23 @@ log = logging.getLogger(__name__)
 class RuleMatcher:
     """Encapsulates the logic for matching a file against a rule."""
 
-    def __init__(self, file_path: pathlib.Path, rule: Dict[str, Any]):
+    def __init__(
+        self,
+        file_path: pathlib.Path,
+        rule: Dict[str, Any],
+        *,
+        cache: Optional[ContentCache] = None,
+    ):
         self.file_path = file_path
         self.rule = rule
+        self.cache = cache
         self._mime_type: Optional[str] = None
 
     @property
     def mime_type(self) -> str:
         """Lazily compute the MIME type for the file."""
         if self._mime_type is None:
-            self._mime_type = magic.from_file(self.file_path.as_posix(), mime=True)
+            self._mime_type = FileHeader(self.file_path, cache=self.cache).mime_type
         return self._mime_type
 
     def match(self) -> bool:
@@ -54,50 +63,162 @@ class RuleMatcher:
         return self.mime_type in self.rule.get("mimetypes", [])
 
 
+class CompiledRuleSet:
+    """Classification rules indexed for repeated lookups.
+
+    Rules are ranked once by ``priority`` (highest first, ties keep their
+    order). Extensions and MIME types map straight to the best-ranked rule
+    that lists them, so classifying a file costs one dict lookup, plus a
+    libmagic call only when a MIME rule outranks the extension match.
+    MIME types are looked up in *cache* first when one is given.
+    """
+
+    def __init__(
+        self,
+        rules: Mapping[str, Mapping[str, Any]],
+        *,
+        fallback_category: Optional[str] = "Other",
+        cache: Optional[ContentCache] = None,
+    ) -> None:
+        self.fallback_category = fallback_category
+        self.cache = cache
+        ranked = sorted(
+            rules.items(),
+            key=lambda item: item[1].get("priority", 0),
+            reverse=True,
+        )
+        self._by_ext: Dict[str, Tuple[int, str]] = {}
+        self._by_mime: Dict[str, Tuple[int, str]] = {}
+        for rank, (name, rule) in enumerate(ranked):
+            hit = (rank, rule.get("destination", name))
+            for ext in rule.get("extensions", []):
+                self._by_ext.setdefault(ext, hit)
+            for mime in rule.get("mimetypes", []):
+                self._by_mime.setdefault(mime, hit)
+        # Rank of the best rule that needs a MIME type, if any.
+        self._first_mime_rank = min(
+            (rank for rank, _ in self._by_mime.values()), default=None
+        )
+
+    @classmethod
+    def from_settings(cls, config: Settings) -> "CompiledRuleSet":
+        """Compile ``config.classification`` for use with :func:`classify`."""
+        return cls(
+            {
+                k: v.model_dump() if isinstance(v, BaseModel) else v
+                for k, v in config.classification.items()
+            },
+            fallback_category=config.fallback_category,
+            cache=ContentCache() if config.content_cache else None,
+        )
+
+    @property
+    def needs_mime(self) -> bool:
+        """Whether any rule matches on MIME type."""
+        return self._first_mime_rank is not None
+
+    def match(
+        self,
+        path: pathlib.Path,
+        mime_of: Optional[Callable[[pathlib.Path], Optional[str]]] = None,
+    ) -> Optional[str]:
+        """Return the destination of the best rule matching *path*.
+
+        *mime_of* returns the MIME type of a file; it defaults to sniffing
+        the file's header and is only called when a MIME rule could beat the
+        extension match.
+        """
+        hit = self._by_ext.get(path.suffix.lower())
+        if self._first_mime_rank is not None and (
+            hit is None or self._first_mime_rank < hit[0]
+        ):
+            mime = (mime_of or self._mime_type)(path)
+            mime_hit = self._by_mime.get(mime) if mime is not None else None
+            if mime_hit is not None and (hit is None or mime_hit[0] < hit[0]):
+                hit = mime_hit
+        return hit[1] if hit is not None else None
+
+    def _mime_type(self, path: pathlib.Path) -> str:
+        return FileHeader(path, cache=self.cache).mime_type
+
+
 def classify(
     path: pathlib.Path,
-    config: Union[Dict[str, Any], Settings],
+    config: Union[Dict[str, Any], Settings, CompiledRuleSet],
+    *,
+    header: Optional[FileHeader] = None,
 ) -> Optional[str]:
-    """Return category label for *path* based on provided config."""
-    if isinstance(config, Settings):
-        classification_rules = {
-            k: v.model_dump() if isinstance(v, BaseModel) else v
-            for k, v in config.classification.items()
-        }
-        fallback_category = config.fallback_category
+    """Return category label for *path* based on provided config.
+
+    Rules from :class:`Settings` are compiled once per settings object; plain
+    dicts are compiled on every call, so pass a :class:`CompiledRuleSet` when
+    classifying many files with them. Pass a *header* already read for
+    *path* to avoid opening it again.
+    """
+    if isinstance(config, CompiledRuleSet):
+        rule_set = config
+    elif isinstance(config, Settings):
+        rule_set = _rule_set_for(config)
     else:
-        classification_rules = config.get("classification", {})
-        fallback_category = config.get("fallback_category", "Other")
+        # Categories are matched in order; ``priority`` and ``destination``
+        # only apply to :func:`classify_file`.
+        rule_set = CompiledRuleSet(
+            {
+                category: {
+                    "extensions": rules.get("extensions", []),
+                    "mimetypes": rules.get("mimetypes", []),
+                }
+                for category, rules in config.get("classification", {}).items()
+            },
+            fallback_category=config.get("fallback_category", "Other"),
+        )
+
+    header = header or FileHeader(path, cache=rule_set.cache)
 
     # 1. Check for a match in the classification rules (by extension or mimetype)
-    for category, rules in classification_rules.items():
-        if path.suffix.lower() in rules.get("extensions", []):
-            log.debug("extension rule match for %s -> %s", path.name, category)
-            return category
-        if _matches_mimetype(path, rules.get("mimetypes", [])):
-            log.debug("mimetype rule match for %s -> %s", path.name, category)
-            return category
+    category = rule_set.match(path, lambda p: _safe_mime_type(header))
+    if category is not None:
+        log.debug("rule match for %s -> %s", path.name, category)
+        return category
 
     # 2. Fallback to a generic category based on the major mimetype
-    return _get_generic_category(path) or fallback_category
+    return _get_generic_category(header) or rule_set.fallback_category
 
 
-def _matches_mimetype(path: pathlib.Path, mimetypes: list[str]) -> bool:
-    """Check if the file's mimetype is in the provided list."""
-    if not mimetypes:
-        return False
+# id(settings) -> (weak ref to settings, rules compiled from, rule set). The
+# rule set, and the content cache it opens, live as long as the settings.
+_compiled: Dict[
+    int, Tuple["weakref.ref[Settings]", Tuple[Any, ...], CompiledRuleSet]
+] = {}
+
+
+def _rule_set_for(config: Settings) -> CompiledRuleSet:
+    """Return the rule set compiled from *config*, compiling it on first use."""
+    key = id(config)
+    source = (config.classification, config.fallback_category, config.content_cache)
+    entry = _compiled.get(key)
+    if entry is not None and entry[0]() is config:
+        _, compiled_from, rule_set = entry
+        if all(a is b for a, b in zip(compiled_from, source)):
+            return rule_set
+    rule_set = CompiledRuleSet.from_settings(config)
+    ref = weakref.ref(config, lambda _: _compiled.pop(key, None))
+    _compiled[key] = (ref, source, rule_set)
+    return rule_set
+
+
+def _safe_mime_type(header: FileHeader) -> Optional[str]:
     try:
-        mime = magic.from_file(path.as_posix(), mime=True)
-        return mime in mimetypes
+        return header.mime_type
     except OSError as exc:
-        log.warning("Could not determine mimetype for %s: %s", path, exc)
-        return False
+        log.warning("Could not determine mimetype for %s: %s", header.path, exc)
+        return None
 
 
-def _get_generic_category(path: pathlib.Path) -> Optional[str]:
+def _get_generic_category(header: FileHeader) -> Optional[str]:
     """Get a generic category based on the file's major mimetype."""
     try:
-        mime = magic.from_file(path.as_posix(), mime=True)
+        mime = header.mime_type
         major, _, _ = mime.partition("/")
         category = {
             "video": "Videos",
@@ -109,22 +230,24 @@ def _get_generic_category(path: pathlib.Path) -> Optional[str]:
         log.debug("mime %s -> generic category %s", mime, category)
         return category
     except OSError as exc:
-        log.warning("Could not inspect file %s: %s", path, exc)
+        log.warning("Could not inspect file %s: %s", header.path, exc)
         return None
 
 
-def classify_file(file_path: pathlib.Path, rules: Dict[str, Any]) -> Optional[str]:
-    """Classify ``file_path`` using a dictionary of ``rules``."""
-
-    # Sort rules by priority, highest first. Missing priority defaults to 0.
-    sorted_rules = sorted(
-        rules.items(),
-        key=lambda item: item[1].get("priority", 0),
-        reverse=True,
-    )
-
-    for destination, rule_config in sorted_rules:
-        matcher = RuleMatcher(file_path, rule_config)
-        if matcher.match():
-            return rule_config.get("destination", destination)
-    return None
+def classify_file(
+    file_path: pathlib.Path,
+    rules: Union[Dict[str, Any], CompiledRuleSet],
+    *,
+    header: Optional[FileHeader] = None,
+) -> Optional[str]:
+    """Classify ``file_path`` using a dictionary of ``rules``.
+
+    Rules are ranked by ``priority``, highest first. Callers classifying many
+    files should compile the rules once and pass a :class:`CompiledRuleSet`.
+    MIME rules sniff *header* when one is given.
+    """
+    if not isinstance(rules, CompiledRuleSet):
+        rules = CompiledRuleSet(rules)
+    if header is None:
+        return rules.match(file_path)
+    return rules.match(file_path, lambda p: header.mime_type)
@@ -1,3 +1,4 @@
+import json
 import logging
 from pathlib import Path
 from typing import Iterable, Optional
@@ -7,12 +8,18 @@ from typing_extensions import Annotated
 
 from . import __version__
 from .logging_config import setup_logging
-from .scanner import scan_paths
+from .scanner import scan_paths, scan_records, iter_records
 from .reporter import build_report
 from .review import ReviewQueue
-from .mover import move_with_log
+from .cache import ContentCache
+from .library import LibraryIndex
+from .mover import move_with_log, resume_moves
 from .planner import plan_moves, Planner
-from .dupes import find_duplicates, delete_older as _delete_older
+from .dupes import (
+    DupeStats,
+    iter_duplicate_groups,
+    delete_older as _delete_older,
+)
 from .cli_utils import handle_cli_errors
 from .config import Settings, get_config, get_rules
 
@@ -59,6 +66,34 @@ def _main_callback(
 log = logging.getLogger(__name__)
 
 
+def _scan_workers(ctx: typer.Context, override: int | None) -> int:
+    """Return the ``--scan-workers`` value or the configured default."""
+    if override is not None:
+        return override
+    cfg: Settings | None = ctx.obj
+    return cfg.scan_workers if cfg is not None else 1
+
+
+def _plan_workers(cfg: Settings, override: int | None, processes: bool) -> None:
+    """Apply ``--plan-workers`` and ``--plan-processes`` to *cfg*."""
+    if override is not None:
+        cfg.plan_workers = override
+    if processes:
+        cfg.plan_processes = True
+
+
+def _content_cache(cfg: Settings | None, enabled: bool = False) -> ContentCache | None:
+    """Return the shared content cache if ``--cache`` or the config asks for it."""
+    if enabled or (cfg is not None and cfg.content_cache):
+        return ContentCache()
+    return None
+
+
+def _library_index(dest: Path, enabled: bool) -> LibraryIndex | None:
+    """Return the content index of *dest* if ``--library`` asks for it."""
+    return LibraryIndex(dest) if enabled else None
+
+
 # ---------------------------------------------------------------------------
 # Command handlers
 # ---------------------------------------------------------------------------
@@ -69,13 +104,26 @@ log = logging.getLogger(__name__)
 def handle_scan(
     ctx: typer.Context,
     dirs: Annotated[list[Path], typer.Argument()],
+    incremental: Annotated[
+        bool,
+        typer.Option("--incremental", help="reuse listings of unchanged dirs"),
+    ] = False,
+    scan_workers: Annotated[
+        Optional[int],
+        typer.Option("--scan-workers", min=1, help="threads listing directories"),
+    ] = None,
 ) -> None:
     dirs = [p.resolve() for p in dirs]
     for d in dirs:
         if not d.exists():
             raise FileNotFoundError(f"{d} does not exist")
     log.debug("Scanning %d root directories", len(dirs))
-    files = scan_paths(dirs)
+    cfg: Settings | None = ctx.obj
+    files = scan_paths(
+        dirs,
+        workers=_scan_workers(ctx, scan_workers),
+        incremental=incremental or (cfg is not None and cfg.incremental_scan),
+    )
     log.info("%d files found.", len(files))
     if log.isEnabledFor(logging.DEBUG):
         for f in files:
@@ -91,13 +139,28 @@ def handle_report(
     pattern: Annotated[Optional[str], typer.Option("--pattern")] = None,
     auto_open: Annotated[bool, typer.Option("--auto-open")] = False,
     fmt: Annotated[str, typer.Option("--format")] = "xlsx",
+    scan_workers: Annotated[
+        Optional[int],
+        typer.Option("--scan-workers", min=1, help="threads listing directories"),
+    ] = None,
+    plan_workers: Annotated[
+        Optional[int],
+        typer.Option("--plan-workers", min=1, help="workers classifying files"),
+    ] = None,
+    plan_processes: Annotated[
+        bool,
+        typer.Option("--plan-processes", help="classify in processes, not threads"),
+    ] = False,
 ) -> None:
     dirs = [p.resolve() for p in dirs]
     for d in dirs:
         if not d.exists():
             raise FileNotFoundError(f"{d} does not exist")
     base = dest or Path.cwd()
-    mapping = plan_moves(dirs, base, pattern=pattern)
+    cfg: Settings = ctx.obj
+    cfg.scan_workers = _scan_workers(ctx, scan_workers)
+    _plan_workers(cfg, plan_workers, plan_processes)
+    mapping = plan_moves(dirs, base, pattern=pattern, config=cfg, records=True)
     log.info("%d files will be included in the report", len(mapping))
     for src, dst in mapping:
         log.debug("map %s -> %s", src, dst)
@@ -108,17 +171,23 @@ def handle_report(
 @app.command("review")
 @handle_cli_errors
 def handle_review(
-    ctx: typer.Context, dirs: Annotated[list[Path], typer.Argument()]
+    ctx: typer.Context,
+    dirs: Annotated[list[Path], typer.Argument()],
+    scan_workers: Annotated[
+        Optional[int],
+        typer.Option("--scan-workers", min=1, help="threads listing directories"),
+    ] = None,
 ) -> None:
     dirs = [p.resolve() for p in dirs]
     for d in dirs:
         if not d.exists():
             raise FileNotFoundError(f"{d} does not exist")
     log.debug("Updating review queue from %d dirs", len(dirs))
-    files = scan_paths(dirs)
-    log.info("%d files scanned for review", len(files))
     queue = ReviewQueue()
-    queue.upsert_files(files)
+    count = queue.upsert_files(
+        iter_records(dirs, workers=_scan_workers(ctx, scan_workers))
+    )
+    log.info("%d files scanned for review", count)
     due = queue.select_for_review(limit=5)
     if not due:
         log.info("No files pending review.")
@@ -142,17 +211,78 @@ def handle_sort(
         bool,
         typer.Option("--dry-run/--no-dry-run", help="simulate without moving"),
     ] = True,
+    incremental: Annotated[
+        bool,
+        typer.Option("--incremental", help="reuse listings of unchanged dirs"),
+    ] = False,
+    cache: Annotated[
+        bool,
+        typer.Option("--cache", help="reuse MIME types and checksums"),
+    ] = False,
+    scan_workers: Annotated[
+        Optional[int],
+        typer.Option("--scan-workers", min=1, help="threads listing directories"),
+    ] = None,
+    plan_workers: Annotated[
+        Optional[int],
+        typer.Option("--plan-workers", min=1, help="workers classifying files"),
+    ] = None,
+    plan_processes: Annotated[
+        bool,
+        typer.Option("--plan-processes", help="classify in processes, not threads"),
+    ] = False,
+    library: Annotated[
+        bool,
+        typer.Option("--library", help="flag files already stored in --dest"),
+    ] = False,
+    skip_existing: Annotated[
+        bool,
+        typer.Option("--skip-existing", help="leave out files found by --library"),
+    ] = False,
+    hash_renames: Annotated[
+        bool,
+        typer.Option(
+            "--hash-renames/--no-hash-renames",
+            help="checksum files renamed on the same disk for undo",
+        ),
+    ] = True,
+    workers: Annotated[
+        int, typer.Option("--workers", min=1, help="files moved at once")
+    ] = 1,
+    per_source: Annotated[
+        Optional[int],
+        typer.Option("--per-source", min=1, help="max moves reading from one disk"),
+    ] = None,
+    per_dest: Annotated[
+        Optional[int],
+        typer.Option("--per-dest", min=1, help="max moves writing to one disk"),
+    ] = None,
 ) -> None:
     """Sort files using a config and rules file."""
     cfg = get_config(config_file)
     cfg.dry_run = dry_run
+    if scan_workers is not None:
+        cfg.scan_workers = scan_workers
+    _plan_workers(cfg, plan_workers, plan_processes)
+    if incremental:
+        cfg.incremental_scan = True
+    if cache:
+        cfg.content_cache = True
     rules = get_rules(rules_file)
     planner = Planner(rules, cfg)
     dirs = [p.resolve() for p in dirs]
     for d in dirs:
         if not d.exists():
             raise FileNotFoundError(f"{d} does not exist")
-    mapping = planner.plan(dirs, dest, pattern=pattern)
+    library_index = _library_index(dest, library or skip_existing)
+    mapping = planner.plan(
+        dirs,
+        dest,
+        pattern=pattern,
+        records=True,
+        library=library_index,
+        skip_existing=skip_existing,
+    )
     log.info("%d files to process", len(mapping))
     report_path = build_report(mapping, auto_open=False)
     log.info("Report ready: %s", report_path)
@@ -164,7 +294,15 @@ def handle_sort(
         if ans.strip().lower() not in {"y", "yes"}:
             log.info("User cancelled operation.")
             return
-    log_path = move_with_log(mapping)
+    log_path = move_with_log(
+        mapping,
+        cache=_content_cache(cfg),
+        library=library_index,
+        hash_renames=hash_renames,
+        workers=workers,
+        per_source=per_source,
+        per_dest=per_dest,
+    )
     log.info("Move complete. Log available at: %s", log_path)
 
 
@@ -180,16 +318,77 @@ def handle_move(
         bool,
         typer.Option("--dry-run/--no-dry-run", help="simulate without moving"),
     ] = True,
+    incremental: Annotated[
+        bool,
+        typer.Option("--incremental", help="reuse listings of unchanged dirs"),
+    ] = False,
+    cache: Annotated[
+        bool,
+        typer.Option("--cache", help="reuse MIME types and checksums"),
+    ] = False,
+    scan_workers: Annotated[
+        Optional[int],
+        typer.Option("--scan-workers", min=1, help="threads listing directories"),
+    ] = None,
+    plan_workers: Annotated[
+        Optional[int],
+        typer.Option("--plan-workers", min=1, help="workers classifying files"),
+    ] = None,
+    plan_processes: Annotated[
+        bool,
+        typer.Option("--plan-processes", help="classify in processes, not threads"),
+    ] = False,
+    library: Annotated[
+        bool,
+        typer.Option("--library", help="flag files already stored in --dest"),
+    ] = False,
+    skip_existing: Annotated[
+        bool,
+        typer.Option("--skip-existing", help="leave out files found by --library"),
+    ] = False,
+    hash_renames: Annotated[
+        bool,
+        typer.Option(
+            "--hash-renames/--no-hash-renames",
+            help="checksum files renamed on the same disk for undo",
+        ),
+    ] = True,
+    workers: Annotated[
+        int, typer.Option("--workers", min=1, help="files moved at once")
+    ] = 1,
+    per_source: Annotated[
+        Optional[int],
+        typer.Option("--per-source", min=1, help="max moves reading from one disk"),
+    ] = None,
+    per_dest: Annotated[
+        Optional[int],
+        typer.Option("--per-dest", min=1, help="max moves writing to one disk"),
+    ] = None,
 ) -> None:
     cfg: Settings = ctx.obj
     cfg.dry_run = dry_run
+    cfg.scan_workers = _scan_workers(ctx, scan_workers)
+    _plan_workers(cfg, plan_workers, plan_processes)
+    if incremental:
+        cfg.incremental_scan = True
+    if cache:
+        cfg.content_cache = True
     dirs = [p.resolve() for p in dirs]
     for d in dirs:
         if not d.exists():
             raise FileNotFoundError(f"{d} does not exist")
     try:
         log.debug("Beginning move operation into %s", dest)
-        mapping = plan_moves(dirs, dest, pattern=pattern, config=cfg)
+        library_index = _library_index(dest, library or skip_existing)
+        mapping = plan_moves(
+            dirs,
+            dest,
+            pattern=pattern,
+            config=cfg,
+            records=True,
+            library=library_index,
+            skip_existing=skip_existing,
+        )
         log.info("%d files to process", len(mapping))
         for src, dst in mapping:
             log.debug("plan move %s -> %s", src, dst)
@@ -203,7 +402,15 @@ def handle_move(
             if ans.strip().lower() not in {"y", "yes"}:
                 log.info("User cancelled operation.")
                 return
-        log_path = move_with_log(mapping)
+        log_path = move_with_log(
+            mapping,
+            cache=_content_cache(cfg),
+            library=library_index,
+            hash_renames=hash_renames,
+            workers=workers,
+            per_source=per_source,
+            per_dest=per_dest,
+        )
         log.info("Move complete. Log available at: %s", log_path)
         if log.isEnabledFor(logging.DEBUG):
             for src, dst in mapping:
@@ -213,44 +420,206 @@ def handle_move(
         raise
 
 
+@app.command("watch")
+@handle_cli_errors
+def handle_watch(
+    ctx: typer.Context,
+    dirs: Annotated[list[Path], typer.Argument()],
+    dest: Annotated[Path, typer.Option("--dest")],
+    pattern: Annotated[Optional[str], typer.Option("--pattern")] = None,
+    debounce: Annotated[
+        float, typer.Option("--debounce", help="seconds a file must stay unchanged")
+    ] = 2.0,
+    poll: Annotated[
+        bool, typer.Option("--poll", help="poll directory mtimes instead of inotify")
+    ] = False,
+    interval: Annotated[
+        float, typer.Option("--interval", help="seconds between polls")
+    ] = 1.0,
+    log_dir: Annotated[Optional[Path], typer.Option("--log-dir")] = None,
+) -> None:
+    """Sort files into DEST as soon as they appear in DIRS."""
+    from .watcher import Watcher, make_backend
+
+    cfg: Settings = ctx.obj
+    dirs = [p.resolve() for p in dirs]
+    for d in dirs:
+        if not d.exists():
+            raise FileNotFoundError(f"{d} does not exist")
+    watcher = Watcher(
+        dirs,
+        dest,
+        Planner.from_settings(cfg),
+        pattern=pattern,
+        debounce=debounce,
+        log_dir=log_dir,
+        backend=make_backend(dirs, polling=poll),
+    )
+    try:
+        watcher.run(timeout=interval)
+    except KeyboardInterrupt:
+        log.info("Watcher stopped.")
+
+
 @app.command("undo")
 @handle_cli_errors
 def handle_undo(
     ctx: typer.Context,
     log_file: Annotated[Path, typer.Argument()],
+    cache: Annotated[
+        bool,
+        typer.Option("--cache", help="reuse checksums of unchanged files"),
+    ] = False,
 ) -> None:
     log.debug("Rolling back moves using log %s", log_file)
     from .rollback import rollback as _rollback
 
-    _rollback(log_file)
+    _rollback(log_file, cache=_content_cache(ctx.obj, cache))
     log.info("Rollback complete.")
 
 
+@app.command("resume")
+@handle_cli_errors
+def handle_resume(
+    ctx: typer.Context,
+    log_file: Annotated[Path, typer.Argument()],
+    cache: Annotated[
+        bool,
+        typer.Option("--cache", help="reuse checksums of unchanged files"),
+    ] = False,
+    hash_renames: Annotated[
+        bool,
+        typer.Option(
+            "--hash-renames/--no-hash-renames",
+            help="checksum files renamed on the same disk for undo",
+        ),
+    ] = True,
+    workers: Annotated[
+        int, typer.Option("--workers", min=1, help="files moved at once")
+    ] = 1,
+    per_source: Annotated[
+        Optional[int],
+        typer.Option("--per-source", min=1, help="max moves reading from one disk"),
+    ] = None,
+    per_dest: Annotated[
+        Optional[int],
+        typer.Option("--per-dest", min=1, help="max moves writing to one disk"),
+    ] = None,
+) -> None:
+    """Finish an interrupted move from its log."""
+    log.debug("Resuming moves recorded in %s", log_file)
+    log_path = resume_moves(
+        log_file,
+        cache=_content_cache(ctx.obj, cache),
+        hash_renames=hash_renames,
+        workers=workers,
+        per_source=per_source,
+        per_dest=per_dest,
+    )
+    log.info("Move complete. Log available at: %s", log_path)
+
+
 @app.command("dupes")
 @handle_cli_errors
 def handle_dupes(
     ctx: typer.Context,
     dirs: Annotated[list[Path], typer.Argument()],
     delete_older: Annotated[bool, typer.Option("--delete-older")] = False,
-    hardlink: Annotated[bool, typer.Option("--hardlink")] = False,
+    hardlink: Annotated[
+        bool, typer.Option("--hardlink", help="replace copies with hardlinks")
+    ] = False,
+    reflink: Annotated[
+        bool,
+        typer.Option("--reflink", help="replace copies with CoW clones if possible"),
+    ] = False,
     algorithm: Annotated[str, typer.Option("--algorithm")] = "sha256",
+    scan_workers: Annotated[
+        Optional[int],
+        typer.Option("--scan-workers", min=1, help="threads listing directories"),
+    ] = None,
+    workers: Annotated[
+        int, typer.Option("--workers", min=1, help="threads hashing files")
+    ] = 1,
+    per_device: Annotated[
+        bool,
+        typer.Option("--per-device", help="one pool of --workers per disk"),
+    ] = False,
+    cache: Annotated[
+        bool,
+        typer.Option("--cache", help="reuse checksums of unchanged files"),
+    ] = False,
+    stages: Annotated[
+        int,
+        typer.Option(
+            "--stages", min=0, help="sampling rounds before hashing large files"
+        ),
+    ] = 0,
+    similar_images: Annotated[
+        bool,
+        typer.Option("--similar-images", help="find resized or re-encoded images"),
+    ] = False,
+    threshold: Annotated[
+        int,
+        typer.Option(
+            "--threshold", min=0, max=64, help="max differing bits for --similar-images"
+        ),
+    ] = 6,
+    json_lines: Annotated[
+        bool,
+        typer.Option("--json-lines", help="print each group as a JSON line"),
+    ] = False,
 ) -> None:
+    if delete_older and (hardlink or reflink):
+        raise ValueError("--delete-older cannot be combined with --hardlink/--reflink")
+    if similar_images and (delete_older or hardlink or reflink):
+        raise ValueError("--similar-images only reports; similar is not identical")
     dirs = [p.resolve() for p in dirs]
     for d in dirs:
         if not d.exists():
             raise FileNotFoundError(f"{d} does not exist")
+    # With --json-lines stdout carries nothing but the groups.
+    report = log.debug if json_lines else log.info
     log.debug("Scanning for duplicates in %d dirs", len(dirs))
-    files = scan_paths(dirs)
-    log.info(
-        "Scanning %d files for duplicates using %s",
-        len(files),
-        algorithm,
-    )
-    groups = find_duplicates(files, algorithm=algorithm)
-    if not groups:
-        log.info("No duplicates detected.")
+    report("Scanning for duplicates using %s", algorithm)
+    files = iter_records(dirs, workers=_scan_workers(ctx, scan_workers))
+    content_cache = _content_cache(ctx.obj, cache)
+    if similar_images:
+        from .similar import find_similar_images
+
+        similar = find_similar_images(
+            files, threshold=threshold, workers=workers, cache=content_cache
+        )
+        if not similar:
+            report("No similar images detected.")
+        for paths in similar:
+            if json_lines:
+                typer.echo(json.dumps({"similar": [str(p) for p in paths]}))
+                continue
+            log.info("Found %d similar images:", len(paths))
+            for p in paths:
+                log.info("  • %s", p)
         return
-    for digest, paths in groups.items():
+    stats = DupeStats()
+    groups: dict[str, list[Path]] = {}
+    for digest, paths in iter_duplicate_groups(
+        files,
+        algorithm=algorithm,
+        stats=stats,
+        workers=workers,
+        per_device=per_device,
+        cache=content_cache,
+        stages=stages,
+    ):
+        if delete_older or hardlink or reflink:
+            groups[digest] = paths
+        if json_lines:
+            try:
+                size: int | None = paths[0].stat().st_size
+            except OSError:
+                size = None
+            record = {"digest": digest, "size": size, "paths": [str(p) for p in paths]}
+            typer.echo(json.dumps(record))
+            continue
         log.info(
             "Found group with hash %s containing %d files:",
             digest[:10],
@@ -259,14 +628,35 @@ def handle_dupes(
         log.debug("paths: %s", ", ".join(str(p) for p in paths))
         for p in paths:
             log.info("  • %s", p)
+    log.debug(
+        "%d files: %d unique size, %d unique quick hash, %d unique samples,"
+        " %d unique full hash",
+        stats.files,
+        stats.unique_size,
+        stats.unique_quick,
+        stats.unique_sampled,
+        stats.unique_full,
+    )
+    if not stats.duplicates:
+        report("No duplicates detected.")
+        return
     if delete_older:
         confirm = input("Delete older copies? [y/N]: ")
         if confirm.strip().lower() in {"y", "yes"}:
             for paths in groups.values():
                 for removed in _delete_older(paths):
                     log.info("- deleted %s", removed)
-    if hardlink and not delete_older:
-        log.warning("⚠️  hardlink requires delete_older to leave single copy.")
+    if hardlink or reflink:
+        confirm = input("Replace duplicates with links? [y/N]: ")
+        if confirm.strip().lower() in {"y", "yes"}:
+            from .dedupe import link_duplicates
+
+            log_path = link_duplicates(
+                groups.values(),
+                mode="reflink" if reflink else "hardlink",
+                cache=content_cache,
+            )
+            log.info("Deduplication complete. Log available at: %s", log_path)
 
 
 @app.command("schedule")
@@ -315,7 +705,7 @@ def handle_learn_clusters(
     from . import clustering
     import shutil
 
-    files = scan_paths([source_dir])
+    files = scan_records([source_dir])
     clustered_df = clustering.train_cluster_model(files)
     if clustered_df is None:
         return
@@ -340,6 +730,63 @@ def handle_train(
     supervised.train_supervised_model(logs_dir)
 
 
+cache_app = typer.Typer(help="Inspect or trim the MIME type and checksum cache.")
+app.add_typer(cache_app, name="cache")
+
+
+@cache_app.command("stats")
+@handle_cli_errors
+def handle_cache_stats(ctx: typer.Context) -> None:
+    """Show how many entries the cache holds."""
+    cache = ContentCache()
+    for table, count in cache.stats().items():
+        log.info("%s: %d entries", table, count)
+    log.info("Database: %s", cache.db_path)
+
+
+@cache_app.command("prune")
+@handle_cli_errors
+def handle_cache_prune(
+    ctx: typer.Context,
+    max_entries: Annotated[
+        Optional[int],
+        typer.Option("--max-entries", min=0, help="keep at most N per table"),
+    ] = None,
+    unused_days: Annotated[
+        Optional[float],
+        typer.Option("--unused-days", min=0, help="drop entries unused for N days"),
+    ] = None,
+) -> None:
+    """Remove cache entries beyond --max-entries or unused for --unused-days."""
+    if max_entries is None and unused_days is None:
+        raise ValueError("give --max-entries and/or --unused-days")
+    removed = ContentCache().prune(max_entries=max_entries, unused_days=unused_days)
+    log.info("Removed %d cache entries.", removed)
+
+
+library_app = typer.Typer(help="Maintain the content index of a destination.")
+app.add_typer(library_app, name="library")
+
+
+@library_app.command("index")
+@handle_cli_errors
+def handle_library_index(
+    ctx: typer.Context,
+    dest: Annotated[Path, typer.Argument()],
+    cache: Annotated[
+        bool,
+        typer.Option("--cache", help="reuse checksums of unchanged files"),
+    ] = False,
+) -> None:
+    """Index files already stored in *dest* for ``--library``."""
+    dest = dest.resolve()
+    if not dest.exists():
+        raise FileNotFoundError(f"{dest} does not exist")
+    index = LibraryIndex(dest)
+    indexed, removed = index.update(cache=_content_cache(ctx.obj, cache))
+    log.info("Indexed %d files, forgot %d; %d in total.", indexed, removed, len(index))
+
+
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
@@ -6,6 +6,7 @@ from sklearn.metrics import silhouette_score
 from sklearn.pipeline import Pipeline
 
 from .ml_features import extract_raw_features, create_feature_pipeline
+from .scanner import FileRecord
 
 log = logging.getLogger(__name__)
 
@@ -13,7 +14,7 @@ MODEL_PATH = pathlib.Path.home() / ".file-sorter" / "cluster_model.joblib"
 LABELS_PATH = pathlib.Path.home() / ".file-sorter" / "cluster_labels.json"
 
 
-def train_cluster_model(file_paths: list[pathlib.Path]):
+def train_cluster_model(file_paths: list[pathlib.Path] | list[FileRecord]):
     """Train a K-Means clustering model and save it."""
     log.info("Extracting features from files...")
     df = extract_raw_features(file_paths)
@@ -55,6 +55,11 @@ class Settings(BaseSettings):
 
     fallback_category: Optional[str] = "Other"
     dry_run: bool = False
+    scan_workers: int = Field(default=1, ge=1)
+    incremental_scan: bool = False
+    plan_workers: int = Field(default=1, ge=1)
+    plan_processes: bool = False
+    content_cache: bool = False
     classification: dict[str, ClassificationRule] = Field(default_factory=dict)
     plugins: dict[str, PluginConfig] = Field(default_factory=dict)
 
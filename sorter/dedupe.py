@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import errno
+import json
+import logging
+import os
+import pathlib
+import shutil
+import stat
+import sys
+import time
+from typing import TYPE_CHECKING, Final, Iterable, Literal, Sequence
+
+from .journal import fsync_dir
+from .utils import sha256sum
+
+if TYPE_CHECKING:  # pragma: no cover - imports for type hints only
+    from .cache import ContentCache
+
+log = logging.getLogger(__name__)
+
+LinkMode = Literal["hardlink", "reflink"]
+
+# ioctl(2) request from <linux/fs.h>: _IOW(0x94, 9, int)
+_FICLONE: Final = 0x40049409
+# errors meaning "this filesystem cannot clone", not "this file is broken"
+_NO_CLONE: Final = {
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EINVAL,
+    errno.EXDEV,
+    errno.ENOSYS,
+}
+_TMP_SUFFIX: Final = ".file-sorter-link"
+
+
+def _reflink(src: pathlib.Path, dst: pathlib.Path) -> None:
+    """Create *dst* as a copy-on-write clone of *src* (Linux ``FICLONE``)."""
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflinks need Linux", str(dst))
+    import fcntl
+
+    with src.open("rb") as sfp:
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            fcntl.ioctl(fd, _FICLONE, sfp.fileno())
+        except OSError:
+            os.close(fd)
+            dst.unlink()
+            raise
+        os.close(fd)
+
+
+def _temp_name(path: pathlib.Path) -> pathlib.Path:
+    return path.with_name(f".{path.name}.{os.getpid()}{_TMP_SUFFIX}")
+
+
+def _link_one(keeper: pathlib.Path, dup: pathlib.Path, mode: LinkMode) -> LinkMode:
+    """Build the replacement for *dup* next to it and return the method used."""
+    tmp = _temp_name(dup)
+    tmp.unlink(missing_ok=True)  # left over from an interrupted run
+    if mode == "reflink":
+        try:
+            _reflink(keeper, tmp)
+        except OSError as exc:
+            if exc.errno not in _NO_CLONE:
+                raise
+            log.debug("reflink unsupported for %s (%s); hardlinking", dup, exc)
+        else:
+            # A clone is a separate inode; keep the duplicate's metadata.
+            shutil.copystat(dup, tmp)
+            return "reflink"
+    os.link(keeper, tmp)
+    return "hardlink"
+
+
+def link_duplicates(
+    groups: Iterable[Sequence[pathlib.Path]],
+    *,
+    mode: LinkMode = "hardlink",
+    log_path: pathlib.Path | None = None,
+    cache: ContentCache | None = None,
+) -> pathlib.Path:
+    """Replace every duplicate in *groups* with a link to one kept copy.
+
+    The first path of each group (in sorted order) is kept. With
+    ``mode="reflink"`` duplicates become copy-on-write clones where the
+    filesystem supports ``FICLONE`` and hardlinks elsewhere. Each
+    replacement is built under a temporary name and renamed over the
+    duplicate, so a crash never leaves a path missing. Files that already
+    share the keeper's inode or live on another device are skipped, and
+    both copies are re-hashed first so a file changed since the scan is left
+    alone. Every replacement is journaled to *log_path* before it happens;
+    :func:`sorter.rollback.rollback` turns hardlinks back into independent
+    files.
+    """
+    if log_path is None:
+        log_path = pathlib.Path.cwd() / f"file-dedupe-log_{int(time.time())}.jsonl"
+    log_path = log_path.expanduser().resolve()
+
+    with log_path.open("w", encoding="utf-8") as logfp:
+        fsync_dir(log_path.parent)
+        for group in groups:
+            keeper, *dups = sorted(group)
+            keeper_st = keeper.stat()
+            keeper_sum: str | None = None
+            for dup in dups:
+                dup_st = dup.lstat()
+                if (dup_st.st_dev, dup_st.st_ino) == (
+                    keeper_st.st_dev,
+                    keeper_st.st_ino,
+                ):
+                    log.debug("%s already linked to %s", dup, keeper)
+                    continue
+                if not stat.S_ISREG(dup_st.st_mode):
+                    continue
+                if dup_st.st_dev != keeper_st.st_dev:
+                    log.warning("%s is on another device than %s; skipped", dup, keeper)
+                    continue
+                if keeper_sum is None:
+                    keeper_sum = sha256sum(keeper, cache=cache)
+                if sha256sum(dup, cache=cache) != keeper_sum:
+                    log.warning("%s changed since it was scanned; skipped", dup)
+                    continue
+                used = _link_one(keeper, dup, mode)
+                logfp.write(
+                    json.dumps(
+                        {
+                            "op": used,
+                            "src": keeper.as_posix(),
+                            "dst": dup.as_posix(),
+                            "sha256": keeper_sum,
+                            "size": dup_st.st_size,
+                            "mode": dup_st.st_mode & 0o7777,
+                            "uid": dup_st.st_uid,
+                            "gid": dup_st.st_gid,
+                            "mtime_ns": dup_st.st_mtime_ns,
+                            "epoch": int(time.time()),
+                        }
+                    )
+                    + "\n"
+                )
+                # The record must be on disk before the duplicate is
+                # replaced, or a crash could leave a link nothing can undo.
+                logfp.flush()
+                os.fsync(logfp.fileno())
+                try:
+                    os.replace(_temp_name(dup), dup)
+                except OSError:
+                    _temp_name(dup).unlink(missing_ok=True)
+                    raise
+                log.info("%s %s -> %s", used, dup, keeper)
+    if cache is not None:
+        cache.flush()
+    log.info("log file written to %s", log_path)
+    return log_path
+
+
+def unlink_copy(
+    path: pathlib.Path,
+    *,
+    mode: int,
+    mtime_ns: int,
+    uid: int | None = None,
+    gid: int | None = None,
+) -> None:
+    """Give *path* its own copy of its data and restore *mode* and *mtime_ns*.
+
+    Used to undo a hardlink; the copy replaces *path* atomically. The owner
+    is restored to *uid* and *gid* when given and permitted.
+    """
+    tmp = _temp_name(path)
+    shutil.copyfile(path, tmp)
+    if uid is not None and gid is not None:
+        try:
+            os.chown(tmp, uid, gid)
+        except PermissionError:
+            log.debug("cannot restore owner of %s", path)
+    os.chmod(tmp, mode)
+    os.utime(tmp, ns=(mtime_ns, mtime_ns))
+    os.replace(tmp, path)
+
+
+__all__ = ["link_duplicates", "unlink_copy", "LinkMode"]
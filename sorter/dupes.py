@@ -2,17 +2,40 @@ from __future__ import annotations
 
 import hashlib
 import pathlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from io import SEEK_END
 from collections import defaultdict
-from typing import Iterable, Sequence, Dict, List
+from typing import (
+    Callable,
+    Final,
+    Hashable,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Dict,
+    List,
+    Tuple,
+    Union,
+)
 
-from .utils import hash_file
+from .cache import ContentCache
+from .header import HEADER_SIZE
+from .scanner import FileRecord
+from .utils import BUF_SIZE, hash_file
+
+DEFAULT_MAX_INFLIGHT: Final = 64 * 1024 * 1024  # 64 MiB
+DEFAULT_STAGE_SAMPLES: Final = 8
+DEFAULT_STAGE_BLOCK: Final = 1024 * 1024  # 1 MiB
+DEFAULT_STAGE_GROWTH: Final = 4
+DEFAULT_BATCH_SIZE: Final = 256
 
 
 def _quick_hash(
     path: pathlib.Path,
     /,
-    sample: int = 64 * 1024,
+    sample: int = HEADER_SIZE,
     *,
     algorithm: str = "sha256",
 ) -> str:
@@ -27,32 +50,361 @@ def _quick_hash(
     return h.hexdigest()
 
 
-def _full_hash(path: pathlib.Path, *, algorithm: str = "sha256") -> str:
-    return hash_file(path, algorithm=algorithm)
+def _sample_hash(
+    path: pathlib.Path,
+    size: int,
+    count: int,
+    block: int,
+    *,
+    algorithm: str = "sha256",
+) -> str:
+    """Return *algorithm* hash of *count* evenly spaced *block*-byte samples.
+
+    Samples sit strictly between the head and the tail, which
+    :func:`_quick_hash` already covers.
+    """
+    h = hashlib.new(algorithm)
+    with path.open("rb") as fp:
+        for i in range(1, count + 1):
+            fp.seek((size - block) * i // (count + 1))
+            h.update(fp.read(block))
+    return h.hexdigest()
+
+
+def _full_hash(
+    path: pathlib.Path,
+    *,
+    algorithm: str = "sha256",
+    cache: Optional[ContentCache] = None,
+) -> str:
+    return hash_file(path, algorithm=algorithm, cache=cache)
 
 
-def find_duplicates(
-    files: Iterable[pathlib.Path],
+class DupeStats:
+    """How many files each stage of :func:`find_duplicates` ruled out."""
+
+    def __init__(self) -> None:
+        self.files = 0
+        self.unique_size = 0
+        self.unique_quick = 0
+        self.unique_sampled = 0
+        self.unique_full = 0
+        self.duplicates = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"DupeStats(files={self.files}, unique_size={self.unique_size},"
+            f" unique_quick={self.unique_quick},"
+            f" unique_sampled={self.unique_sampled},"
+            f" unique_full={self.unique_full}, duplicates={self.duplicates})"
+        )
+
+
+class _ByteBudget:
+    """Counting semaphore over bytes; a single request may exceed the cap."""
+
+    def __init__(self, limit: int) -> None:
+        self._limit = limit
+        self._used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, n: int) -> None:
+        with self._cond:
+            while self._used and self._used + n > self._limit:
+                self._cond.wait()
+            self._used += n
+
+    def release(self, n: int) -> None:
+        with self._cond:
+            self._used -= n
+            self._cond.notify_all()
+
+
+# (path, st_dev, size)
+_Entry = Tuple[pathlib.Path, int, int]
+
+
+class _Hasher:
+    """Run hash jobs serially or on thread pools under a byte budget.
+
+    hashlib releases the GIL while digesting large buffers, so threads keep
+    several disks or a fast SSD busy. With *per_device* every ``st_dev`` gets
+    its own pool of *workers* threads; a pool of one reads a spinning disk
+    sequentially while other devices are hashed in parallel.
+    """
+
+    def __init__(self, workers: int, max_inflight: int, per_device: bool) -> None:
+        self.workers = workers
+        self.per_device = per_device
+        self._budget = _ByteBudget(max_inflight)
+        self._pools: Dict[Hashable, ThreadPoolExecutor] = {}
+
+    @property
+    def serial(self) -> bool:
+        return self.workers == 1 and not self.per_device
+
+    def map(
+        self, fn: Callable[[_Entry], str], entries: List[_Entry], chunk: int
+    ) -> List[str]:
+        """Return ``fn(entry)`` for every entry, in order.
+
+        Each job holds at most *chunk* bytes of its file in memory; jobs are
+        only submitted while their buffers fit in the in-flight budget.
+        """
+        if self.serial:
+            return [fn(entry) for entry in entries]
+        futures: List[Future[str]] = []
+        for entry in entries:
+            _, dev, size = entry
+            cost = min(size, chunk)
+            self._budget.acquire(cost)
+            pool = self._pool(dev if self.per_device else None)
+            futures.append(pool.submit(self._run, fn, entry, cost))
+        return [f.result() for f in futures]
+
+    def close(self) -> None:
+        for pool in self._pools.values():
+            pool.shutdown()
+        self._pools.clear()
+
+    def _run(self, fn: Callable[[_Entry], str], entry: _Entry, cost: int) -> str:
+        try:
+            return fn(entry)
+        finally:
+            self._budget.release(cost)
+
+    def _pool(self, key: Hashable) -> ThreadPoolExecutor:
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="file-sorter-hash"
+            )
+        return pool
+
+
+_Group = Tuple[str, List[_Entry]]
+
+
+def _count(groups: List[_Group]) -> int:
+    return sum(len(entries) for _, entries in groups)
+
+
+def _split(
+    hasher: _Hasher,
+    groups: List[_Group],
+    fn: Callable[[_Entry], str],
+    chunk: int,
+    algorithm: Optional[str],
+) -> List[_Group]:
+    """Hash every entry of *groups* and split each group by digest.
+
+    Groups left with a single file are dropped. The new key chains the old
+    key and the digest with *algorithm*, so groups split from different
+    parents cannot collide; with ``None`` the digest itself is the key.
+    """
+    flat = [entry for _, entries in groups for entry in entries]
+    digests = iter(hasher.map(fn, flat, chunk))
+    out: List[_Group] = []
+    for key, entries in groups:
+        split: Dict[str, List[_Entry]] = {}
+        for entry in entries:
+            split.setdefault(next(digests), []).append(entry)
+        for digest, same in split.items():
+            if len(same) < 2:
+                continue
+            if algorithm is not None and key:
+                digest = hashlib.new(algorithm, f"{key}:{digest}".encode()).hexdigest()
+            out.append((digest, same))
+    return out
+
+
+def _confirm(
+    hasher: _Hasher,
+    candidates: List[List[_Entry]],
+    stats: DupeStats,
+    *,
+    validate_full: bool,
+    algorithm: str,
+    cache: Optional[ContentCache],
+    stages: int,
+    stage_samples: int,
+    stage_block: int,
+    stage_growth: int,
+) -> List[_Group]:
+    """Run size buckets *candidates* through every hashing stage."""
+    # Each stage hashes every candidate of the batch at once so the pools
+    # stay busy, then splits each group by digest.
+    groups = _split(
+        hasher,
+        [("", group) for group in candidates],
+        lambda e: _quick_hash(e[0], algorithm=algorithm),
+        HEADER_SIZE,
+        algorithm,
+    )
+    stats.unique_quick += sum(map(len, candidates)) - _count(groups)
+
+    for stage in range(stages):
+        block = stage_block * stage_growth**stage
+        # Files this small are cheaper to hash in full than to sample.
+        sampled = [g for g in groups if g[1][0][2] > 2 * stage_samples * block]
+        if not sampled:
+            break
+        rest = [g for g in groups if g[1][0][2] <= 2 * stage_samples * block]
+        kept = _split(
+            hasher,
+            sampled,
+            lambda e: _sample_hash(
+                e[0], e[2], stage_samples, block, algorithm=algorithm
+            ),
+            block,
+            algorithm,
+        )
+        stats.unique_sampled += _count(sampled) - _count(kept)
+        groups = kept + rest
+
+    if validate_full:
+        kept = _split(
+            hasher,
+            groups,
+            lambda e: _full_hash(e[0], algorithm=algorithm, cache=cache),
+            BUF_SIZE,
+            None,
+        )
+        stats.unique_full += _count(groups) - _count(kept)
+        groups = kept
+    return groups
+
+
+def iter_duplicate_groups(
+    files: Iterable[Union[pathlib.Path, FileRecord]],
     *,
     validate_full: bool = True,
     algorithm: str = "sha256",
-) -> Dict[str, List[pathlib.Path]]:
-    """Group *files* by identical content using *algorithm* hash."""
-    quick: Dict[str, List[pathlib.Path]] = defaultdict(list)
+    stats: Optional[DupeStats] = None,
+    workers: int = 1,
+    max_inflight: int = DEFAULT_MAX_INFLIGHT,
+    per_device: bool = False,
+    cache: Optional[ContentCache] = None,
+    stages: int = 0,
+    stage_samples: int = DEFAULT_STAGE_SAMPLES,
+    stage_block: int = DEFAULT_STAGE_BLOCK,
+    stage_growth: int = DEFAULT_STAGE_GROWTH,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[Tuple[str, List[pathlib.Path]]]:
+    """Yield ``(digest, paths)`` for each group of identical files in *files*.
+
+    Files are bucketed by size first; only sizes shared by several files are
+    quick-hashed, and only matching quick hashes are hashed in full. Sizes
+    are taken from :class:`FileRecord` items without another ``stat``. Pass
+    *stats* to learn how many files each stage eliminated; its counters grow
+    as groups are yielded.
+
+    Every file has to be listed before hashing starts, since any later file
+    could join a size bucket. Buckets are then hashed in batches of about
+    *batch_size* files (keep it well above *workers*), and each confirmed
+    group is yielded as soon as its batch has been fully hashed, so results
+    arrive long before a large tree is done.
+
+    Hashing runs on *workers* threads (per device with *per_device*) while
+    read buffers stay below *max_inflight* bytes. Results do not depend on
+    the number of workers. Full hashes are looked up in and added to
+    *cache* when one is given.
+
+    With *stages*, groups of large files go through that many sampling
+    rounds before the full hash: round ``k`` hashes *stage_samples* evenly
+    spaced blocks of ``stage_block * stage_growth**k`` bytes and splits
+    groups whose samples differ. Files that differ are usually ruled out
+    after a few megabytes instead of a full read. A round is skipped for
+    files smaller than twice the bytes it would sample.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    if stages and min(stage_samples, stage_block, stage_growth) < 1:
+        raise ValueError("stage_samples, stage_block and stage_growth must be positive")
+    stats = stats if stats is not None else DupeStats()
+    by_size: Dict[int, List[_Entry]] = defaultdict(list)
     for f in files:
-        quick[_quick_hash(f, algorithm=algorithm)].append(f)
-    dupes: Dict[str, List[pathlib.Path]] = {}
-    for group in quick.values():
-        if len(group) < 2:
+        stats.files += 1
+        if isinstance(f, FileRecord):
+            by_size[f.size].append((f.path, f.dev, f.size))
             continue
-        if validate_full:
-            full_map: Dict[str, List[pathlib.Path]] = defaultdict(list)
-            for p in group:
-                full_map[_full_hash(p, algorithm=algorithm)].append(p)
-            dupes.update({k: v for k, v in full_map.items() if len(v) > 1})
-        else:
-            dupes[_quick_hash(group[0], algorithm=algorithm)] = group
-    return dupes
+        try:
+            st = f.stat()
+        except OSError:
+            continue
+        by_size[st.st_size].append((f, st.st_dev, st.st_size))
+    candidates = [group for group in by_size.values() if len(group) > 1]
+    del by_size
+    stats.unique_size = stats.files - sum(map(len, candidates))
+
+    hasher = _Hasher(workers, max_inflight, per_device)
+    try:
+        start = 0
+        while start < len(candidates):
+            end, n = start, 0
+            while end < len(candidates) and n < batch_size:
+                n += len(candidates[end])
+                end += 1
+            groups = _confirm(
+                hasher,
+                candidates[start:end],
+                stats,
+                validate_full=validate_full,
+                algorithm=algorithm,
+                cache=cache,
+                stages=stages,
+                stage_samples=stage_samples,
+                stage_block=stage_block,
+                stage_growth=stage_growth,
+            )
+            start = end
+            for key, same in groups:
+                stats.duplicates += len(same)
+                yield key, [path for path, _, _ in same]
+    finally:
+        hasher.close()
+        if cache is not None:
+            cache.flush()
+
+
+def find_duplicates(
+    files: Iterable[Union[pathlib.Path, FileRecord]],
+    *,
+    validate_full: bool = True,
+    algorithm: str = "sha256",
+    stats: Optional[DupeStats] = None,
+    workers: int = 1,
+    max_inflight: int = DEFAULT_MAX_INFLIGHT,
+    per_device: bool = False,
+    cache: Optional[ContentCache] = None,
+    stages: int = 0,
+    stage_samples: int = DEFAULT_STAGE_SAMPLES,
+    stage_block: int = DEFAULT_STAGE_BLOCK,
+    stage_growth: int = DEFAULT_STAGE_GROWTH,
+) -> Dict[str, List[pathlib.Path]]:
+    """Group *files* by identical content; return ``{digest: paths}``.
+
+    Collects every group :func:`iter_duplicate_groups` yields; the options
+    are the same.
+    """
+    return dict(
+        iter_duplicate_groups(
+            files,
+            validate_full=validate_full,
+            algorithm=algorithm,
+            stats=stats,
+            workers=workers,
+            max_inflight=max_inflight,
+            per_device=per_device,
+            cache=cache,
+            stages=stages,
+            stage_samples=stage_samples,
+            stage_block=stage_block,
+            stage_growth=stage_growth,
+        )
+    )
 
 
 def delete_older(dupe_group: Sequence[pathlib.Path]) -> list[pathlib.Path]:
@@ -68,6 +420,8 @@ def delete_older(dupe_group: Sequence[pathlib.Path]) -> list[pathlib.Path]:
 
 
 __all__ = [
+    "DupeStats",
     "find_duplicates",
+    "iter_duplicate_groups",
     "delete_older",
 ]
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+import pathlib
+from typing import TYPE_CHECKING, Final, Optional
+
+import magic  # python-magic
+
+if TYPE_CHECKING:  # pragma: no cover - imports for type hints only
+    from .cache import ContentCache
+
+HEADER_SIZE: Final = 64 * 1024
+
+
+class FileHeader:
+    """The first :data:`HEADER_SIZE` bytes of a file, read at most once.
+
+    One header is shared by everything that sniffs a file's content while it
+    is planned - MIME detection, quick hashing and renamer plugins - so the
+    file is opened once instead of once per consumer. Nothing is read until
+    :attr:`data` is first accessed.
+
+    With a *cache*, :attr:`mime_type` is looked up by inode first and the file
+    is only read when it is new or has changed since it was last sniffed.
+    """
+
+    __slots__ = ("path", "cache", "_data", "_size", "_mime")
+
+    def __init__(
+        self, path: pathlib.Path, *, cache: Optional[ContentCache] = None
+    ) -> None:
+        self.path = path
+        self.cache = cache
+        self._data: Optional[bytes] = None
+        self._size: Optional[int] = None
+        self._mime: Optional[str] = None
+
+    @property
+    def data(self) -> bytes:
+        """Return the header bytes, reading them on first use."""
+        if self._data is None:
+            with self.path.open("rb") as fp:
+                self._size = os.fstat(fp.fileno()).st_size
+                self._data = fp.read(HEADER_SIZE)
+        return self._data
+
+    @property
+    def size(self) -> int:
+        """Size of the whole file when the header was read."""
+        self.data
+        assert self._size is not None
+        return self._size
+
+    @property
+    def complete(self) -> bool:
+        """Whether the header holds the entire file."""
+        return len(self.data) >= self.size
+
+    @property
+    def mime_type(self) -> str:
+        """MIME type detected by libmagic from the header."""
+        if self._mime is None:
+            if self.cache is None:
+                self._mime = magic.from_buffer(self.data, mime=True)
+            else:
+                st = os.stat(self.path)
+                mime = self.cache.get_mime(st)
+                if mime is None:
+                    mime = magic.from_buffer(self.data, mime=True)
+                    self.cache.put_mime(st, mime)
+                self._mime = mime
+        return self._mime
+
+
+__all__ = ["FileHeader", "HEADER_SIZE"]
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import Any, Dict, Final, Iterator, List, Sequence, Tuple
+
+PLAN_SUFFIX: Final = ".plan"
+_SYNC_EVERY: Final = 256
+_SYNC_INTERVAL: Final = 1.0  # seconds
+
+
+def plan_path(log_path: pathlib.Path) -> pathlib.Path:
+    """Return where the plan of the run journaled in *log_path* is kept."""
+    return log_path.with_name(log_path.name + PLAN_SUFFIX)
+
+
+def fsync_dir(path: pathlib.Path) -> None:
+    """Make entries just added to or removed from directory *path* durable."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # pragma: no cover - e.g. Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:  # pragma: no cover - not supported for directories
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_plan(
+    log_path: pathlib.Path, mapping: Sequence[Tuple[pathlib.Path, pathlib.Path]]
+) -> pathlib.Path:
+    """Durably store *mapping* next to *log_path* and return the plan path.
+
+    Line ``n`` of the plan is the move journaled with ``"seq": n``.
+    """
+    path = plan_path(log_path)
+    with path.open("w", encoding="utf-8") as fp:
+        for src, dst in mapping:
+            fp.write(json.dumps({"src": src.as_posix(), "dst": dst.as_posix()}))
+            fp.write("\n")
+        fp.flush()
+        os.fsync(fp.fileno())
+    fsync_dir(path.parent)
+    return path
+
+
+def read_plan(log_path: pathlib.Path) -> List[Tuple[pathlib.Path, pathlib.Path]]:
+    """Return the ``(src, dst)`` pairs stored by :func:`write_plan`."""
+    return [
+        (pathlib.Path(rec["src"]), pathlib.Path(rec["dst"]))
+        for rec in _records(plan_path(log_path))
+    ]
+
+
+def _records(
+    path: pathlib.Path, *, torn_tail: bool = False
+) -> Iterator[Dict[str, Any]]:
+    lines = path.read_text(encoding="utf-8").splitlines()
+    for i, line in enumerate(lines):
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            # A crash can cut the last line short; with *torn_tail* that
+            # line is dropped, anything else is a corrupt log.
+            if not torn_tail or i != len(lines) - 1:
+                raise
+
+
+def _drop_torn_tail(path: pathlib.Path) -> None:
+    """Cut a partly written last line off *path* before appending to it."""
+    with path.open("rb+") as fp:
+        data = fp.read()
+        if data and not data.endswith(b"\n"):
+            fp.truncate(data.rfind(b"\n") + 1)
+
+
+def iter_entries(log_path: pathlib.Path) -> Iterator[Dict[str, Any]]:
+    """Yield the operations recorded in *log_path*, oldest first.
+
+    Entries with a ``seq`` are journaled in two phases; they are yielded
+    when their commit marker is reached, so moves that failed or were cut
+    short are left out. When :func:`sorter.mover.resume_moves` logged a move
+    again, only its last intent is used. Entries without a ``seq`` - older
+    logs and dedupe journals - are yielded as they are.
+    """
+    intents: Dict[int, Dict[str, Any]] = {}
+    for rec in _records(log_path):
+        if "seq" not in rec:
+            yield rec
+        elif rec.get("op") == "commit":
+            intent = intents.pop(rec["seq"], None)
+            if intent is not None:
+                yield intent
+        else:
+            intents[rec["seq"]] = rec
+
+
+def read_progress(
+    log_path: pathlib.Path,
+) -> Tuple[Dict[int, Dict[str, Any]], set[int]]:
+    """Return the intent entries by ``seq`` and the committed ``seq`` values."""
+    intents: Dict[int, Dict[str, Any]] = {}
+    done: set[int] = set()
+    for rec in _records(log_path, torn_tail=True):
+        if "seq" not in rec:
+            continue
+        if rec.get("op") == "commit":
+            done.add(rec["seq"])
+        else:
+            intents[rec["seq"]] = rec
+    return intents, done
+
+
+class MoveJournal:
+    """Two-phase JSONL journal of a move run.
+
+    Each move is recorded as an intent entry, in the format earlier versions
+    wrote, before it starts and as a ``{"op": "commit"}`` marker once it
+    finished. Syncing every write would cost a disk flush per file, so the
+    file is fsynced every *sync_every* records or *sync_interval* seconds
+    and on :meth:`close`. Moves whose records were lost in a crash are
+    recovered from the plan by :func:`sorter.mover.resume_moves`, which
+    compares the paths on disk.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        *,
+        append: bool = False,
+        sync_every: int = _SYNC_EVERY,
+        sync_interval: float = _SYNC_INTERVAL,
+    ) -> None:
+        self.path = path
+        if append:
+            _drop_torn_tail(path)
+        self._fp = path.open("a" if append else "w", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._sync_every = sync_every
+        self._sync_interval = sync_interval
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def __enter__(self) -> MoveJournal:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def intent(
+        self,
+        seq: int,
+        src: pathlib.Path,
+        dst: pathlib.Path,
+        size: int,
+        checksum: str | None,
+    ) -> None:
+        """Record that *src* is about to be moved to *dst*."""
+        self._write(
+            {
+                "src": src.as_posix(),
+                "dst": dst.as_posix(),
+                "category": dst.parent.name,
+                "sha256": checksum,
+                "size": size,
+                "epoch": int(time.time()),
+                "seq": seq,
+            }
+        )
+
+    def commit(self, seq: int) -> None:
+        """Record that move *seq* has completed."""
+        self._write({"op": "commit", "seq": seq})
+
+    def sync(self) -> None:
+        """Flush buffered records to disk."""
+        with self._lock:
+            self._sync()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fp.closed:
+                return
+            self._sync()
+            self._fp.close()
+
+    def _write(self, rec: Dict[str, Any]) -> None:
+        line = json.dumps(rec) + "\n"
+        with self._lock:
+            self._fp.write(line)
+            self._unsynced += 1
+            if (
+                self._unsynced >= self._sync_every
+                or time.monotonic() - self._synced_at >= self._sync_interval
+            ):
+                self._sync()
+
+    def _sync(self) -> None:
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+
+__all__ = [
+    "MoveJournal",
+    "fsync_dir",
+    "iter_entries",
+    "plan_path",
+    "read_plan",
+    "read_progress",
+    "write_plan",
+]
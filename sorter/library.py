@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import pathlib
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, Final, Optional
+
+from .scanner import FileRecord, as_path, iter_records
+from .utils import sha256sum
+
+if TYPE_CHECKING:  # pragma: no cover - imports for type hints only
+    from .cache import ContentCache
+
+_DEFAULT_DB_NAME: Final = "library.db"
+_BATCH_SIZE: Final = 1_000
+
+
+class LibraryIndex:
+    """Checksums of the files below a destination library *root*.
+
+    The index answers "is this content already in the library?" without
+    walking the library. :func:`sorter.mover.move_with_log` records every
+    file it moves below *root*, and :meth:`update` indexes a library that
+    was filled by other means. The sizes present are kept in memory, so a
+    file whose size does not occur in the library is ruled out without
+    reading it; only the rest are hashed and looked up by checksum.
+
+    Entries are checked against the file's current size and mtime before a
+    match is reported, and dropped when the file is gone or has changed.
+    """
+
+    def __init__(self, root: pathlib.Path, db_path: pathlib.Path | None = None) -> None:
+        if db_path is None:
+            db_path = pathlib.Path.home() / ".file-sorter" / _DEFAULT_DB_NAME
+        db_path = db_path.expanduser()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.root = root.expanduser().resolve()
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending: dict[str, tuple[int, int, str]] = {}
+        self._sizes: Optional[set[int]] = None
+        self._create_schema()
+
+    def __del__(self) -> None:  # pragma: no cover - destructor
+        try:
+            self.flush()
+            self._conn.close()
+        except Exception:
+            pass
+
+    # ---------- public API ------------
+    def add(self, path: pathlib.Path, *, size: int, mtime_ns: int, sha256: str) -> None:
+        """Record that *path* of *size* bytes and *mtime_ns* has checksum
+        *sha256*. Paths outside the library root are ignored."""
+        path = path.resolve()
+        if not path.is_relative_to(self.root):
+            return
+        with self._lock:
+            self._pending[str(path)] = (size, mtime_ns, sha256)
+            if self._sizes is not None:
+                self._sizes.add(size)
+            if len(self._pending) >= _BATCH_SIZE:
+                self._flush()
+
+    def find(
+        self,
+        src: pathlib.Path | FileRecord,
+        *,
+        cache: ContentCache | None = None,
+    ) -> Optional[pathlib.Path]:
+        """Return a library file with the same content as *src*, if any."""
+        path = as_path(src)
+        size = src.size if isinstance(src, FileRecord) else path.stat().st_size
+        if size not in self._known_sizes():
+            return None
+        digest = sha256sum(path, cache=cache)
+        with self._lock:
+            self._flush()
+            rows = self._conn.execute(
+                "SELECT path, mtime_ns FROM files"
+                " WHERE root = ? AND sha256 = ? AND size = ?",
+                (str(self.root), digest, size),
+            ).fetchall()
+        for stored, mtime_ns in rows:
+            candidate = pathlib.Path(stored)
+            try:
+                st = candidate.stat()
+            except OSError:
+                st = None
+            if st is not None and (st.st_size, st.st_mtime_ns) == (size, mtime_ns):
+                if candidate != path.resolve():
+                    return candidate
+                continue
+            self._forget(stored)
+        return None
+
+    def update(self, *, cache: ContentCache | None = None) -> tuple[int, int]:
+        """Index new and changed files below the root and forget vanished
+        ones; return ``(indexed, removed)``."""
+        with self._lock:
+            self._flush()
+            known = {
+                path: (size, mtime_ns)
+                for path, size, mtime_ns in self._conn.execute(
+                    "SELECT path, size, mtime_ns FROM files WHERE root = ?",
+                    (str(self.root),),
+                )
+            }
+        indexed = 0
+        for rec in iter_records([self.root], skip_hidden=False):
+            key = str(rec.path)
+            if known.pop(key, None) == (rec.size, rec.mtime_ns):
+                continue
+            self.add(
+                rec.path,
+                size=rec.size,
+                mtime_ns=rec.mtime_ns,
+                sha256=sha256sum(rec.path, cache=cache),
+            )
+            indexed += 1
+        for stored in known:
+            self._forget(stored)
+        self.flush()
+        return indexed, len(known)
+
+    def flush(self) -> None:
+        """Write buffered entries."""
+        with self._lock:
+            self._flush()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._flush()
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM files WHERE root = ?", (str(self.root),)
+            ).fetchone()[0]
+
+    # ---------- internals ------------
+    def _known_sizes(self) -> set[int]:
+        with self._lock:
+            if self._sizes is None:
+                self._flush()
+                self._sizes = {
+                    size
+                    for (size,) in self._conn.execute(
+                        "SELECT DISTINCT size FROM files WHERE root = ?",
+                        (str(self.root),),
+                    )
+                }
+            return self._sizes
+
+    def _forget(self, path: str) -> None:
+        with self._lock:
+            self._pending.pop(path, None)
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM files WHERE root = ? AND path = ?",
+                    (str(self.root), path),
+                )
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files (root, path, size, mtime_ns, sha256)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [
+                    (str(self.root), path, *entry)
+                    for path, entry in self._pending.items()
+                ],
+            )
+        self._pending.clear()
+
+    def _create_schema(self) -> None:
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    root     TEXT NOT NULL,
+                    path     TEXT NOT NULL,
+                    size     INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    sha256   TEXT NOT NULL,
+                    PRIMARY KEY (root, path)
+                );
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS files_sha256 ON files (root, sha256)"
+            )
+
+
+__all__ = ["LibraryIndex"]
@@ -5,13 +5,21 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import OneHotEncoder, StandardScaler
 
+from .scanner import FileRecord, as_record
 
-def extract_raw_features(file_paths: list[pathlib.Path]) -> pd.DataFrame:
-    """Extract raw features from a list of file paths into a DataFrame."""
+
+def extract_raw_features(
+    file_paths: list[pathlib.Path] | list[FileRecord],
+) -> pd.DataFrame:
+    """Extract raw features from a list of file paths into a DataFrame.
+
+    :class:`FileRecord` items reuse the size and mtime captured by the scanner.
+    """
     features = []
-    for path in file_paths:
+    for item in file_paths:
         try:
-            stat = path.stat()
+            rec = as_record(item)
+            path = rec.path
             content = ""
             if path.suffix.lower() in [
                 ".txt",
@@ -26,13 +34,11 @@ def extract_raw_features(file_paths: list[pathlib.Path]) -> pd.DataFrame:
             features.append(
                 {
                     "path": path,
-                    "file_size": stat.st_size,
+                    "file_size": rec.size,
                     "file_extension": path.suffix.lower() or ".none",
                     "file_name_text": path.stem,
-                    "modification_hour": pd.to_datetime(stat.st_mtime, unit="s").hour,
-                    "modification_day": pd.to_datetime(
-                        stat.st_mtime, unit="s"
-                    ).dayofweek,
+                    "modification_hour": pd.to_datetime(rec.mtime, unit="s").hour,
+                    "modification_day": pd.to_datetime(rec.mtime, unit="s").dayofweek,
                     "content": content,
                 }
             )
@@ -1,16 +1,47 @@
 from __future__ import annotations
 
-import json
+import contextlib
+import errno
+import hashlib
 import logging
+import os
 import pathlib
 import shutil
+import threading
 import time
-from typing import Any, Sequence, TYPE_CHECKING, Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    Callable,
+    Final,
+    Hashable,
+    Iterable,
+    Iterator,
+    Sequence,
+    Tuple,
+    TYPE_CHECKING,
+    Union,
+)
 
-from .utils import sha256sum
+from .journal import (
+    MoveJournal,
+    fsync_dir,
+    plan_path,
+    read_plan,
+    read_progress,
+    write_plan,
+)
+from .scanner import FileRecord, as_path
+from .utils import BUF_SIZE, sha256sum
+
+if TYPE_CHECKING:  # pragma: no cover - imports for type hints only
+    from .cache import ContentCache
+    from .library import LibraryIndex
 
 log = logging.getLogger(__name__)
 
+_PART_SUFFIX: Final = ".file-sorter-part"
+
 
 class Mover:
     """Handles the moving and renaming of files."""
@@ -80,80 +111,502 @@ except ModuleNotFoundError:
     _RealProgress = None
 
 
+def _part_name(dst: pathlib.Path) -> pathlib.Path:
+    return dst.with_name(f".{dst.name}.{os.getpid()}{_PART_SUFFIX}")
+
+
+def _copy_hashed(src: pathlib.Path, dst: pathlib.Path) -> str:
+    """Copy *src* to the new file *dst* with its metadata; return the SHA-256.
+
+    Every block is hashed while it is in memory for the copy, so the source
+    is read once. Kernel copies (``copy_file_range``, ``sendfile``) never
+    hand the data to user space and could not be hashed on the way. The copy
+    and its metadata are synced to disk before returning, so the source may be
+    removed.
+    """
+    h = hashlib.sha256()
+    buf = bytearray(BUF_SIZE)
+    view = memoryview(buf)
+    with src.open("rb") as fsrc, dst.open("xb") as fdst:
+        while n := fsrc.readinto(buf):
+            h.update(view[:n])
+            fdst.write(view[:n])
+        fdst.flush()
+        # Metadata first, so the sync covers the times and mode as well.
+        shutil.copystat(src, dst)
+        os.fsync(fdst.fileno())
+    return h.hexdigest()
+
+
+class _DeviceSlots:
+    """At most *limit* concurrent holders per key; ``None`` means no limit."""
+
+    def __init__(self, limit: int | None) -> None:
+        self._limit = limit
+        self._lock = threading.Lock()
+        self._slots: dict[Hashable, threading.Semaphore] = {}
+
+    @contextlib.contextmanager
+    def hold(self, key: Hashable) -> Iterator[None]:
+        if self._limit is None:
+            yield
+            return
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = threading.Semaphore(self._limit)
+        with slot:
+            yield
+
+
+class _MoveRun:
+    """State shared by the moves of one :func:`move_with_log` call."""
+
+    def __init__(
+        self,
+        journal: MoveJournal,
+        *,
+        cache: ContentCache | None,
+        library: LibraryIndex | None,
+        hash_renames: bool,
+        per_source: int | None,
+        per_dest: int | None,
+        dir_devices: dict[pathlib.Path, int],
+    ) -> None:
+        self.journal = journal
+        self.cache = cache
+        self.library = library
+        self.hash_renames = hash_renames or library is not None
+        self._sources = _DeviceSlots(per_source)
+        self._dests = _DeviceSlots(per_dest)
+        self._dir_devices = dir_devices
+
+    def move(
+        self, seq: int, item: pathlib.Path | FileRecord, dst: pathlib.Path
+    ) -> None:
+        """Move one file, journaling it before and after."""
+        src = as_path(item)
+        if isinstance(item, FileRecord):
+            size, dev = item.size, item.dev
+        else:
+            src_st = src.stat()
+            size, dev = src_st.st_size, src_st.st_dev
+        dst_dev = self._dir_devices[dst.parent]
+        # Source slots are always taken before destination slots, so two
+        # moves in opposite directions cannot wait on each other.
+        with self._sources.hold(dev), self._dests.hold(dst_dev):
+            checksum = self._transfer(seq, src, dst, size, same_device=dev == dst_dev)
+        self.journal.commit(seq)
+        if self.library is not None and checksum is not None:
+            st = dst.stat()
+            self.library.add(
+                dst, size=st.st_size, mtime_ns=st.st_mtime_ns, sha256=checksum
+            )
+
+    def _transfer(
+        self,
+        seq: int,
+        src: pathlib.Path,
+        dst: pathlib.Path,
+        size: int,
+        *,
+        same_device: bool,
+    ) -> str | None:
+        checksum: str | None = None
+        part: pathlib.Path | None = None
+        try:
+            if same_device:
+                if self.hash_renames:
+                    checksum = sha256sum(src, cache=self.cache)
+                elif self.cache is not None:
+                    checksum = self.cache.get_hash(src.stat(), "sha256")
+                self.journal.intent(seq, src, dst, size, checksum)
+                try:
+                    os.rename(src, dst)
+                except OSError as exc:
+                    # Bind mounts of one filesystem share st_dev, but the
+                    # kernel refuses to rename across them.
+                    if exc.errno != errno.EXDEV:
+                        raise
+                    log.debug("cannot rename %s across mounts; copying", src)
+                    same_device = False
+            if not same_device:
+                part = _part_name(dst)
+                part.unlink(missing_ok=True)  # left over from a crash
+                checksum = _copy_hashed(src, part)
+                self.journal.intent(seq, src, dst, size, checksum)
+                os.replace(part, dst)
+                part = None
+                # The copy must survive a crash before the source is removed.
+                fsync_dir(dst.parent)
+                src.unlink()
+                if self.cache is not None:
+                    self.cache.put_hash(dst.stat(), "sha256", checksum)
+        except FileNotFoundError:
+            log.error("Source file not found: %s", src)
+            raise
+        except PermissionError:
+            log.error(
+                "Permission denied moving %s to %s. Check folder permissions.",
+                src,
+                dst,
+            )
+            raise
+        except OSError as exc:
+            log.error("Error during move to %s: %s", dst, exc)
+            raise
+        except Exception as exc:  # pragma: no cover - defensive
+            log.critical(
+                "Unexpected error moving %s -> %s: %s",
+                src,
+                dst,
+                exc,
+                exc_info=True,
+            )
+            raise
+        else:
+            log.info("moved %s -> %s", src, dst)
+        finally:
+            if part is not None:
+                part.unlink(missing_ok=True)
+        return checksum
+
+
+_Item = Tuple[int, Union[pathlib.Path, FileRecord], pathlib.Path]
+
+
+def _run_parallel(
+    run: _MoveRun,
+    items: Sequence[_Item],
+    workers: int,
+    done: Callable[[pathlib.Path | FileRecord], None],
+) -> None:
+    """Run the moves of *items* on *workers* threads.
+
+    Only a few moves per worker are queued at a time, and *done* is called
+    on this thread as moves finish. The first error stops new moves from
+    starting and is raised once the running ones have finished.
+    """
+    pending = iter(items)
+    running: dict[Future[None], pathlib.Path | FileRecord] = {}
+    error: BaseException | None = None
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="file-sorter-move"
+    ) as pool:
+        while True:
+            while error is None and len(running) < workers * 4:
+                entry = next(pending, None)
+                if entry is None:
+                    break
+                running[pool.submit(run.move, *entry)] = entry[1]
+            if not running:
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                item = running.pop(future)
+                exc = future.exception()
+                if exc is not None:
+                    error = error or exc
+                else:
+                    done(item)
+    if error is not None:
+        raise error
+
+
+def _check_limits(workers: int, per_source: int | None, per_dest: int | None) -> None:
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if min(per_source or 1, per_dest or 1) < 1:
+        raise ValueError("per_source and per_dest must be at least 1")
+
+
+def _preflight(dsts: Sequence[pathlib.Path]) -> dict[pathlib.Path, int]:
+    """Check that no destination is taken, then create the destination
+    directories; return the device of each directory.
+
+    Each directory is listed and created once instead of probing every
+    destination, and all conflicts are reported together, including two
+    files planned to the same path. Names are compared case-insensitively.
+    """
+    by_dir: dict[pathlib.Path, list[str]] = {}
+    for dst in dsts:
+        by_dir.setdefault(dst.parent, []).append(dst.name)
+    conflicts: list[pathlib.Path] = []
+    missing: list[pathlib.Path] = []
+    for directory, names in by_dir.items():
+        try:
+            taken = {entry.casefold() for entry in os.listdir(directory)}
+        except FileNotFoundError:
+            missing.append(directory)
+            taken = set()
+        for name in names:
+            # Names differing only in case clash on case-insensitive disks.
+            key = name.casefold()
+            if key in taken:
+                conflicts.append(directory / name)
+            taken.add(key)
+    if conflicts:
+        for dst in conflicts:
+            log.error("destination already exists: %s", dst)
+        shown = ", ".join(map(str, conflicts[:3]))
+        more = f" and {len(conflicts) - 3} more" if len(conflicts) > 3 else ""
+        raise FileExistsError(
+            f"{len(conflicts)} destinations already exist: {shown}{more}"
+        )
+    for directory in missing:
+        directory.mkdir(parents=True, exist_ok=True)
+    return {directory: directory.stat().st_dev for directory in by_dir}
+
+
+def _execute(
+    journal: MoveJournal,
+    items: Sequence[_Item],
+    *,
+    show_progress: bool,
+    progress_callback: Callable[[int, pathlib.Path], None] | None,
+    cache: ContentCache | None,
+    library: LibraryIndex | None,
+    hash_renames: bool,
+    workers: int,
+    per_source: int | None,
+    per_dest: int | None,
+    dir_devices: dict[pathlib.Path, int],
+) -> None:
+    progress: Progress | None = None
+    task_id = None
+    if _HAS_RICH and show_progress:
+        assert _RealProgress is not None
+        progress = _RealProgress()
+        task_id = progress.add_task("Moving", total=len(items))
+
+    completed = 0
+
+    def done(item: pathlib.Path | FileRecord) -> None:
+        nonlocal completed
+        completed += 1
+        if progress and task_id is not None:
+            progress.update(task_id, advance=1)
+        if progress_callback:
+            percent = int((completed / len(items)) * 100)
+            progress_callback(percent, as_path(item))
+
+    run = _MoveRun(
+        journal,
+        cache=cache,
+        library=library,
+        hash_renames=hash_renames,
+        per_source=per_source,
+        per_dest=per_dest,
+        dir_devices=dir_devices,
+    )
+    if workers == 1:
+        for seq, item, dst in items:
+            run.move(seq, item, dst)
+            done(item)
+    else:
+        _run_parallel(run, items, workers, done)
+    if progress:
+        progress.stop()
+    if cache is not None:
+        cache.flush()
+    if library is not None:
+        library.flush()
+
+
 def move_with_log(
-    mapping: Sequence[tuple[pathlib.Path, pathlib.Path]],
+    mapping: Sequence[tuple[pathlib.Path | FileRecord, pathlib.Path]],
     *,
     log_path: pathlib.Path | None = None,
     show_progress: bool = True,
     progress_callback: Callable[[int, pathlib.Path], None] | None = None,
+    cache: ContentCache | None = None,
+    library: LibraryIndex | None = None,
+    hash_renames: bool = True,
+    workers: int = 1,
+    per_source: int | None = None,
+    per_dest: int | None = None,
 ) -> pathlib.Path:
     """Move *mapping* (src→dst) atomically and log each step.
 
     ``progress_callback`` is invoked after each file is moved with the
-    completion percentage and the source path.
-    """
+    completion percentage and the source path. Sources may be
+    :class:`FileRecord` objects, whose size and device are used without a
+    ``stat``.
 
+    Destinations are checked before anything is moved: if any of them
+    exists, or two files share one, a :class:`FileExistsError` names them
+    all. The plan is then stored next to the log, and the log
+    records every move before it starts and again once it is done (see
+    :class:`~sorter.journal.MoveJournal`). If the run is interrupted,
+    :func:`resume_moves` finishes it; the plan is removed once every move
+    has completed.
+
+    A file is renamed when its destination is on the same device, which
+    keeps the inode and costs no I/O. Its checksum is still read in full
+    for the log unless *hash_renames* is false, in which case only a digest
+    already in *cache* is logged (or none, and :func:`rollback` cannot
+    verify that file). Across devices the file is copied under a temporary
+    name and hashed in the same pass, then renamed into place before the
+    source is removed, so each byte is read once.
+
+    With *workers* above one, files are moved concurrently, which hides the
+    per-file latency of network shares. At most *per_source* moves read
+    from any one device and at most *per_dest* write to any one device at a
+    time. Log lines are then written in the order moves start, and progress
+    is reported from the calling thread as moves finish.
+
+    Checksums are looked up in and added to *cache* when one is given.
+    Files moved below the root of *library* are added to that index, which
+    needs their checksum whatever *hash_renames* says.
+    """
     if log_path is None:
         log_path = pathlib.Path.cwd() / f"file-sort-log_{int(time.time())}.jsonl"
     log_path = log_path.expanduser().resolve()
 
-    if any(dst.exists() for _, dst in mapping):
-        raise FileExistsError("destination already exists")
+    _check_limits(workers, per_source, per_dest)
+    dir_devices = _preflight([dst for _, dst in mapping])
+    write_plan(log_path, [(as_path(item), dst) for item, dst in mapping])
+    with MoveJournal(log_path) as journal:
+        _execute(
+            journal,
+            [(seq, item, dst) for seq, (item, dst) in enumerate(mapping)],
+            show_progress=show_progress,
+            progress_callback=progress_callback,
+            cache=cache,
+            library=library,
+            hash_renames=hash_renames,
+            workers=workers,
+            per_source=per_source,
+            per_dest=per_dest,
+            dir_devices=dir_devices,
+        )
+    plan_path(log_path).unlink()
+    log.info("log file written to %s", log_path)
+    return log_path
 
-    progress: Progress | None = None
-    task_id = None
-    if _HAS_RICH and show_progress:
-        assert _RealProgress is not None
-        progress = _RealProgress()
-        task_id = progress.add_task("Moving", total=len(mapping))
-
-    with log_path.open("w", encoding="utf-8") as logfp:
-        for idx, (src, dst) in enumerate(mapping):
-            dst.parent.mkdir(parents=True, exist_ok=True)
-            checksum = sha256sum(src)
-            category = dst.parent.name
-            logfp.write(
-                json.dumps(
-                    {
-                        "src": src.as_posix(),
-                        "dst": dst.as_posix(),
-                        "category": category,
-                        "sha256": checksum,
-                        "size": src.stat().st_size,
-                        "epoch": int(time.time()),
-                    }
-                )
-                + "\n"
-            )
+
+class _Snapshot:
+    """Entries of the directories involved in a resume, listed once each.
+
+    Checking every unfinished move on its own would list a destination
+    directory once per file to find leftover part files.
+    """
+
+    def __init__(self, paths: Iterable[pathlib.Path]) -> None:
+        self._names: dict[pathlib.Path, set[str]] = {}
+        # destination path -> part files left over from copying to it
+        self.parts: dict[pathlib.Path, list[pathlib.Path]] = {}
+        for directory in {path.parent for path in paths}:
             try:
-                shutil.move(src, dst)
+                names = set(os.listdir(directory))
             except FileNotFoundError:
-                log.error("Source file not found: %s", src)
-                raise
-            except PermissionError:
-                log.error(
-                    "Permission denied moving %s to %s. Check folder permissions.",
-                    src,
-                    dst,
-                )
-                raise
-            except shutil.Error as exc:
-                log.error("Error during move to %s: %s", dst, exc)
-                raise
-            except Exception as exc:  # pragma: no cover - defensive
-                log.critical(
-                    "Unexpected error moving %s -> %s: %s", src, dst, exc,
-                    exc_info=True,
-                )
-                raise
-            else:
-                log.info("moved %s -> %s", src, dst)
-            if progress and task_id is not None:
-                progress.update(task_id, advance=1)
-            if progress_callback:
-                percent = int(((idx + 1) / len(mapping)) * 100)
-                progress_callback(percent, src)
-    if progress:
-        progress.stop()
+                names = set()
+            self._names[directory] = names
+            for name in names:
+                if name.startswith(".") and name.endswith(_PART_SUFFIX):
+                    target = name[1 : -len(_PART_SUFFIX)].rpartition(".")[0]
+                    self.parts.setdefault(directory / target, []).append(
+                        directory / name
+                    )
+
+    def exists(self, path: pathlib.Path) -> bool:
+        return path.name in self._names.get(path.parent, ())
+
+
+def _settle(
+    journal: MoveJournal,
+    seq: int,
+    src: pathlib.Path,
+    dst: pathlib.Path,
+    intent: dict[str, Any] | None,
+    cache: ContentCache | None,
+    disk: _Snapshot,
+) -> bool:
+    """Bring an unfinished move to a known state; return whether it is done.
+
+    Returns ``False`` when the move still has to run.
+    """
+    for part in disk.parts.get(dst, ()):
+        part.unlink(missing_ok=True)
+    src_exists, dst_exists = disk.exists(src), disk.exists(dst)
+    if src_exists and not dst_exists:
+        return False
+    if dst_exists and not src_exists:
+        if intent is None:
+            # Moved, but the intent record was lost with the crash.
+            journal.intent(
+                seq, src, dst, dst.stat().st_size, sha256sum(dst, cache=cache)
+            )
+        journal.commit(seq)
+        return True
+    if dst_exists:
+        # Copied across devices, but the source was not removed yet.
+        checksum = intent and intent.get("sha256")
+        if checksum and sha256sum(dst, cache=cache) == checksum:
+            with dst.open("rb") as fp:
+                os.fsync(fp.fileno())
+            fsync_dir(dst.parent)
+            src.unlink()
+            journal.commit(seq)
+        else:
+            log.warning("%s and %s both exist; left as they are", src, dst)
+        return True
+    log.warning("%s and %s are both missing; skipped", src, dst)
+    return True
+
+
+def resume_moves(
+    log_path: pathlib.Path,
+    *,
+    show_progress: bool = True,
+    progress_callback: Callable[[int, pathlib.Path], None] | None = None,
+    cache: ContentCache | None = None,
+    library: LibraryIndex | None = None,
+    hash_renames: bool = True,
+    workers: int = 1,
+    per_source: int | None = None,
+    per_dest: int | None = None,
+) -> pathlib.Path:
+    """Finish the interrupted :func:`move_with_log` run journaled in
+    *log_path*; takes the same options.
+
+    Moves without a commit record are checked on disk: finished ones are
+    committed, a copy whose source was not yet removed is completed when it
+    matches the logged checksum, and the rest are moved as planned. New
+    records are appended to *log_path*, so it can still be undone as one
+    run.
+    """
+    _check_limits(workers, per_source, per_dest)
+    log_path = log_path.expanduser().resolve()
+    if not plan_path(log_path).exists():
+        raise FileNotFoundError(f"no unfinished moves recorded in {log_path}")
+    plan = read_plan(log_path)
+    intents, done = read_progress(log_path)
+    unfinished = [
+        (seq, src, dst) for seq, (src, dst) in enumerate(plan) if seq not in done
+    ]
+    disk = _Snapshot(path for _, src, dst in unfinished for path in (src, dst))
+    with MoveJournal(log_path, append=True) as journal:
+        todo: list[_Item] = [
+            (seq, src, dst)
+            for seq, src, dst in unfinished
+            if not _settle(journal, seq, src, dst, intents.get(seq), cache, disk)
+        ]
+        log.info("%d of %d moves left to do", len(todo), len(plan))
+        dir_devices = _preflight([dst for _, _, dst in todo])
+        _execute(
+            journal,
+            todo,
+            show_progress=show_progress,
+            progress_callback=progress_callback,
+            cache=cache,
+            library=library,
+            hash_renames=hash_renames,
+            workers=workers,
+            per_source=per_source,
+            per_dest=per_dest,
+            dir_devices=dir_devices,
+        )
+    plan_path(log_path).unlink()
     log.info("log file written to %s", log_path)
     return log_path
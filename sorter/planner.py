@@ -1,23 +1,64 @@
 from __future__ import annotations
 
+import logging
 import pathlib
-from typing import Sequence, Dict, Any
+from collections import deque
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from itertools import islice
+from typing import Sequence, Dict, Any, Iterable, Iterator, Optional, Union
 
 from pydantic import BaseModel
 
-from .scanner import scan_paths
-from .classifier import classify_file
-from .renamer import generate_name
+from .scanner import FileRecord, iter_records, scan_records
+from .cache import ContentCache
+from .library import LibraryIndex
+from .classifier import CompiledRuleSet, classify_file
+from .renamer import NameAllocator, generate_name
 from .config import load_config, Settings
+from .header import FileHeader
 from .plugin_manager import PluginManager
 
+log = logging.getLogger(__name__)
+
+
+Source = Union[pathlib.Path, FileRecord]
+# (category, plugin stem) found for a file by Planner.inspect
+Inspection = tuple[str, Optional[str]]
+
+_CHUNK = 256
+
 
 class Planner:
     """Plan file moves based on classification ``rules``."""
 
     def __init__(self, rules: Dict[str, Any], config: Settings) -> None:
         self.rules = rules
+        self.rule_set = CompiledRuleSet(
+            rules, cache=ContentCache() if config.content_cache else None
+        )
+        self.config = config
+        self.scan_workers = config.scan_workers
+        self.incremental_scan = config.incremental_scan
+        self.plan_workers = config.plan_workers
+        self.plan_processes = config.plan_processes
         self._plugin_manager = PluginManager(config)
+        self.names = NameAllocator()
+        # (source, library copy) pairs found by the last plan()
+        self.in_library: list[tuple[Source, pathlib.Path]] = []
+
+    @classmethod
+    def from_settings(cls, config: Settings) -> Planner:
+        """Create a planner using the classification rules in *config*."""
+        classification_rules = {
+            k: v.model_dump() if isinstance(v, BaseModel) else v
+            for k, v in config.classification.items()
+        }
+        return cls(classification_rules, config)
 
     def plan(
         self,
@@ -25,27 +66,177 @@ class Planner:
         dest: pathlib.Path,
         *,
         pattern: str | None = None,
-    ) -> list[tuple[pathlib.Path, pathlib.Path]]:
-        files = scan_paths(list(dirs))
-        mapping: list[tuple[pathlib.Path, pathlib.Path]] = []
-        for f in files:
-            category = classify_file(f, self.rules) or "Unsorted"
-            target_dir = dest / category
-            new_stem = self._plugin_manager.rename_with_plugin(f)
-            if new_stem:
-                temp = f.with_stem(new_stem)
-                final_dest = generate_name(
-                    temp,
-                    target_dir,
-                    include_parent=False,
-                    date_from_mtime=False,
-                    pattern=pattern,
-                )
-            else:
-                final_dest = generate_name(f, target_dir, pattern=pattern)
-            mapping.append((f, final_dest))
+        records: bool = False,
+        library: LibraryIndex | None = None,
+        skip_existing: bool = False,
+    ) -> list[tuple[Source, pathlib.Path]]:
+        """Return ``(source, destination)`` pairs for files below *dirs*.
+
+        With *records* the sources are the scanner's :class:`FileRecord`
+        objects, which lets the reporter and mover skip another ``stat``.
+
+        Files whose content *library* already holds are listed in
+        :attr:`in_library` with the copy found; with *skip_existing* they
+        are also left out of the plan.
+        """
+        # Sorted order keeps collision suffixes deterministic. The parallel
+        # scanner cannot stream in order, so it returns the sorted list.
+        files: Iterable[FileRecord]
+        if self.scan_workers > 1:
+            files = scan_records(
+                list(dirs),
+                workers=self.scan_workers,
+                incremental=self.incremental_scan,
+            )
+        else:
+            files = iter_records(
+                list(dirs), ordered=True, incremental=self.incremental_scan
+            )
+        self.in_library = []
+        self.reset_names()
+        wanted = self._not_in_library(files, library, skip_existing, records)
+        mapping: list[tuple[Source, pathlib.Path]] = []
+        # Classification and plugins may run in parallel; names are handed
+        # out here, in scan order, so the plan does not depend on timing.
+        for rec, (category, new_stem) in self._inspect_all(wanted):
+            final_dest = self._name(rec, dest / category, new_stem, pattern)
+            mapping.append((rec if records else rec.path, final_dest))
+        self.flush_cache()
         return mapping
 
+    def plan_file(
+        self,
+        src: Source,
+        dest: pathlib.Path,
+        *,
+        pattern: str | None = None,
+    ) -> pathlib.Path:
+        """Return the destination for a single file *src* below *dest*.
+
+        Names handed out since the last :meth:`reset_names` are not reused.
+        """
+        category, new_stem = self.inspect(
+            src.path if isinstance(src, FileRecord) else src
+        )
+        return self._name(src, dest / category, new_stem, pattern)
+
+    def inspect(self, f: pathlib.Path) -> Inspection:
+        """Return the category of *f* and the stem a plugin gives it, if any."""
+        # Read lazily and shared, so the file is opened at most once for
+        # MIME rules and plugins together.
+        header = FileHeader(f, cache=self.rule_set.cache)
+        category = classify_file(f, self.rule_set, header=header) or "Unsorted"
+        return category, self._plugin_manager.rename_with_plugin(f, header=header)
+
+    def _not_in_library(
+        self,
+        files: Iterable[FileRecord],
+        library: LibraryIndex | None,
+        skip_existing: bool,
+        records: bool,
+    ) -> Iterator[FileRecord]:
+        for rec in files:
+            if library is not None:
+                existing = library.find(rec, cache=self.rule_set.cache)
+                if existing is not None:
+                    log.warning("%s is already in the library as %s", rec, existing)
+                    self.in_library.append((rec if records else rec.path, existing))
+                    if skip_existing:
+                        continue
+            yield rec
+
+    def _inspect_all(
+        self, files: Iterable[FileRecord]
+    ) -> Iterator[tuple[FileRecord, Inspection]]:
+        """Yield every file of *files* with :meth:`inspect`'s result, in order.
+
+        With ``plan_workers`` above one, chunks of files are inspected on a
+        thread pool, or on worker processes with ``plan_processes``; at most
+        two chunks per worker are in flight at a time.
+        """
+        if self.plan_workers <= 1:
+            for rec in files:
+                yield rec, self.inspect(rec.path)
+            return
+        executor: Executor
+        if self.plan_processes:
+            executor = ProcessPoolExecutor(
+                self.plan_workers,
+                initializer=_init_worker,
+                initargs=(self.rules, self.config),
+            )
+            task = _inspect_in_worker
+        else:
+            executor = ThreadPoolExecutor(self.plan_workers)
+            task = self._inspect_chunk
+        it = iter(files)
+        pending: deque[tuple[list[FileRecord], Future[list[Inspection]]]] = deque()
+        with executor:
+            while True:
+                while len(pending) < self.plan_workers * 2:
+                    chunk = list(islice(it, _CHUNK))
+                    if not chunk:
+                        break
+                    paths = [rec.path for rec in chunk]
+                    pending.append((chunk, executor.submit(task, paths)))
+                if not pending:
+                    return
+                chunk, future = pending.popleft()
+                yield from zip(chunk, future.result())
+
+    def _inspect_chunk(self, paths: list[pathlib.Path]) -> list[Inspection]:
+        return [self.inspect(f) for f in paths]
+
+    def _name(
+        self,
+        src: Source,
+        target_dir: pathlib.Path,
+        new_stem: str | None,
+        pattern: str | None,
+    ) -> pathlib.Path:
+        if new_stem:
+            f = src.path if isinstance(src, FileRecord) else src
+            return generate_name(
+                f.with_stem(new_stem),
+                target_dir,
+                include_parent=False,
+                date_from_mtime=False,
+                pattern=pattern,
+                allocator=self.names,
+            )
+        return generate_name(src, target_dir, pattern=pattern, allocator=self.names)
+
+    def reset_names(self) -> None:
+        """Forget destination listings and names handed out so far.
+
+        :meth:`plan` starts from a clean slate; callers of :meth:`plan_file`
+        should reset whenever the destination may have changed.
+        """
+        self.names = NameAllocator()
+
+    def flush_cache(self) -> None:
+        """Persist MIME types sniffed since the last flush."""
+        if self.rule_set.cache is not None:
+            self.rule_set.cache.flush()
+
+
+# Planner of the current planning process, set up by ``_init_worker``.
+_worker: Planner | None = None
+
+
+def _init_worker(rules: Dict[str, Any], config: Settings) -> None:
+    global _worker
+    _worker = Planner(rules, config)
+
+
+def _inspect_in_worker(paths: list[pathlib.Path]) -> list[Inspection]:
+    assert _worker is not None
+    result = _worker._inspect_chunk(paths)
+    # Worker processes end without notice, so sniffed MIME types are saved
+    # after every chunk.
+    _worker.flush_cache()
+    return result
+
 
 def plan_moves(
     dirs: Sequence[pathlib.Path],
@@ -53,7 +244,10 @@ def plan_moves(
     *,
     pattern: str | None = None,
     config: Settings | None = None,
-) -> list[tuple[pathlib.Path, pathlib.Path]]:
+    records: bool = False,
+    library: LibraryIndex | None = None,
+    skip_existing: bool = False,
+) -> list[tuple[Source, pathlib.Path]]:
     """Create a move plan for files.
 
     This function scans ``dirs`` for files, classifies each one using the
@@ -65,16 +259,20 @@ def plan_moves(
         dest: Root directory where files will be moved.
         pattern: Optional renaming pattern.
         config: Existing settings to use instead of :func:`load_config`.
+        records: Return :class:`FileRecord` sources instead of paths.
+        library: Index of *dest* used to flag files already stored there.
+        skip_existing: Leave files found in *library* out of the plan.
 
     Returns:
         A list of ``(source, destination)`` tuples representing the move plan.
     """
     cfg = config or load_config()
-    # This is a dictionary comprehension, a concise way to build a dict. It's
-    # equivalent to a for loop that populates ``classification_rules``.
-    classification_rules = {
-        k: v.model_dump() if isinstance(v, BaseModel) else v
-        for k, v in cfg.classification.items()
-    }
-    planner = Planner(classification_rules, cfg)
-    return planner.plan(dirs, dest, pattern=pattern)
+    planner = Planner.from_settings(cfg)
+    return planner.plan(
+        dirs,
+        dest,
+        pattern=pattern,
+        records=records,
+        library=library,
+        skip_existing=skip_existing,
+    )
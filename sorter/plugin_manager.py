@@ -5,6 +5,7 @@ from typing import Any, Dict, List, Optional, Union
 
 from sorter.plugins.base import RenamerPlugin
 from .config import Settings
+from .header import FileHeader
 
 
 log = logging.getLogger(__name__)
@@ -67,13 +68,21 @@ class PluginManager:
 
         return loaded
 
-    def rename_with_plugin(self, source_path: pathlib.Path) -> Optional[str]:
-        """Tries to rename a file using the first successful plugin."""
+    def rename_with_plugin(
+        self, source_path: pathlib.Path, *, header: Optional[FileHeader] = None
+    ) -> Optional[str]:
+        """Tries to rename a file using the first successful plugin.
+
+        Plugins may sniff *header* instead of opening the file themselves.
+        """
         for plugin in self.renamer_plugins:
             plugin_name = plugin.name
             log.debug("trying plugin %s for %s", plugin_name, source_path)
             try:
-                new_stem = plugin.rename(source_path)
+                if header is None:
+                    new_stem = plugin.rename(source_path)
+                else:
+                    new_stem = plugin.rename_from_header(header)
             except Exception as exc:  # pragma: no cover - plugin error isolation
                 log.error("plugin %s failed on %s: %s", plugin_name, source_path, exc)
                 continue
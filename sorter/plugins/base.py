@@ -2,7 +2,10 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:  # pragma: no cover - imports for type hints only
+    from ..header import FileHeader
 
 
 class RenamerPlugin(ABC):
@@ -21,3 +24,11 @@ class RenamerPlugin(ABC):
     @abstractmethod
     def rename(self, file_path: Path) -> Optional[str]:
         """Analyze ``file_path`` and return a new filename or ``None``."""
+
+    def rename_from_header(self, header: "FileHeader") -> Optional[str]:
+        """Like :meth:`rename` but may sniff the already-read *header*.
+
+        Plugins whose metadata sits at the start of a file can override this
+        to avoid opening it again. The default calls :meth:`rename`.
+        """
+        return self.rename(header.path)
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import io
 import pathlib
 import re
-from typing import Any, Dict, Optional
+from typing import Any, BinaryIO, Dict, Optional
 
 import exifread
 
 from .base import RenamerPlugin
+from ..header import FileHeader
 from ..utils import sanitize_filename
 
 
@@ -26,33 +28,69 @@ class ExifRenamer(RenamerPlugin):
             return None
 
         with source_path.open("rb") as f:
-            tags = exifread.process_file(
-                f, details=False, stop_tag="EXIF DateTimeOriginal"
-            )
-
-            if "EXIF DateTimeOriginal" not in tags:
-                return None
-
-            dt_str = str(tags["EXIF DateTimeOriginal"])
-            dt_parts = re.match(
-                r"(\d{4}):(\d{2}):(\d{2}) (\d{2}):(\d{2}):(\d{2})",
-                dt_str,
-            )
-            if not dt_parts:
-                return None
-
-            year, month, day, hour, minute, second = dt_parts.groups()
-
-            format_data: Dict[str, Any] = {
-                "year": year,
-                "month": month,
-                "day": day,
-                "hour": hour,
-                "minute": minute,
-                "second": second,
-                "model": str(tags.get("Image Model", "UnknownModel")).strip(),
-                "make": str(tags.get("Image Make", "UnknownMake")).strip(),
-            }
-
-            new_stem = self.pattern.format(**format_data)
-            return sanitize_filename(new_stem)
+            return self._rename_from(f)
+
+    def rename_from_header(self, header: FileHeader) -> Optional[str]:
+        # JPEG keeps EXIF in an APP1 segment near the start of the file, and
+        # that segment cannot exceed 64 KiB. TIFF offsets may point anywhere.
+        if header.path.suffix.lower() not in [".jpg", ".jpeg"]:
+            return self.rename(header.path)
+        if not (header.complete or _exif_within(header.data)):
+            # The EXIF segment is cut off by the header end.
+            return self.rename(header.path)
+        return self._rename_from(io.BytesIO(header.data))
+
+    def _rename_from(self, f: BinaryIO) -> Optional[str]:
+        tags = exifread.process_file(f, details=False, stop_tag="EXIF DateTimeOriginal")
+
+        if "EXIF DateTimeOriginal" not in tags:
+            return None
+
+        dt_str = str(tags["EXIF DateTimeOriginal"])
+        dt_parts = re.match(
+            r"(\d{4}):(\d{2}):(\d{2}) (\d{2}):(\d{2}):(\d{2})",
+            dt_str,
+        )
+        if not dt_parts:
+            return None
+
+        year, month, day, hour, minute, second = dt_parts.groups()
+
+        format_data: Dict[str, Any] = {
+            "year": year,
+            "month": month,
+            "day": day,
+            "hour": hour,
+            "minute": minute,
+            "second": second,
+            "model": str(tags.get("Image Model", "UnknownModel")).strip(),
+            "make": str(tags.get("Image Make", "UnknownMake")).strip(),
+        }
+
+        new_stem = self.pattern.format(**format_data)
+        return sanitize_filename(new_stem)
+
+
+def _exif_within(data: bytes) -> bool:
+    """Whether *data*, the start of a JPEG, holds its whole EXIF segment.
+
+    Also true when the segments in *data* show there is no EXIF segment: the
+    image data starts, or the bytes are not a valid segment list.
+    """
+    if data[:2] != b"\xff\xd8":
+        return True
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return True
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0xD9, 0xDA):  # end of image, start of scan
+            return True
+        end = pos + 2 + int.from_bytes(data[pos + 2 : pos + 4], "big")
+        if marker == 0xE1 and data[pos + 4 : pos + 10] == b"Exif\x00\x00":
+            return end <= len(data)
+        pos = end
+    return False
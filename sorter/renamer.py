@@ -1,16 +1,21 @@
 from __future__ import annotations
 
 import datetime as _dt
+import functools
+import os
 import pathlib
 import logging
-from typing import Final, Iterable, Pattern
+import re
+import string
+from typing import Callable, Final, Iterable, Pattern
+
+from .scanner import FileRecord
 
 log = logging.getLogger(__name__)
 
 try:
     from slugify import slugify as _slugify  # type: ignore
 except ImportError:  # pragma: no cover - optional dep missing
-    import re
 
     def _slugify(
         text: str,
@@ -34,15 +39,76 @@ except ImportError:  # pragma: no cover - optional dep missing
 
 
 _DATE_FMT: Final = "%Y-%m-%d"
+_TOKENS: Final = frozenset({"parent", "date", "stem", "ext"})
+_SLUG_CACHE_SIZE: Final = 16384
+# ASCII text without these slugifies to its lowercase alphanumeric runs
+# joined by dashes; they need python-slugify's entity and number handling.
+_SLOW_CHARS: Final = re.compile(r"[&',]")
+_NON_ALNUM: Final = re.compile(r"[^a-z0-9]+")
+
+Formatter = Callable[[dict[str, str]], str]
+
+
+class NameAllocator:
+    """Hand out collision-free names in destination directories.
+
+    Each directory is listed once, the first time a name is requested in
+    it; names handed out afterwards are recorded, so files planned into the
+    same directory in one run never get the same name. Comparisons are
+    case-insensitive. The next ``__N`` suffix to try is remembered per
+    requested name, so naming many files alike does not retry every suffix
+    already taken.
+
+    Files created in a directory by something else after it was listed are
+    not seen; use a new allocator for every plan.
+    """
+
+    def __init__(self) -> None:
+        self._dirs: dict[pathlib.Path, pathlib.Path] = {}
+        self._taken: dict[pathlib.Path, set[str]] = {}
+        self._next: dict[tuple[pathlib.Path, str], int] = {}
+
+    def directory(self, target_dir: pathlib.Path) -> pathlib.Path:
+        """Return *target_dir* expanded and resolved, resolving it only once."""
+        resolved = self._dirs.get(target_dir)
+        if resolved is None:
+            resolved = self._dirs[target_dir] = target_dir.expanduser().resolve()
+        return resolved
+
+    def allocate(self, target_dir: pathlib.Path, name: str) -> pathlib.Path:
+        """Reserve *name* in *target_dir*, or the first free ``stem__N`` form
+        of it, and return the path."""
+        taken = self._taken.get(target_dir)
+        if taken is None:
+            try:
+                taken = {entry.lower() for entry in os.listdir(target_dir)}
+            except FileNotFoundError:
+                taken = set()
+            self._taken[target_dir] = taken
+        candidate = name
+        if candidate.lower() in taken:
+            stem, ext = os.path.splitext(name)
+            key = (target_dir, name.lower())
+            counter = self._next.get(key, 2)
+            while True:
+                candidate = f"{stem}__{counter}{ext}"
+                counter += 1
+                if candidate.lower() not in taken:
+                    break
+                log.debug("collision for %s, trying %s", name, candidate)
+            self._next[key] = counter
+        taken.add(candidate.lower())
+        return target_dir / candidate
 
 
 def generate_name(
-    src: pathlib.Path,
+    src: pathlib.Path | FileRecord,
     target_dir: pathlib.Path,
     *,
     include_parent: bool = True,
     date_from_mtime: bool = True,
     pattern: str | None = None,
+    allocator: NameAllocator | None = None,
 ) -> pathlib.Path:
     """Return a collision-free destination path inside *target_dir*.
 
@@ -56,91 +122,128 @@ def generate_name(
     Rules:
       • parent-slug comes from ``src.parent.name`` (omit if ``include_parent`` is
         False or parent is root).
-      • Date is file mtime if ``date_from_mtime``, else today.
+      • Date is file mtime if ``date_from_mtime``, else today. A
+        :class:`FileRecord` source supplies the mtime without a ``stat``.
       • base-slug from stem (no extension).
       • If filename already exists in ``target_dir`` (case-insensitive), append
-        ``__2``, ``__3``, … until unused.
+        ``__2``, ``__3``, … until unused. With an *allocator* the directory is
+        listed only once per allocator and names it handed out count as taken.
+    Nothing is written to disk; *target_dir* need not exist yet.
     Returns absolute ``Path``.
     """
 
-    target_dir = target_dir.expanduser().resolve()
-    target_dir.mkdir(parents=True, exist_ok=True)
-
+    names = allocator if allocator is not None else NameAllocator()
     tokens = _build_tokens(src, include_parent, date_from_mtime)
     log.debug("name tokens: %s", tokens)
-
-    if pattern:
-        name = pattern.format(**tokens)
-    else:
-        pieces = [p for p in (tokens["parent"], tokens["date"], tokens["stem"]) if p]
-        stem = "_".join(pieces)
-        name = f"{stem}{tokens['ext']}"
-
-    resolved = _resolve_collisions(target_dir, name)
+    resolved = names.allocate(
+        names.directory(target_dir), _compile_pattern(pattern)(tokens)
+    )
     log.debug("resolved path: %s", resolved)
     return resolved
 
 
+def generate_names(
+    sources: Iterable[pathlib.Path | FileRecord],
+    target_dir: pathlib.Path,
+    pattern: str | None = None,
+    *,
+    include_parent: bool = True,
+    date_from_mtime: bool = True,
+    allocator: NameAllocator | None = None,
+) -> list[pathlib.Path]:
+    """Return a destination inside *target_dir* for every item of *sources*.
+
+    Same names as calling :func:`generate_name` on each source in turn with
+    one shared *allocator*, but *target_dir* is resolved and listed once and
+    *pattern* is parsed once. Nothing is written to disk.
+    """
+    names = allocator if allocator is not None else NameAllocator()
+    target = names.directory(target_dir)
+    render = _compile_pattern(pattern)
+    return [
+        names.allocate(
+            target, render(_build_tokens(src, include_parent, date_from_mtime))
+        )
+        for src in sources
+    ]
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_pattern(pattern: str | None) -> Formatter:
+    """Parse *pattern* into a function that renders a name from tokens.
+
+    Plain ``{token}`` and ``{token:spec}`` fields are rendered without
+    re-parsing the pattern for every file; anything fancier falls back to
+    :meth:`str.format`. Unknown tokens raise :class:`KeyError` up front.
+    """
+    if not pattern:
+        return _default_name
+    parts: list[tuple[str, str | None, str]] = []
+    for literal, field, spec, conversion in string.Formatter().parse(pattern):
+        if field is None:
+            parts.append((literal, None, ""))
+            continue
+        if conversion or not field.isidentifier() or "{" in (spec or ""):
+            return lambda tokens: pattern.format(**tokens)
+        if field not in _TOKENS:
+            raise KeyError(field)
+        parts.append((literal, field, spec or ""))
+
+    def render(tokens: dict[str, str]) -> str:
+        out = []
+        for literal, field, spec in parts:
+            out.append(literal)
+            if field is not None:
+                out.append(format(tokens[field], spec) if spec else tokens[field])
+        return "".join(out)
+
+    return render
+
+
+def _default_name(tokens: dict[str, str]) -> str:
+    pieces = [p for p in (tokens["parent"], tokens["date"], tokens["stem"]) if p]
+    return "_".join(pieces) + tokens["ext"]
+
+
+@functools.lru_cache(maxsize=_SLUG_CACHE_SIZE)
+def _slug(text: str) -> str:
+    """Return ``_slugify(text)``, memoised.
+
+    Parent directory names repeat for every file in a directory and camera
+    or scanner stems repeat across folders, so a bounded cache saves most
+    calls. Plain ASCII names skip transliteration altogether.
+    """
+    if text.isascii() and not _SLOW_CHARS.search(text):
+        return _NON_ALNUM.sub("-", text.lower()).strip("-")
+    return _slugify(text)
+
+
 def _build_tokens(
-    src: pathlib.Path,
+    src: pathlib.Path | FileRecord,
     include_parent: bool,
     date_from_mtime: bool,
 ) -> dict[str, str]:
     """Return tokens used for naming."""
 
+    if isinstance(src, FileRecord):
+        mtime = src.mtime
+        src = src.path
+    else:
+        mtime = src.stat().st_mtime if date_from_mtime else 0.0
+
     parent_part = (
-        _slugify(src.parent.name)
+        _slug(src.parent.name)
         if include_parent and src.parent.name and src.parent != pathlib.Path(src.anchor)
         else ""
     )
 
     date_part = (
-        _dt.date.fromtimestamp(src.stat().st_mtime).strftime(_DATE_FMT)
+        _dt.date.fromtimestamp(mtime).strftime(_DATE_FMT)
         if date_from_mtime
         else _dt.date.today().strftime(_DATE_FMT)
     )
 
-    base_part = _slugify(src.stem) or "file"
+    base_part = _slug(src.stem) or "file"
     ext = src.suffix.lower()
 
     return {"parent": parent_part, "date": date_part, "stem": base_part, "ext": ext}
-
-
-def _get_name_from_pattern(
-    src: pathlib.Path, pattern: str, include_parent: bool, date_from_mtime: bool
-) -> str:
-    """Generate a file name from a user-provided pattern."""
-
-    tokens = _build_tokens(src, include_parent, date_from_mtime)
-    return pattern.format(**tokens)
-
-
-def _get_default_name(
-    src: pathlib.Path,
-    include_parent: bool,
-    date_from_mtime: bool,
-) -> str:
-    """Generate a default file name."""
-
-    tokens = _build_tokens(src, include_parent, date_from_mtime)
-    pieces = [p for p in (tokens["parent"], tokens["date"], tokens["stem"]) if p]
-    stem = "_".join(pieces)
-    return f"{stem}{tokens['ext']}"
-
-
-def _resolve_collisions(target_dir: pathlib.Path, name: str) -> pathlib.Path:
-    """Append a counter to ``name`` if a file with the same name already exists."""
-
-    candidate = target_dir / name
-    stem = pathlib.Path(name).stem
-    ext = pathlib.Path(name).suffix
-    counter = 2
-    existing = {p.name.lower() for p in target_dir.iterdir()}
-    while candidate.name.lower() in existing:
-        new_name = f"{stem}__{counter}{ext}"
-        log.debug("collision for %s, trying %s", candidate.name, new_name)
-        candidate = target_dir / new_name
-        counter += 1
-    result = candidate.resolve()
-    log.debug("collision-free path: %s", result)
-    return result
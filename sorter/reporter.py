@@ -9,6 +9,8 @@ import logging
 from copy import copy
 from typing import Iterable, Final, cast
 
+from .scanner import FileRecord, as_record
+
 try:
     import pandas as _pd  # type: ignore[import-untyped]
     from openpyxl.utils import get_column_letter as _col  # type: ignore[import-untyped]
@@ -22,7 +24,7 @@ log = logging.getLogger(__name__)
 
 
 def build_report(
-    mapping: Iterable[tuple[pathlib.Path, pathlib.Path]],
+    mapping: Iterable[tuple[pathlib.Path | FileRecord, pathlib.Path]],
     *,
     dest: pathlib.Path | None = None,
     auto_open: bool = False,
@@ -30,7 +32,8 @@ def build_report(
 ) -> pathlib.Path:
     """Write a report describing the proposed moves.
 
-    *mapping* – iterable of (src, dst) absolute Paths.
+    *mapping* – iterable of (src, dst) absolute Paths; *src* may be a
+    :class:`FileRecord`, in which case its cached size and mtime are used.
     Returns the path to the newly-created file.
     Columns: old_path, new_path, size_bytes, modified_iso.
     Rows sorted lexicographically by old_path for reproducibility.
@@ -48,13 +51,13 @@ def build_report(
 
     rows: list[dict[str, str | int]] = []
     for src, dst in mapping:
-        stat = src.stat()
+        rec = as_record(src)
         rows.append(
             {
-                "old_path": src.as_posix(),
+                "old_path": rec.path.as_posix(),
                 "new_path": dst.as_posix(),
-                "size_bytes": stat.st_size,
-                "modified_iso": _dt.datetime.utcfromtimestamp(stat.st_mtime).isoformat(
+                "size_bytes": rec.size,
+                "modified_iso": _dt.datetime.utcfromtimestamp(rec.mtime).isoformat(
                     timespec="seconds"
                 )
                 + "Z",
@@ -3,11 +3,14 @@ from __future__ import annotations
 import pathlib
 import sqlite3
 import time
-from typing import Final, Sequence
+from typing import Final, Iterable
+
+from .scanner import FileRecord
 
 _SECONDS_IN_DAY: Final = 86_400
 _DEFAULT_DB_NAME = "review.db"
 _COOLDOWN_DAYS = 30
+_BATCH_SIZE: Final = 1_000
 
 
 class ReviewQueue:
@@ -28,28 +31,37 @@ class ReviewQueue:
             pass
 
     # ---------- public API ------------
-    def upsert_files(self, files: Sequence[pathlib.Path]) -> None:
-        """Ensure *files* exist in table; untouched if already present."""
+    def upsert_files(self, files: Iterable[pathlib.Path | FileRecord]) -> int:
+        """Ensure *files* exist in table; untouched if already present.
+
+        *files* may be a lazy iterator; rows are written in batches so the
+        whole listing is never held in memory. :class:`FileRecord` items are
+        taken as-is without another ``stat``. Returns the number of files
+        recorded.
+        """
+        count = 0
         rows: list[tuple[str, int, int]] = []
         for p in files:
-            abs_p = p.expanduser().resolve()
-            try:
-                stat = abs_p.stat()
-            except OSError:
-                continue
-            rows.append(
-                (
-                    abs_p.as_posix(),
-                    stat.st_size,
-                    int(stat.st_mtime),
+            if isinstance(p, FileRecord):
+                rows.append((p.path.as_posix(), p.size, int(p.mtime)))
+            else:
+                abs_p = p.expanduser().resolve()
+                try:
+                    stat = abs_p.stat()
+                except OSError:
+                    continue
+                rows.append(
+                    (
+                        abs_p.as_posix(),
+                        stat.st_size,
+                        int(stat.st_mtime),
+                    )
                 )
-            )
-        with self._conn:
-            self._conn.executemany(
-                "INSERT OR IGNORE INTO reviewed (path, next_ts, last_size, last_mtime)"
-                " VALUES (?, 0, ?, ?)",
-                rows,
-            )
+            if len(rows) >= _BATCH_SIZE:
+                count += self._insert(rows)
+                rows = []
+        count += self._insert(rows)
+        return count
 
     def select_for_review(
         self, *, limit: int = 5, now: int | None = None
@@ -86,6 +98,15 @@ class ReviewQueue:
             )
 
     # ---------- internals ------------
+    def _insert(self, rows: list[tuple[str, int, int]]) -> int:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO reviewed (path, next_ts, last_size, last_mtime)"
+                " VALUES (?, 0, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
     def _create_schema(self) -> None:
         with self._conn:
             self._conn.execute(
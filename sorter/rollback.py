@@ -1,24 +1,64 @@
 from __future__ import annotations
 
-import json
 import pathlib
 import shutil
-from typing import Final
+from typing import TYPE_CHECKING, Final
 
+from .dedupe import unlink_copy
+from .journal import iter_entries
 from .utils import sha256sum as _sha256
 
+if TYPE_CHECKING:  # pragma: no cover - imports for type hints only
+    from .cache import ContentCache
+
 _TRASH_SUFFIX: Final = "__rollback_trash"
 
 
-def rollback(log_path: pathlib.Path, *, strict: bool = True) -> None:
-    """Undo moves recorded in *log_path* (last-in-first-out)."""
+def rollback(
+    log_path: pathlib.Path,
+    *,
+    strict: bool = True,
+    cache: ContentCache | None = None,
+) -> None:
+    """Undo moves recorded in *log_path* (last-in-first-out).
+
+    With *strict*, destinations are verified against the logged checksum,
+    using digests from *cache* for files that have not changed since. Moves
+    logged without a checksum are undone unverified. Moves the log does not
+    mark as completed, and moves whose source is still in place, are skipped.
+
+    Logs written by :func:`sorter.dedupe.link_duplicates` are undone too:
+    hardlinked duplicates get their own copy of the data back. Reflinked
+    duplicates already own their inode and are left as they are.
+    """
 
     log_path = log_path.expanduser().resolve()
-    entries = [json.loads(line) for line in log_path.read_text().splitlines()]
+    entries = list(iter_entries(log_path))
     for rec in reversed(entries):
         src, dst = pathlib.Path(rec["src"]), pathlib.Path(rec["dst"])
-        if strict and dst.exists() and _sha256(dst) != rec["sha256"]:
+        expected = rec.get("sha256")
+        if (
+            strict
+            and expected is not None
+            and dst.exists()
+            and _sha256(dst, cache=cache) != expected
+        ):
             raise ValueError(f"checksum mismatch for {dst}")
+        op = rec.get("op", "move")
+        if op == "hardlink":
+            if dst.exists():
+                unlink_copy(
+                    dst,
+                    mode=rec["mode"],
+                    mtime_ns=rec["mtime_ns"],
+                    uid=rec.get("uid"),
+                    gid=rec.get("gid"),
+                )
+            continue
+        if op == "reflink":
+            continue
+        if not dst.exists() and src.exists():
+            continue  # never moved
         if src.exists():
             src.replace(src.with_suffix(src.suffix + _TRASH_SUFFIX))
         if dst.exists():
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Final, List, NamedTuple, Tuple
+
+_DEFAULT_DB_NAME: Final = "scan-index.db"
+# Listings taken within this window of the directory's mtime are not trusted:
+# a change in the same timestamp tick would otherwise go unnoticed.
+_RACY_NS: Final = 2_000_000_000
+
+
+class CachedStat(NamedTuple):
+    """The subset of ``os.stat_result`` the scanner needs for a cached file."""
+
+    st_mode: int
+    st_ino: int
+    st_dev: int
+    st_nlink: int
+    st_size: int
+    st_mtime_ns: int
+
+    @property
+    def st_mtime(self) -> float:
+        return self.st_mtime_ns / 1e9
+
+
+Listing = Tuple[
+    List[Tuple[str, str, "os.stat_result | CachedStat"]],
+    List[Tuple[str, str]],
+]
+
+
+class ScanIndex:
+    """Directory listings stored on disk and reused while a directory's mtime
+    is unchanged.
+
+    A directory's mtime changes whenever an entry is added, removed or
+    renamed, so an unchanged directory can be served from the index without
+    listing it again; only its subdirectories still need a ``stat``. File
+    contents modified in place do not touch the directory mtime, so sizes and
+    mtimes of cached files are those seen when the directory was last listed;
+    :func:`~sorter.scanner.iter_records` stats such files again.
+
+    Every listing that differs from the stored one is recorded; see
+    :meth:`pop_changes`.
+    """
+
+    def __init__(self, db_path: pathlib.Path | None = None) -> None:
+        if db_path is None:
+            db_path = pathlib.Path.home() / ".file-sorter" / _DEFAULT_DB_NAME
+        db_path = db_path.expanduser()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._added: list[str] = []
+        self._removed: list[str] = []
+        self._create_schema()
+
+    def __del__(self) -> None:  # pragma: no cover - destructor
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+
+    # ---------- public API ------------
+    def listing(self, path: str, st: os.stat_result, options: str) -> Listing | None:
+        """Return the stored listing of *path* if it is still valid."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT dev, ino, mtime_ns, listed_ns, options FROM dirs"
+                " WHERE path = ?",
+                (path,),
+            ).fetchone()
+            if row is None:
+                return None
+            dev, ino, mtime_ns, listed_ns, stored_options = row
+            if (
+                (dev, ino, mtime_ns) != (st.st_dev, st.st_ino, st.st_mtime_ns)
+                or stored_options != options
+                or mtime_ns >= listed_ns - _RACY_NS
+            ):
+                return None
+            rows = self._conn.execute(
+                "SELECT name, target, is_dir, mode, ino, dev, nlink, size, mtime_ns"
+                " FROM entries WHERE dir = ?",
+                (path,),
+            ).fetchall()
+
+        files: list[tuple[str, str, os.stat_result | CachedStat]] = []
+        subdirs: list[tuple[str, str]] = []
+        for name, target, is_dir, *stat in rows:
+            if is_dir:
+                subdirs.append((name, target))
+            else:
+                files.append((name, target, CachedStat(*stat)))
+        return files, subdirs
+
+    def store(
+        self, path: str, st: os.stat_result, options: str, listing: Listing
+    ) -> None:
+        """Replace the stored listing of *path* and record what changed."""
+        files, subdirs = listing
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT target, is_dir FROM entries WHERE dir = ?", (path,)
+            ).fetchall()
+            old_files = {target for target, is_dir in old if not is_dir}
+            old_dirs = {target for target, is_dir in old if is_dir}
+            new_files = {target for _, target, _ in files}
+            self._added.extend(new_files - old_files)
+            self._removed.extend(old_files - new_files)
+            for gone in old_dirs - {target for _, target in subdirs}:
+                self._forget_tree(gone)
+
+            self._conn.execute("DELETE FROM entries WHERE dir = ?", (path,))
+            self._conn.executemany(
+                "INSERT INTO entries (dir, name, target, is_dir, mode, ino, dev,"
+                " nlink, size, mtime_ns) VALUES (?, ?, ?, 0, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        path,
+                        name,
+                        target,
+                        f_st.st_mode,
+                        f_st.st_ino,
+                        f_st.st_dev,
+                        f_st.st_nlink,
+                        f_st.st_size,
+                        f_st.st_mtime_ns,
+                    )
+                    for name, target, f_st in files
+                ],
+            )
+            self._conn.executemany(
+                "INSERT INTO entries (dir, name, target, is_dir)"
+                " VALUES (?, ?, ?, 1)",
+                [(path, name, target) for name, target in subdirs],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dirs (path, dev, ino, mtime_ns, listed_ns,"
+                " options) VALUES (?, ?, ?, ?, ?, ?)",
+                (path, st.st_dev, st.st_ino, st.st_mtime_ns, time.time_ns(), options),
+            )
+
+    def commit(self) -> None:
+        """Persist listings stored since the last commit."""
+        with self._lock:
+            self._conn.commit()
+
+    def pop_changes(self) -> tuple[list[str], list[str]]:
+        """Return and clear ``(added, removed)`` file paths seen so far."""
+        with self._lock:
+            added, self._added = self._added, []
+            removed, self._removed = self._removed, []
+        return added, removed
+
+    # ---------- internals ------------
+    def _forget_tree(self, path: str) -> None:
+        """Drop *path* and everything below it, recording its files as removed."""
+        lo, hi = path + os.sep, path + chr(ord(os.sep) + 1)
+        where = "(dir = ? OR (dir >= ? AND dir < ?))"
+        params = (path, lo, hi)
+        self._removed.extend(
+            target
+            for (target,) in self._conn.execute(
+                f"SELECT target FROM entries WHERE is_dir = 0 AND {where}", params
+            )
+        )
+        self._conn.execute(f"DELETE FROM entries WHERE {where}", params)
+        self._conn.execute(
+            "DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", params
+        )
+
+    def _create_schema(self) -> None:
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS dirs (
+                    path      TEXT PRIMARY KEY,
+                    dev       INTEGER NOT NULL,
+                    ino       INTEGER NOT NULL,
+                    mtime_ns  INTEGER NOT NULL,
+                    listed_ns INTEGER NOT NULL,
+                    options   TEXT NOT NULL
+                );
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    dir      TEXT NOT NULL,
+                    name     TEXT NOT NULL,
+                    target   TEXT NOT NULL,
+                    is_dir   INTEGER NOT NULL,
+                    mode     INTEGER,
+                    ino      INTEGER,
+                    dev      INTEGER,
+                    nlink    INTEGER,
+                    size     INTEGER,
+                    mtime_ns INTEGER
+                );
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_dir ON entries (dir)"
+            )
+
+
+__all__ = ["ScanIndex", "CachedStat"]
@@ -1,53 +1,130 @@
+from __future__ import annotations
+
 import logging
+import os
 import pathlib
-from typing import Set, Tuple
+import functools
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterator, List, NamedTuple, Set, Tuple, Union
+
+from .scan_index import CachedStat, ScanIndex
 
 
 log = logging.getLogger(__name__)
 
 
 FileId = Tuple[int, int]
+_Stat = Union[os.stat_result, CachedStat]
 
 
-def scan_paths(
-    paths: list[pathlib.Path],
-    *,
-    follow_symlinks: bool = False,
-    skip_hidden: bool = True,
-) -> list[pathlib.Path]:
-    """Recursively yield all regular files rooted at the given paths.
+class FileRecord:
+    """A scanned file together with the ``stat`` fields later stages need.
 
-    Parameters
-    ----------
-    paths:
-        Root paths to scan.
-    follow_symlinks:
-        Whether to follow symbolic links.
-    skip_hidden:
-        Skip hidden files and directories whose name starts with ``.``.
+    Carrying these values from the scanner means the planner, renamer,
+    reporter, mover, review queue and ML features never stat the file again.
+    """
 
-    Returns
-    -------
-    list[pathlib.Path]
-        Sorted absolute paths of discovered regular files without duplicates.
+    __slots__ = ("path", "size", "mtime_ns", "dev", "ino", "mode")
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        size: int,
+        mtime_ns: int,
+        dev: int,
+        ino: int,
+        mode: int,
+    ) -> None:
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.dev = dev
+        self.ino = ino
+        self.mode = mode
+
+    @classmethod
+    def from_stat(cls, path: pathlib.Path, st: _Stat) -> FileRecord:
+        return cls(path, st.st_size, st.st_mtime_ns, st.st_dev, st.st_ino, st.st_mode)
+
+    @classmethod
+    def from_path(cls, path: pathlib.Path) -> FileRecord:
+        """Stat *path* and return its record."""
+        return cls.from_stat(path, path.stat())
+
+    @property
+    def mtime(self) -> float:
+        """Modification time in seconds since the epoch."""
+        return self.mtime_ns / 1e9
+
+    def __fspath__(self) -> str:
+        return str(self.path)
+
+    def __str__(self) -> str:
+        return str(self.path)
+
+    def __repr__(self) -> str:
+        return f"FileRecord({self.path!r}, size={self.size}, mtime_ns={self.mtime_ns})"
+
+
+def as_record(item: pathlib.Path | FileRecord) -> FileRecord:
+    """Return *item* as a :class:`FileRecord`, stating it if needed."""
+    return item if isinstance(item, FileRecord) else FileRecord.from_path(item)
+
+
+def as_path(item: pathlib.Path | FileRecord) -> pathlib.Path:
+    """Return the path of *item*."""
+    return item.path if isinstance(item, FileRecord) else item
+
+
+_Listing = Tuple[
+    List[Tuple[str, str, _Stat]],
+    List[Tuple[str, str]],
+]
+
+
+class ScanChanges(NamedTuple):
+    """Files that appeared or disappeared since the previous indexed scan."""
+
+    added: list[pathlib.Path]
+    removed: list[pathlib.Path]
+
+
+def _list_dir(
+    path: str,
+    *,
+    follow_symlinks: bool,
+    skip_hidden: bool,
+    claim: Callable[[FileId], bool],
+    index: ScanIndex | None = None,
+) -> _Listing | None:
+    """Return ``(files, subdirs)`` found directly inside *path*.
+
+    ``files`` holds ``(name, path, stat)`` and ``subdirs`` ``(name, path)``.
+    Returns ``None`` when the directory cannot be read or *claim* reports that
+    its ``(st_dev, st_ino)`` was already visited. With an *index*, unchanged
+    directories are answered from it and fresh listings are stored in it.
     """
 
-    result: list[pathlib.Path] = []
-    seen_files: Set[FileId] = set()
-    seen_dirs: Set[FileId] = set()
+    try:
+        st = os.stat(path, follow_symlinks=False)
+    except OSError:
+        return None
+    if not claim((st.st_dev, st.st_ino)):
+        return None
+
+    options = f"{follow_symlinks:d}{skip_hidden:d}"
+    if index is not None:
+        cached = index.listing(path, st, options)
+        if cached is not None:
+            return cached
 
-    def _scan_dir(dir_path: pathlib.Path) -> None:
-        try:
-            st = dir_path.stat(follow_symlinks=False)
-        except OSError:
-            return
-        dir_id = (st.st_dev, st.st_ino)
-        if dir_id in seen_dirs:
-            return
-        seen_dirs.add(dir_id)
-
-        try:
-            for entry in dir_path.iterdir():
+    complete = True
+    files: list[tuple[str, str, _Stat]] = []
+    subdirs: list[tuple[str, str]] = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
                 name = entry.name
                 if skip_hidden and name.startswith("."):
                     continue
@@ -55,26 +132,117 @@ def scan_paths(
                     if entry.is_symlink():
                         if not follow_symlinks:
                             continue
-                        target_path = entry.resolve()
+                        target = os.path.realpath(entry.path)
                     else:
-                        target_path = entry
+                        target = entry.path
 
                     if entry.is_dir():
-                        _scan_dir(target_path)
+                        subdirs.append((name, target))
                     elif entry.is_file():
-                        try:
-                            st = entry.stat()
-                        except OSError:
-                            continue
-                        fid: FileId = (st.st_dev, st.st_ino)
-                        if fid in seen_files:
-                            continue
-                        seen_files.add(fid)
-                        result.append(target_path.resolve())
+                        files.append((name, target, entry.stat()))
                 except OSError:
                     continue
-        except OSError:
-            return
+    except OSError:
+        complete = False
+    if index is not None and complete:
+        index.store(path, st, options, (files, subdirs))
+    return files, subdirs
+
+
+def _walk(
+    paths: list[pathlib.Path],
+    *,
+    follow_symlinks: bool,
+    skip_hidden: bool,
+    ordered: bool,
+    workers: int = 1,
+    index: ScanIndex | None = None,
+) -> Iterator[tuple[str, _Stat]]:
+    """Yield ``(path, stat)`` once for every regular file below *paths*.
+
+    Directories are walked with an explicit stack and :func:`os.scandir`, so
+    deep trees never hit the recursion limit and the ``DirEntry`` type cache
+    answers ``is_dir``/``is_file`` without extra syscalls. Each directory is
+    entered at most once per ``(st_dev, st_ino)``.
+
+    Files are deduplicated by ``(st_dev, st_ino)`` as well, but only inodes
+    that can actually be reached twice (hard links, symlink targets, explicit
+    file roots) are remembered, so memory does not grow with the number of
+    files. With *ordered* the roots and every directory listing are sorted,
+    which yields files in the same order as ``sorted(scan_paths(...))``.
+    Otherwise files with several hard links are held back until the walk ends
+    so the lexicographically smallest name wins regardless of traversal order.
+
+    With ``workers > 1`` directory listings are fanned out over a thread pool
+    while this generator stays the only consumer of the results. With an
+    *index*, listings of unchanged directories come from the
+    :class:`ScanIndex` instead of the filesystem.
+    """
+
+    try:
+        yield from _walk_tree(
+            paths,
+            follow_symlinks=follow_symlinks,
+            skip_hidden=skip_hidden,
+            ordered=ordered,
+            workers=workers,
+            index=index,
+        )
+    finally:
+        if index is not None:
+            index.commit()
+
+
+def _walk_tree(
+    paths: list[pathlib.Path],
+    *,
+    follow_symlinks: bool,
+    skip_hidden: bool,
+    ordered: bool,
+    workers: int,
+    index: ScanIndex | None,
+) -> Iterator[tuple[str, _Stat]]:
+
+    if ordered and workers > 1:
+        raise ValueError("ordered scanning cannot use multiple workers")
+
+    seen_dirs: Set[FileId] = set()
+    seen_lock = threading.Lock()
+    seen_files: Set[FileId] = set()
+    linked: dict[FileId, tuple[str, _Stat]] = {}
+    file_roots: list[tuple[pathlib.Path, _Stat]] = []
+    root_ids: Set[FileId] = set()
+    dir_roots: list[pathlib.Path] = []
+
+    def claim(dir_id: FileId) -> bool:
+        with seen_lock:
+            if dir_id in seen_dirs:
+                return False
+            seen_dirs.add(dir_id)
+            return True
+
+    def accept(path: str, st: _Stat) -> bool:
+        fid = (st.st_dev, st.st_ino)
+        if fid in seen_files:
+            return False
+        if st.st_nlink > 1 and not ordered:
+            previous = linked.get(fid)
+            if previous is None or pathlib.PurePath(path) < pathlib.PurePath(
+                previous[0]
+            ):
+                linked[fid] = (path, st)
+            return False
+        if follow_symlinks or st.st_nlink > 1 or fid in root_ids:
+            seen_files.add(fid)
+        return True
+
+    lister = functools.partial(
+        _list_dir,
+        follow_symlinks=follow_symlinks,
+        skip_hidden=skip_hidden,
+        claim=claim,
+        index=index,
+    )
 
     for p in paths:
         p = pathlib.Path(p)
@@ -84,17 +252,288 @@ def scan_paths(
             continue
         if p.is_file():
             try:
-                st = p.stat()
+                file_st = p.stat()
             except OSError:
                 continue
-            fid = (st.st_dev, st.st_ino)
-            if fid not in seen_files:
-                seen_files.add(fid)
-                result.append(p.resolve())
+            fid = (file_st.st_dev, file_st.st_ino)
+            if fid not in root_ids:
+                root_ids.add(fid)
+                if not ordered:
+                    seen_files.add(fid)
+                file_roots.append((p.resolve(), file_st))
         elif p.is_dir():
-            _scan_dir(p.resolve() if p.is_symlink() else p)
+            dir_roots.append(p.resolve())
+
+    if ordered:
+        # Explicit file roots are emitted where they sort among the walked
+        # files, which matters when one also lies below a directory root.
+        queued = sorted(file_roots, key=lambda item: item[0].parts, reverse=True)
+
+        def roots_before(path: str | None) -> Iterator[tuple[str, _Stat]]:
+            key = pathlib.PurePath(path).parts if path is not None else None
+            while queued and (key is None or queued[-1][0].parts < key):
+                root, root_st = queued.pop()
+                fid = (root_st.st_dev, root_st.st_ino)
+                if fid not in seen_files:
+                    seen_files.add(fid)
+                    yield str(root), root_st
+
+        for root in sorted(dir_roots):
+            # Stack items are ``(path, stat)``; ``stat`` is ``None`` for
+            # directories that still have to be listed.
+            stack: list[tuple[str, _Stat | None]] = [(str(root), None)]
+            while stack:
+                path, st = stack.pop()
+                if st is not None:
+                    if queued:
+                        yield from roots_before(path)
+                    if accept(path, st):
+                        yield path, st
+                    continue
+                listing = lister(path)
+                if listing is None:
+                    continue
+                files, subdirs = listing
+                children: list[tuple[str, str, _Stat | None]] = [*files]
+                children.extend((name, d, None) for name, d in subdirs)
+                children.sort(key=lambda c: os.path.normcase(c[0]), reverse=True)
+                stack.extend((child, child_st) for _, child, child_st in children)
+        yield from roots_before(None)
+        return
+
+    for root, root_st in file_roots:
+        yield str(root), root_st
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as pool:
+            pending = {pool.submit(lister, str(d)) for d in dir_roots}
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        listing = fut.result()
+                        if listing is None:
+                            continue
+                        files, subdirs = listing
+                        pending.update(pool.submit(lister, d) for _, d in subdirs)
+                        for _, path, st in files:
+                            if accept(path, st):
+                                yield path, st
+            finally:
+                for fut in pending:
+                    fut.cancel()
+    else:
+        dir_stack = [str(d) for d in reversed(dir_roots)]
+        while dir_stack:
+            listing = lister(dir_stack.pop())
+            if listing is None:
+                continue
+            files, subdirs = listing
+            dir_stack.extend(d for _, d in subdirs)
+            for _, path, st in files:
+                if accept(path, st):
+                    yield path, st
+
+    yield from linked.values()
+
+
+def iter_paths(
+    paths: list[pathlib.Path],
+    *,
+    follow_symlinks: bool = False,
+    skip_hidden: bool = True,
+    ordered: bool = False,
+    workers: int = 1,
+    incremental: bool = False,
+    index: ScanIndex | None = None,
+) -> Iterator[pathlib.Path]:
+    """Yield regular files rooted at *paths* as soon as they are discovered.
+
+    This is the streaming counterpart of :func:`scan_paths`: nothing is
+    accumulated, so consumers can start working on the first file while the
+    rest of the tree is still being walked.
+
+    Parameters
+    ----------
+    paths:
+        Root paths to scan.
+    follow_symlinks:
+        Whether to follow symbolic links.
+    skip_hidden:
+        Skip hidden files and directories whose name starts with ``.``.
+    ordered:
+        Yield files in sorted order. Only one directory listing per level is
+        held in memory at a time. Symlinked directories are visited where the
+        link appears.
+    workers:
+        Number of threads listing directories concurrently. Useful on network
+        mounts where every listing is a round trip. Cannot be combined with
+        *ordered*.
+    incremental:
+        Reuse listings of directories whose mtime has not changed since the
+        previous incremental scan (see :class:`~sorter.scan_index.ScanIndex`).
+    index:
+        Index to use instead of the default one under ``~/.file-sorter``;
+        implies *incremental*.
+
+    Yields
+    ------
+    pathlib.Path
+        Absolute paths of discovered regular files without duplicates.
+    """
+
+    for path, _ in _walk(
+        paths,
+        follow_symlinks=follow_symlinks,
+        skip_hidden=skip_hidden,
+        ordered=ordered,
+        workers=workers,
+        index=_index_for(incremental, index),
+    ):
+        yield pathlib.Path(path)
+
+
+def iter_records(
+    paths: list[pathlib.Path],
+    *,
+    follow_symlinks: bool = False,
+    skip_hidden: bool = True,
+    ordered: bool = False,
+    workers: int = 1,
+    incremental: bool = False,
+    index: ScanIndex | None = None,
+) -> Iterator[FileRecord]:
+    """Like :func:`iter_paths` but yield :class:`FileRecord` objects.
+
+    Files listed from the index are stat'ed again: an in-place rewrite does
+    not change the directory mtime, so the cached size and mtime may be stale.
+    """
+
+    for path, st in _walk(
+        paths,
+        follow_symlinks=follow_symlinks,
+        skip_hidden=skip_hidden,
+        ordered=ordered,
+        workers=workers,
+        index=_index_for(incremental, index),
+    ):
+        if isinstance(st, CachedStat):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+        yield FileRecord.from_stat(pathlib.Path(path), st)
+
+
+def scan_records(
+    paths: list[pathlib.Path],
+    *,
+    follow_symlinks: bool = False,
+    skip_hidden: bool = True,
+    workers: int = 1,
+    incremental: bool = False,
+    index: ScanIndex | None = None,
+) -> list[FileRecord]:
+    """Like :func:`scan_paths` but return :class:`FileRecord` objects."""
+
+    result = list(
+        iter_records(
+            paths,
+            follow_symlinks=follow_symlinks,
+            skip_hidden=skip_hidden,
+            workers=workers,
+            incremental=incremental,
+            index=index,
+        )
+    )
+    result.sort(key=lambda r: r.path)
+    return result
+
+
+def scan_paths(
+    paths: list[pathlib.Path],
+    *,
+    follow_symlinks: bool = False,
+    skip_hidden: bool = True,
+    workers: int = 1,
+    incremental: bool = False,
+    index: ScanIndex | None = None,
+) -> list[pathlib.Path]:
+    """Recursively yield all regular files rooted at the given paths.
+
+    Parameters
+    ----------
+    paths:
+        Root paths to scan.
+    follow_symlinks:
+        Whether to follow symbolic links.
+    skip_hidden:
+        Skip hidden files and directories whose name starts with ``.``.
+    workers:
+        Number of threads listing directories concurrently. The result is the
+        same for any number of workers.
+    incremental:
+        Reuse listings of directories whose mtime has not changed since the
+        previous incremental scan.
+    index:
+        Index to use instead of the default one; implies *incremental*.
+
+    Returns
+    -------
+    list[pathlib.Path]
+        Sorted absolute paths of discovered regular files without duplicates.
+    """
 
+    result = list(
+        iter_paths(
+            paths,
+            follow_symlinks=follow_symlinks,
+            skip_hidden=skip_hidden,
+            workers=workers,
+            incremental=incremental,
+            index=index,
+        )
+    )
     result.sort()
     if log.isEnabledFor(logging.DEBUG):
         log.debug("Discovered %d files under %s", len(result), paths)
     return result
+
+
+def scan_changes(
+    paths: list[pathlib.Path],
+    *,
+    follow_symlinks: bool = False,
+    skip_hidden: bool = True,
+    workers: int = 1,
+    index: ScanIndex | None = None,
+) -> ScanChanges:
+    """Return files added or removed since the previous indexed scan.
+
+    Only directories whose mtime changed are listed, so the cost grows with
+    the number of changed directories rather than the number of files. The
+    first scan against an empty index reports every file as added.
+    """
+
+    if index is None:
+        index = ScanIndex()
+    index.pop_changes()
+    for _ in _walk(
+        paths,
+        follow_symlinks=follow_symlinks,
+        skip_hidden=skip_hidden,
+        ordered=False,
+        workers=workers,
+        index=index,
+    ):
+        pass
+    added, removed = index.pop_changes()
+    return ScanChanges(
+        sorted(map(pathlib.Path, added)), sorted(map(pathlib.Path, removed))
+    )
+
+
+def _index_for(incremental: bool, index: ScanIndex | None) -> ScanIndex | None:
+    if index is None and incremental:
+        return ScanIndex()
+    return index
@@ -22,8 +22,15 @@ def install_job(
     dirs: list[pathlib.Path],
     dest: pathlib.Path,
 ) -> None:
-    """Register OS-level schedule that runs nightly dry-run."""
-    cmd = f"file-sorter move {' '.join(map(str, dirs))} --dest {dest} --dry-run"
+    """Register OS-level schedule that runs nightly dry-run.
+
+    The job scans incrementally so unchanged directories are not relisted,
+    and caches MIME types so unchanged files are not sniffed again.
+    """
+    cmd = (
+        f"file-sorter move {' '.join(map(str, dirs))} --dest {dest}"
+        " --dry-run --incremental --cache"
+    )
     if platform.system() == "Windows":
         _install_windows(cron_expr, cmd)
     else:
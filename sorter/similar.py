@@ -0,0 +1,203 @@
+"""Find visually similar images with perceptual hashes and a BK-tree."""
+
+from __future__ import annotations
+
+import logging
+import os
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    Final,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+)
+
+from .scanner import FileRecord, as_path
+
+try:
+    from PIL import Image as _Image
+except ImportError:  # pragma: no cover - optional dep missing
+    _Image = None  # type: ignore
+
+if TYPE_CHECKING:  # pragma: no cover - imports for type hints only
+    from .cache import ContentCache
+
+log = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS: Final = frozenset(
+    {".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+)
+DEFAULT_THRESHOLD: Final = 6
+_HASH_SIZE: Final = 8
+# Name under which perceptual hashes are stored in the content cache.
+_CACHE_ALGORITHM: Final = f"dhash{_HASH_SIZE * _HASH_SIZE}"
+
+
+# int.bit_count is Python 3.10+
+_popcount: Callable[[int], int] = getattr(int, "bit_count", lambda x: bin(x).count("1"))
+
+
+def dhash(path: pathlib.Path, *, size: int = _HASH_SIZE) -> int:
+    """Return the difference hash of the image at *path* as an integer.
+
+    The image is shrunk to ``(size + 1) x size`` grey pixels and each bit
+    records whether a pixel is brighter than its right neighbour, so
+    re-encoding, resizing and small colour shifts barely change the hash.
+    """
+    if _Image is None:
+        raise ModuleNotFoundError("Pillow is required", name="PIL")
+    with _Image.open(path) as img:
+        # Let JPEG decode at reduced scale; much faster for large photos.
+        img.draft("L", ((size + 1) * 4, size * 4))
+        small = img.convert("L").resize((size + 1, size), _Image.Resampling.LANCZOS)
+        pixels = small.tobytes()
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    """Return the number of differing bits between *a* and *b*."""
+    return _popcount(a ^ b)
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes under Hamming distance.
+
+    A range query only descends into children whose edge distance is within
+    ``radius`` of the query's distance to the node (triangle inequality), so
+    small radii visit a small fraction of the tree.
+    """
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, hashes: Iterable[int] = ()) -> None:
+        # node: [hash, {distance: child}]
+        self._root: Optional[list] = None
+        self._size = 0
+        for h in hashes:
+            self.add(h)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int) -> None:
+        """Insert *value*; duplicates are ignored."""
+        if self._root is None:
+            self._root = [value, {}]
+            self._size = 1
+            return
+        node = self._root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                return
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [value, {}]
+                self._size += 1
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> Iterator[int]:
+        """Yield every stored hash within *radius* bits of *value*."""
+        if self._root is None:
+            return
+        stack = [self._root]
+        while stack:
+            node_value, children = stack.pop()
+            d = hamming(value, node_value)
+            if d <= radius:
+                yield node_value
+            lo, hi = d - radius, d + radius
+            stack.extend(c for dist, c in children.items() if lo <= dist <= hi)
+
+
+def _image_hash(path: pathlib.Path, cache: Optional[ContentCache]) -> Optional[int]:
+    try:
+        st = os.stat(path)
+        if cache is not None:
+            cached = cache.get_hash(st, _CACHE_ALGORITHM)
+            if cached is not None:
+                return int(cached, 16)
+        value = dhash(path)
+    except Exception as exc:  # unreadable or not really an image
+        log.debug("cannot hash image %s: %s", path, exc)
+        return None
+    if cache is not None:
+        cache.put_hash(st, _CACHE_ALGORITHM, format(value, "x"))
+    return value
+
+
+def find_similar_images(
+    files: Iterable[pathlib.Path | FileRecord],
+    *,
+    threshold: int = DEFAULT_THRESHOLD,
+    workers: int = 1,
+    cache: Optional[ContentCache] = None,
+) -> List[List[pathlib.Path]]:
+    """Group images in *files* whose perceptual hashes differ by at most
+    *threshold* bits.
+
+    Files without an image extension are ignored. Hashes are read from and
+    stored in *cache* when one is given, and computed on *workers* threads
+    otherwise. Identical hashes are merged before the BK-tree is built, and
+    groups are the connected components of the "within *threshold*"
+    relation, each sorted, ordered by their first path.
+    """
+    if _Image is None:
+        raise ModuleNotFoundError("Pillow is required", name="PIL")
+    paths = [p for p in map(as_path, files) if p.suffix.lower() in IMAGE_EXTENSIONS]
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            hashes = list(pool.map(lambda p: _image_hash(p, cache), paths))
+    else:
+        hashes = [_image_hash(p, cache) for p in paths]
+    if cache is not None:
+        cache.flush()
+
+    by_hash: Dict[int, List[pathlib.Path]] = {}
+    for path, value in zip(paths, hashes):
+        if value is not None:
+            by_hash.setdefault(value, []).append(path)
+
+    # Union-find over distinct hashes.
+    parent: Dict[int, int] = {h: h for h in by_hash}
+
+    def find(h: int) -> int:
+        while parent[h] != h:
+            parent[h] = parent[parent[h]]
+            h = parent[h]
+        return h
+
+    tree = BKTree()
+    for value in by_hash:
+        for near in tree.search(value, threshold):
+            ra, rb = find(value), find(near)
+            if ra != rb:
+                parent[ra] = rb
+        tree.add(value)
+
+    components: Dict[int, List[pathlib.Path]] = {}
+    for value, group in by_hash.items():
+        components.setdefault(find(value), []).extend(group)
+    groups = [sorted(g) for g in components.values() if len(g) > 1]
+    groups.sort(key=lambda g: g[0])
+    return groups
+
+
+__all__ = [
+    "BKTree",
+    "dhash",
+    "find_similar_images",
+    "hamming",
+    "IMAGE_EXTENSIONS",
+]
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-import json
 import pathlib
 import io
+from typing import Any
+
+from .journal import iter_entries
 
 try:
     import pandas as _pd  # type: ignore[import-untyped]
@@ -11,6 +13,7 @@ except ImportError:  # pragma: no cover - optional dep missing
 
 try:
     import matplotlib
+
     matplotlib.use("Agg")
     import matplotlib.pyplot as _plt
 except ImportError:  # pragma: no cover - optional dep missing
@@ -28,11 +31,9 @@ def build_dashboard(
     if _plt is None:
         raise ModuleNotFoundError("matplotlib is required for build_dashboard")
 
-    rows = []
+    rows: list[dict[str, Any]] = []
     for lp in logs:
-        for line in lp.read_text().splitlines():
-            rec = json.loads(line)
-            rows.append(rec)
+        rows.extend(iter_entries(lp))
     df = _pd.DataFrame(rows)
     if df.empty:
         raise ValueError("no data in logs")
@@ -1,12 +1,13 @@
 import pathlib
-import json
 import joblib
 import logging
+from typing import Any
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import LabelEncoder
 
+from .journal import iter_entries
 from .ml_features import extract_raw_features, create_feature_pipeline
 
 MODEL_PATH = pathlib.Path.home() / ".file-sorter" / "supervised_model.joblib"
@@ -18,16 +19,12 @@ def train_supervised_model(logs_dir: pathlib.Path):
     """Train a Random Forest model from log files."""
     log_files = list(logs_dir.glob("file-sort-log_*.jsonl"))
     if not log_files:
-        log.info(
-            "No log files found. Sort some files first to create training data."
-        )
+        log.info("No log files found. Sort some files first to create training data.")
         return
 
-    records = []
+    records: list[dict[str, Any]] = []
     for log_file in log_files:
-        with open(log_file, "r") as f:
-            for line in f:
-                records.append(json.loads(line))
+        records.extend(iter_entries(log_file))
 
     log_df = pd.DataFrame(records)
     log_df["path"] = log_df["src"].apply(pathlib.Path)
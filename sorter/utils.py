@@ -1,27 +1,53 @@
 from __future__ import annotations
 
 import hashlib
+import os
 import pathlib
 import re
-from typing import Final
+from typing import TYPE_CHECKING, Final, Optional
+
+if TYPE_CHECKING:  # pragma: no cover - imports for type hints only
+    from .cache import ContentCache
 
 BUF_SIZE: Final = 1 << 20  # 1 MiB
 
 
 def hash_file(
-    path: pathlib.Path, *, algorithm: str = "sha256", buf_size: int = BUF_SIZE
+    path: pathlib.Path,
+    *,
+    algorithm: str = "sha256",
+    buf_size: int = BUF_SIZE,
+    cache: Optional[ContentCache] = None,
 ) -> str:
-    """Return *algorithm* hash of *path*."""
+    """Return *algorithm* hash of *path*.
+
+    With a *cache*, a digest stored for the same inode, size and mtime is
+    returned without reading the file, and new digests are stored.
+    """
+    st = None
+    if cache is not None:
+        st = os.stat(path)
+        digest = cache.get_hash(st, algorithm)
+        if digest is not None:
+            return digest
     h = hashlib.new(algorithm)
     with path.open("rb") as fp:
         while chunk := fp.read(buf_size):
             h.update(chunk)
-    return h.hexdigest()
+    digest = h.hexdigest()
+    if cache is not None and st is not None:
+        cache.put_hash(st, algorithm, digest)
+    return digest
 
 
-def sha256sum(path: pathlib.Path, *, buf_size: int = BUF_SIZE) -> str:
+def sha256sum(
+    path: pathlib.Path,
+    *,
+    buf_size: int = BUF_SIZE,
+    cache: Optional[ContentCache] = None,
+) -> str:
     """Return SHA-256 checksum of *path*."""
-    return hash_file(path, algorithm="sha256", buf_size=buf_size)
+    return hash_file(path, algorithm="sha256", buf_size=buf_size, cache=cache)
 
 
 def sanitize_filename(name: str) -> str:
@@ -0,0 +1,372 @@
+"""Watch directories and sort files shortly after they arrive.
+
+On Linux the watcher subscribes to inotify events through ``libc``; elsewhere
+(or when requested) it polls directory mtimes. Events are debounced per file so
+a download is only moved once it has stopped changing.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import pathlib
+import select
+import struct
+import sys
+import time
+from typing import Callable, Iterable, Protocol
+
+from .journal import plan_path, read_progress
+from .mover import move_with_log
+from .planner import Planner
+from .scanner import FileRecord, iter_paths
+
+log = logging.getLogger(__name__)
+
+# inotify(7) constants
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT = struct.Struct("iIII")
+# ctimes come from a coarse kernel clock that may trail time.time() slightly.
+_CLOCK_SLACK = 0.1  # seconds
+# A file whose move fails this many times in a row is given up on.
+_MAX_ATTEMPTS = 3
+
+
+class Backend(Protocol):
+    """Source of paths that may have changed below the watched roots."""
+
+    def poll(self, timeout: float) -> list[pathlib.Path]: ...
+
+    def close(self) -> None: ...
+
+
+class PollingBackend:
+    """Detect new files by comparing directory mtimes between polls."""
+
+    def __init__(self, roots: Iterable[pathlib.Path], *, skip_hidden: bool = True):
+        self.skip_hidden = skip_hidden
+        self._dirs: dict[str, int] = {}
+        self._files: dict[str, set[str]] = {}
+        for root in roots:
+            self._track(str(root.resolve()), report=False)
+
+    def poll(self, timeout: float) -> list[pathlib.Path]:
+        time.sleep(timeout)
+        changed: list[pathlib.Path] = []
+        for path, mtime_ns in list(self._dirs.items()):
+            try:
+                current = os.stat(path).st_mtime_ns
+            except OSError:
+                self._forget(path)
+                continue
+            if current != mtime_ns:
+                changed.extend(self._track(path, report=True))
+        return changed
+
+    def close(self) -> None:
+        self._dirs.clear()
+        self._files.clear()
+
+    def _track(self, top: str, *, report: bool) -> list[pathlib.Path]:
+        """Refresh *top* and any new subdirectories; return new files."""
+        found: list[pathlib.Path] = []
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            is_new_dir = path not in self._dirs
+            self._dirs[path] = mtime_ns
+            known = self._files.get(path, set())
+            files: set[str] = set()
+            for entry in entries:
+                if self.skip_hidden and entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path not in self._dirs:
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        files.add(entry.name)
+                except OSError:
+                    continue
+            self._files[path] = files
+            if report or (is_new_dir and path != top):
+                found.extend(pathlib.Path(path, name) for name in files - known)
+        return found
+
+    def _forget(self, path: str) -> None:
+        prefix = path + os.sep
+        for known in [d for d in self._dirs if d == path or d.startswith(prefix)]:
+            del self._dirs[known]
+            self._files.pop(known, None)
+
+
+class InotifyBackend:
+    """Linux inotify subscription covering every directory below the roots."""
+
+    def __init__(self, roots: Iterable[pathlib.Path], *, skip_hidden: bool = True):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.skip_hidden = skip_hidden
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._roots = [root.resolve() for root in roots]
+        self._wd: dict[int, pathlib.Path] = {}
+        # Wall-clock time before the latest read; events after it may be lost
+        # if the queue overflows.
+        self._last_read = time.time()
+        for root in self._roots:
+            self._add_tree(root, report=False)
+
+    def poll(self, timeout: float) -> list[pathlib.Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        changed: list[pathlib.Path] = []
+        read_at = time.time()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            changed.extend(self._parse(buf))
+        self._last_read = read_at
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _parse(self, buf: bytes) -> list[pathlib.Path]:
+        changed: list[pathlib.Path] = []
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            raw = buf[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                log.warning("inotify queue overflowed; rescanning watched trees")
+                for root in self._roots:
+                    self._add_tree(root, report=False)
+                    changed.extend(self._changed_since(root, self._last_read))
+                continue
+            if mask & _IN_IGNORED:
+                self._wd.pop(wd, None)
+                continue
+            parent = self._wd.get(wd)
+            if parent is None or not raw:
+                continue
+            name = os.fsdecode(raw)
+            if self.skip_hidden and name.startswith("."):
+                continue
+            path = parent / name
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    changed.extend(self._add_tree(path, report=True))
+            elif mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                changed.append(path)
+        return changed
+
+    def _add_tree(self, top: pathlib.Path, *, report: bool) -> list[pathlib.Path]:
+        """Watch *top* and its subdirectories.
+
+        With *report*, return the files already inside: they may have been
+        written before the watch was in place.
+        """
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+            if wd < 0:
+                log.warning(
+                    "cannot watch %s: %s", path, os.strerror(ctypes.get_errno())
+                )
+                continue
+            self._wd[wd] = path
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if self.skip_hidden and entry.name.startswith("."):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(pathlib.Path(entry.path))
+            except OSError:
+                continue
+        if not report:
+            return []
+        return list(iter_paths([top], skip_hidden=self.skip_hidden))
+
+    def _changed_since(self, top: pathlib.Path, since: float) -> list[pathlib.Path]:
+        """Return files below *top* written or moved in since *since*.
+
+        Renaming a file updates its ctime, so files moved in are found too.
+        """
+        found: list[pathlib.Path] = []
+        for path in iter_paths([top], skip_hidden=self.skip_hidden):
+            try:
+                ctime = path.stat().st_ctime
+            except OSError:
+                continue
+            if ctime >= since - _CLOCK_SLACK:
+                found.append(path)
+        return found
+
+
+def _signature(path: pathlib.Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def make_backend(roots: Iterable[pathlib.Path], *, polling: bool = False) -> Backend:
+    """Return an inotify backend on Linux, falling back to polling."""
+    roots = list(roots)
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyBackend(roots)
+        except (OSError, AttributeError) as exc:
+            log.warning("inotify unavailable (%s); polling instead", exc)
+    return PollingBackend(roots)
+
+
+class Watcher:
+    """Feed files that appear below *dirs* through the planner and mover.
+
+    A file is moved once no new event has arrived for it for *debounce*
+    seconds and its size and mtime are unchanged since the last check.
+    Files that existed before the watcher started are left alone.
+    """
+
+    def __init__(
+        self,
+        dirs: Iterable[pathlib.Path],
+        dest: pathlib.Path,
+        planner: Planner,
+        *,
+        pattern: str | None = None,
+        debounce: float = 2.0,
+        log_dir: pathlib.Path | None = None,
+        backend: Backend | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.dirs = [d.resolve() for d in dirs]
+        self.dest = dest.expanduser().resolve()
+        self.planner = planner
+        self.pattern = pattern
+        self.debounce = debounce
+        self.log_dir = (log_dir or pathlib.Path.cwd()).expanduser().resolve()
+        self.backend = backend or make_backend(self.dirs)
+        self._clock = clock
+        # path -> (time of last change, (size, mtime_ns) at that time)
+        self._pending: dict[pathlib.Path, tuple[float, tuple[int, int]]] = {}
+        # path -> failed attempts to move it so far
+        self._failures: dict[pathlib.Path, int] = {}
+
+    def step(self, timeout: float = 1.0) -> list[tuple[pathlib.Path, pathlib.Path]]:
+        """Wait up to *timeout* for events and move every settled file.
+
+        Returns the ``(source, destination)`` pairs moved in this step.
+        """
+        events = self.backend.poll(timeout)
+        now = self._clock()
+        for path in events:
+            if self._is_under_dest(path):
+                continue
+            signature = _signature(path)
+            if signature is not None:
+                self._pending[path] = (now, signature)
+        return self._flush(now)
+
+    def run(self, *, timeout: float = 1.0) -> None:
+        """Process events until interrupted."""
+        log.info("Watching %s", ", ".join(str(d) for d in self.dirs))
+        try:
+            while True:
+                try:
+                    self.step(timeout)
+                except Exception:
+                    # Failed moves are requeued by _flush; anything else
+                    # going wrong must not stop the daemon either.
+                    log.exception("Sorting a batch failed; still watching")
+        finally:
+            self.backend.close()
+
+    def _flush(self, now: float) -> list[tuple[pathlib.Path, pathlib.Path]]:
+        due: list[FileRecord] = []
+        for path, (changed, signature) in list(self._pending.items()):
+            if now - changed < self.debounce:
+                continue
+            try:
+                rec = FileRecord.from_path(path)
+            except OSError:
+                del self._pending[path]
+                continue
+            if (rec.size, rec.mtime_ns) != signature:
+                # Still being written: wait for another quiet period.
+                self._pending[path] = (now, (rec.size, rec.mtime_ns))
+                continue
+            del self._pending[path]
+            due.append(rec)
+
+        if not due:
+            return []
+        due.sort(key=lambda r: r.path)
+        self.planner.reset_names()
+        mapping: list[tuple[FileRecord, pathlib.Path]] = []
+        log_path = self.log_dir / f"file-sort-log_{time.time_ns()}.jsonl"
+        try:
+            for rec in due:
+                dst = self.planner.plan_file(rec, self.dest, pattern=self.pattern)
+                mapping.append((rec, dst))
+            self.planner.flush_cache()
+            move_with_log(mapping, log_path=log_path, show_progress=False)
+        except Exception as exc:
+            done = read_progress(log_path)[1] if log_path.exists() else set()
+            # The watcher retries the rest itself; nothing is left to resume.
+            plan_path(log_path).unlink(missing_ok=True)
+            if not done:
+                log_path.unlink(missing_ok=True)
+            for seq, rec in enumerate(due):
+                if seq not in done:
+                    self._retry(rec, now, exc)
+            mapping = [m for seq, m in enumerate(mapping) if seq in done]
+        for rec, _ in mapping:
+            self._failures.pop(rec.path, None)
+        return [(rec.path, dst) for rec, dst in mapping]
+
+    def _retry(self, rec: FileRecord, now: float, exc: Exception) -> None:
+        """Queue *rec* again after its move failed with *exc*."""
+        attempts = self._failures.get(rec.path, 0) + 1
+        if attempts >= _MAX_ATTEMPTS:
+            log.error("Giving up on %s after %d attempts: %s", rec.path, attempts, exc)
+            self._failures.pop(rec.path, None)
+            return
+        log.error("Could not sort %s (%s); will retry", rec.path, exc)
+        self._failures[rec.path] = attempts
+        self._pending[rec.path] = (now, (rec.size, rec.mtime_ns))
+
+    def _is_under_dest(self, path: pathlib.Path) -> bool:
+        return path == self.dest or self.dest in path.parents
+
+
+__all__ = ["Watcher", "PollingBackend", "InotifyBackend", "make_backend"]
@@ -0,0 +1,122 @@
+import os
+
+import magic
+
+from conftest import run_cli
+from sorter.cache import ContentCache
+from sorter.classifier import CompiledRuleSet, classify_file
+
+
+def _old_file(path, data=b"data"):
+    path.write_bytes(data)
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    return path
+
+
+def test_mime_cached_until_file_changes(tmp_path):
+    cache = ContentCache(tmp_path / "cache.db")
+    f = _old_file(tmp_path / "a.bin")
+    assert cache.get_mime(os.stat(f)) is None
+    cache.put_mime(os.stat(f), "audio/flac")
+    assert cache.get_mime(os.stat(f)) == "audio/flac"
+
+    cache.flush()
+    reopened = ContentCache(tmp_path / "cache.db")
+    assert reopened.get_mime(os.stat(f)) == "audio/flac"
+
+    _old_file(f, b"longer data")
+    assert reopened.get_mime(os.stat(f)) is None
+
+
+def test_recently_modified_files_not_cached(tmp_path):
+    cache = ContentCache(tmp_path / "cache.db")
+    f = tmp_path / "fresh.bin"
+    f.write_bytes(b"x")
+    cache.put_mime(os.stat(f), "text/plain")
+    assert cache.get_mime(os.stat(f)) is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ContentCache(tmp_path / "cache.db", max_entries=2)
+    files = [_old_file(tmp_path / f"{i}.bin") for i in range(3)]
+    for f in files:
+        cache.put_mime(os.stat(f), "text/plain")
+        cache.flush()
+    assert len(cache) == 2
+    assert cache.get_mime(os.stat(files[0])) is None
+    assert cache.get_mime(os.stat(files[2])) == "text/plain"
+
+
+def test_repeat_classification_skips_libmagic(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_from_buffer(buf, mime=False):
+        calls.append(buf)
+        return "audio/flac"
+
+    monkeypatch.setattr(magic, "from_buffer", fake_from_buffer)
+    f = _old_file(tmp_path / "song.bin")
+    rules = {"Music": {"mimetypes": ["audio/flac"]}}
+    db = tmp_path / "cache.db"
+
+    first = CompiledRuleSet(rules, cache=ContentCache(db))
+    assert classify_file(f, first) == "Music"
+    first.cache.flush()
+    second = CompiledRuleSet(rules, cache=ContentCache(db))
+    assert classify_file(f, second) == "Music"
+    assert len(calls) == 1
+
+
+def test_hash_file_uses_cache(tmp_path, monkeypatch):
+    from sorter.utils import hash_file
+
+    cache = ContentCache(tmp_path / "cache.db")
+    f = _old_file(tmp_path / "a.bin", b"payload")
+    digest = hash_file(f, cache=cache)
+    assert cache.get_hash(os.stat(f), "sha256") == digest
+    assert cache.get_hash(os.stat(f), "md5") is None
+
+    monkeypatch.setattr(type(f), "open", lambda *a, **k: 1 / 0)
+    assert hash_file(f, cache=cache) == digest
+
+
+def test_move_then_rollback_hashes_once(tmp_path, monkeypatch):
+    import hashlib
+
+    from sorter.mover import move_with_log
+    from sorter.rollback import rollback
+
+    src = _old_file(tmp_path / "a.txt")
+    dst = tmp_path / "out" / "a.txt"
+    cache = ContentCache(tmp_path / "cache.db")
+    calls = []
+    real_new = hashlib.new
+
+    def counting_new(name, *args, **kwargs):
+        calls.append(name)
+        return real_new(name, *args, **kwargs)
+
+    monkeypatch.setattr(hashlib, "new", counting_new)
+    log = move_with_log(
+        [(src, dst)], log_path=tmp_path / "log.jsonl", show_progress=False, cache=cache
+    )
+    rollback(log, cache=cache)
+    assert src.exists() and not dst.exists()
+    assert calls == ["sha256"]
+
+
+def test_prune(tmp_path):
+    cache = ContentCache(tmp_path / "cache.db")
+    for i in range(3):
+        f = _old_file(tmp_path / f"{i}.bin")
+        cache.put_mime(os.stat(f), "text/plain")
+        cache.put_hash(os.stat(f), "sha256", "x")
+    assert cache.stats() == {"mime": 3, "hashes": 3}
+    assert cache.prune(max_entries=1) == 4
+    assert cache.stats() == {"mime": 1, "hashes": 1}
+    assert cache.prune(unused_days=0) == 2
+    assert len(cache) == 0
+
+
+def test_prune_command_needs_a_limit():
+    assert run_cli(["cache", "prune"]).exit_code == 1
@@ -31,10 +31,10 @@ def test_magic_fallback(monkeypatch, tmp_path):
     f.write_bytes(b"dummy")
 
     # Force libmagic path without extension
-    def fake_from_file(_: str, mime: bool = False):
+    def fake_from_buffer(_: bytes, mime: bool = False):
         return "audio/wav" if mime else "WAVE audio"
 
-    monkeypatch.setattr("magic.from_file", fake_from_file)
+    monkeypatch.setattr("magic.from_buffer", fake_from_buffer)
     cfg = {"classification": DEFAULT_RULES}
     assert classify(f, cfg) == "Audio"
 
@@ -75,3 +75,27 @@ def test_classify_file_edge_cases(tmp_path, rules, filename, expected_dest):
     test_file.touch()
     destination = classify_file(test_file, rules)
     assert destination == expected_dest
+
+
+def test_settings_rules_and_cache_are_reused(tmp_path, monkeypatch):
+    from sorter import classifier
+    from sorter.config import Settings
+
+    monkeypatch.setenv("HOME", str(tmp_path))
+    opened = []
+    real_cache = classifier.ContentCache
+
+    def counting_cache(*args, **kwargs):
+        opened.append(args)
+        return real_cache(*args, **kwargs)
+
+    monkeypatch.setattr(classifier, "ContentCache", counting_cache)
+    cfg = Settings(content_cache=True, classification=DEFAULT_RULES)
+    for name in ("a.jpg", "b.mp3", "c.txt"):
+        (tmp_path / name).write_text("x")
+        classify(tmp_path / name, cfg)
+    assert len(opened) == 1
+
+    cfg.classification = {"Pics": {"extensions": [".jpg"]}}
+    assert classify(tmp_path / "a.jpg", cfg) == "Pics"
+    assert len(opened) == 2
@@ -12,7 +12,7 @@ def test_extension_rule(tmp_path):
 def test_mimetype_rule(tmp_path, monkeypatch):
     f = tmp_path / "bar.bin"
     f.write_bytes(b"x")
-    monkeypatch.setattr(magic, "from_file", lambda *a, **k: "audio/flac")
+    monkeypatch.setattr(magic, "from_buffer", lambda *a, **k: "audio/flac")
     rules = {"Music": {"mimetypes": ["audio/flac"]}}
     assert classify_file(f, rules) == "Music"
 
@@ -29,3 +29,78 @@ def test_priority_and_destination(tmp_path):
         },
     }
     assert classify_file(f, rules) == "Images/Screenshots"
+
+
+def test_compiled_rules_skip_mime_when_extension_wins(tmp_path, monkeypatch):
+    from sorter.classifier import CompiledRuleSet
+
+    f = tmp_path / "clip.mp4"
+    f.write_text("data")
+    calls = []
+
+    def fake_from_buffer(buf, mime=False):
+        calls.append(buf)
+        return "audio/flac"
+
+    monkeypatch.setattr(magic, "from_buffer", fake_from_buffer)
+    rules = CompiledRuleSet(
+        {
+            "Music": {"mimetypes": ["audio/flac"], "priority": 1},
+            "Videos": {"extensions": [".mp4"], "priority": 5},
+        }
+    )
+    assert classify_file(f, rules) == "Videos"
+    assert calls == []
+
+    g = tmp_path / "song.bin"
+    g.write_text("data")
+    assert classify_file(g, rules) == "Music"
+    assert len(calls) == 1
+
+
+def test_compiled_rules_mime_outranks_extension(tmp_path, monkeypatch):
+    from sorter.classifier import CompiledRuleSet
+
+    f = tmp_path / "clip.mp4"
+    f.write_text("data")
+    monkeypatch.setattr(magic, "from_buffer", lambda *a, **k: "audio/flac")
+    rules = {
+        "Videos": {"extensions": [".mp4"]},
+        "Music": {"mimetypes": ["audio/flac"], "priority": 10},
+    }
+    assert classify_file(f, CompiledRuleSet(rules)) == "Music"
+    assert classify_file(f, rules) == "Music"
+
+
+def test_header_read_once_for_mime_and_plugins(tmp_path, monkeypatch):
+    from sorter.header import FileHeader
+    from sorter.plugin_manager import PluginManager
+
+    f = tmp_path / "song.bin"
+    f.write_bytes(b"fLaC" + b"\0" * 100)
+    monkeypatch.setattr(magic, "from_buffer", lambda buf, mime=False: "audio/flac")
+    header = FileHeader(f)
+    manager = PluginManager({})
+    opened = []
+    real_open = type(f).open
+
+    def counting_open(self, *args, **kwargs):
+        opened.append(self)
+        return real_open(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(f), "open", counting_open)
+    rules = {"Music": {"mimetypes": ["audio/flac"]}}
+    assert classify_file(f, rules, header=header) == "Music"
+    sniffed = []
+
+    class Plugin:
+        name = "sniff"
+
+        def rename_from_header(self, h):
+            sniffed.append(h.data[:4])
+            return None
+
+    manager.renamer_plugins = [Plugin()]
+    assert manager.rename_with_plugin(f, header=header) is None
+    assert sniffed == [b"fLaC"]
+    assert opened == [f]
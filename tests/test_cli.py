@@ -1,5 +1,6 @@
 from conftest import run_cli
 from sorter.config import Settings
+from sorter.scanner import FileRecord
 
 
 def test_dupes_command(tmp_path, monkeypatch):
@@ -8,13 +9,13 @@ def test_dupes_command(tmp_path, monkeypatch):
     a.write_text("x")
     b.write_text("x")
 
-    def fake_scan(dirs):
-        return [a, b]
+    def fake_scan(dirs, **kwargs):
+        return iter([a, b])
 
-    monkeypatch.setattr("sorter.cli.scan_paths", fake_scan)
+    monkeypatch.setattr("sorter.cli.iter_records", fake_scan)
     monkeypatch.setattr(
-        "sorter.cli.find_duplicates",
-        lambda files, *, algorithm="sha256": {"deadbeef": [a, b]},
+        "sorter.cli.iter_duplicate_groups",
+        lambda files, *, algorithm="sha256", **kwargs: iter([("deadbeef", [a, b])]),
     )
     result = run_cli(["dupes", str(tmp_path)])
     assert result.exit_code == 0
@@ -24,18 +25,37 @@ def test_dupes_command(tmp_path, monkeypatch):
 def test_dupes_algorithm_option(tmp_path, monkeypatch):
     calls = {}
 
-    def fake_scan(dirs):
-        return []
+    def fake_scan(dirs, **kwargs):
+        return iter([])
 
-    def fake_find(files, *, algorithm="sha256", validate_full=True):
+    def fake_find(files, *, algorithm="sha256", workers=1, **kwargs):
         calls["alg"] = algorithm
-        return {}
+        calls["workers"] = workers
+        return iter([])
 
-    monkeypatch.setattr("sorter.cli.scan_paths", fake_scan)
-    monkeypatch.setattr("sorter.cli.find_duplicates", fake_find)
-    result = run_cli(["dupes", str(tmp_path), "--algorithm", "md5"])
+    monkeypatch.setattr("sorter.cli.iter_records", fake_scan)
+    monkeypatch.setattr("sorter.cli.iter_duplicate_groups", fake_find)
+    result = run_cli(["dupes", str(tmp_path), "--algorithm", "md5", "--workers", "4"])
     assert result.exit_code == 0
     assert calls["alg"] == "md5"
+    assert calls["workers"] == 4
+
+
+def test_dupes_json_lines(tmp_path):
+    import json
+
+    (tmp_path / "a.txt").write_text("same")
+    (tmp_path / "b.txt").write_text("same")
+    (tmp_path / "c.txt").write_text("diff")
+    result = run_cli(["dupes", str(tmp_path), "--json-lines"])
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.stdout.splitlines()]
+    assert len(records) == 1
+    assert records[0]["size"] == 4
+    assert sorted(records[0]["paths"]) == [
+        str(tmp_path / "a.txt"),
+        str(tmp_path / "b.txt"),
+    ]
 
 
 def test_schedule_command(tmp_path, monkeypatch):
@@ -148,11 +168,11 @@ def test_move_destination_exists(tmp_path, monkeypatch):
         def __init__(self, cfg):
             pass
 
-        def rename_with_plugin(self, path):
+        def rename_with_plugin(self, path, **kwargs):
             return None
 
     monkeypatch.setattr("sorter.planner.PluginManager", PM)
-    monkeypatch.setattr("sorter.planner.classify_file", lambda p, r: None)
+    monkeypatch.setattr("sorter.planner.classify_file", lambda p, r, **k: None)
     monkeypatch.setattr("sorter.planner.generate_name", lambda *a, **k: conflict)
     monkeypatch.setattr(
         "sorter.cli.build_report", lambda *a, **k: tmp_path / "rep.xlsx"
@@ -175,8 +195,11 @@ def test_report_format_option(tmp_path, monkeypatch):
     src = tmp_path / "a.txt"
     src.write_text("x")
 
-    monkeypatch.setattr("sorter.planner.scan_paths", lambda dirs: [src])
-    monkeypatch.setattr("sorter.planner.classify_file", lambda p, r: None)
+    monkeypatch.setattr(
+        "sorter.planner.iter_records",
+        lambda dirs, **kwargs: iter([FileRecord.from_path(src)]),
+    )
+    monkeypatch.setattr("sorter.planner.classify_file", lambda p, r, **k: None)
     monkeypatch.setattr(
         "sorter.planner.generate_name", lambda *a, **k: tmp_path / "dest" / "a.txt"
     )
@@ -259,3 +282,41 @@ def test_move_permission_denied(monkeypatch, tmp_path):
         ]
     )
     assert result.exit_code == 1
+
+
+def test_scan_workers_option(tmp_path, monkeypatch):
+    calls = {}
+
+    def fake_scan(dirs, *, workers=1, incremental=False):
+        calls["workers"] = workers
+        calls["incremental"] = incremental
+        return []
+
+    monkeypatch.setattr("sorter.cli.scan_paths", fake_scan)
+    result = run_cli(["scan", str(tmp_path), "--scan-workers", "4"])
+    assert result.exit_code == 0
+    assert calls == {"workers": 4, "incremental": False}
+
+    result = run_cli(["scan", str(tmp_path), "--incremental"])
+    assert result.exit_code == 0
+    assert calls == {"workers": 1, "incremental": True}
+
+
+def test_dupes_hardlink(tmp_path, monkeypatch):
+    import os
+
+    a = tmp_path / "a.txt"
+    b = tmp_path / "b.txt"
+    a.write_text("same")
+    b.write_text("same")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("builtins.input", lambda *_: "y")
+    result = run_cli(["dupes", str(tmp_path), "--hardlink"])
+    assert result.exit_code == 0
+    assert os.path.samefile(a, b)
+    assert list(tmp_path.glob("file-dedupe-log_*.jsonl"))
+
+
+def test_dupes_hardlink_conflicts_with_delete_older(tmp_path):
+    result = run_cli(["dupes", str(tmp_path), "--hardlink", "--delete-older"])
+    assert result.exit_code == 1
@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+from sorter.dedupe import link_duplicates
+from sorter import rollback
+
+
+def _make(path, data=b"same"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_hardlink_and_rollback(tmp_path):
+    a = _make(tmp_path / "a.txt")
+    b = _make(tmp_path / "sub" / "b.txt")
+    os.chmod(b, 0o600)
+    os.utime(b, ns=(1_000_000_000, 1_000_000_000))
+    log = link_duplicates([[b, a]], log_path=tmp_path / "log.jsonl")
+
+    assert os.path.samefile(a, b)
+    rec = json.loads(log.read_text())
+    assert rec["op"] == "hardlink"
+    assert (rec["src"], rec["dst"]) == (a.as_posix(), b.as_posix())
+    assert not list(tmp_path.rglob("*.file-sorter-link"))
+
+    rollback(log)
+    assert not os.path.samefile(a, b)
+    assert a.read_bytes() == b.read_bytes() == b"same"
+    st = os.stat(b)
+    assert st.st_mode & 0o777 == 0o600
+    assert st.st_mtime_ns == 1_000_000_000
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() != 0, reason="needs chown rights"
+)
+def test_rollback_restores_owner(tmp_path):
+    a = _make(tmp_path / "a.txt")
+    b = _make(tmp_path / "b.txt")
+    os.chown(b, 1234, 5678)
+    log = link_duplicates([[a, b]], log_path=tmp_path / "log.jsonl")
+    assert json.loads(log.read_text())["uid"] == 1234
+
+    rollback(log)
+    st = b.stat()
+    assert (st.st_uid, st.st_gid) == (1234, 5678)
+    assert st.st_ino != a.stat().st_ino
+
+
+def test_skips_linked_and_changed_files(tmp_path):
+    a = _make(tmp_path / "a.txt")
+    b = tmp_path / "b.txt"
+    b.hardlink_to(a)
+    c = _make(tmp_path / "c.txt", b"edited")
+    log = link_duplicates([[a, b, c]], log_path=tmp_path / "log.jsonl")
+    assert log.read_text() == ""
+    assert c.read_bytes() == b"edited"
+    assert not os.path.samefile(a, c)
+
+
+def test_reflink_falls_back_to_hardlink(tmp_path):
+    a = _make(tmp_path / "a.txt")
+    b = _make(tmp_path / "b.txt")
+    log = link_duplicates([[a, b]], mode="reflink", log_path=tmp_path / "log.jsonl")
+    rec = json.loads(log.read_text())
+    assert rec["op"] in {"reflink", "hardlink"}
+    assert os.path.samefile(a, b) == (rec["op"] == "hardlink")
+    assert b.read_bytes() == b"same"
+
+
+def test_journal_is_synced_before_each_link(tmp_path, monkeypatch):
+    from sorter import dedupe
+
+    keeper, dup = tmp_path / "a.bin", tmp_path / "b.bin"
+    keeper.write_bytes(b"same")
+    dup.write_bytes(b"same")
+    log_path = tmp_path / "log.jsonl"
+    events = []
+    real_fsync, real_replace = os.fsync, os.replace
+    monkeypatch.setattr(
+        dedupe.os, "fsync", lambda fd: events.append("fsync") or real_fsync(fd)
+    )
+    monkeypatch.setattr(
+        dedupe.os,
+        "replace",
+        lambda a, b: events.append("replace") or real_replace(a, b),
+    )
+    dedupe.link_duplicates([[keeper, dup]], log_path=log_path)
+    assert events[-2:] == ["fsync", "replace"]
@@ -1,6 +1,6 @@
 import pathlib
 
-from sorter.dupes import find_duplicates, delete_older
+from sorter.dupes import find_duplicates, delete_older, iter_duplicate_groups
 
 
 def _make(tmp: pathlib.Path, name: str, data: bytes) -> pathlib.Path:
@@ -42,3 +42,93 @@ def test_delete_older(tmp_path):
 
     deleted = delete_older([a, b])
     assert deleted == [a] and not a.exists() and b.exists()
+
+
+def test_size_buckets_skip_unique_sizes(tmp_path, monkeypatch):
+    from sorter import dupes
+    from sorter.dupes import DupeStats
+    from sorter.scanner import FileRecord
+
+    a = _make(tmp_path, "a.txt", b"same")
+    b = _make(tmp_path, "b.txt", b"same")
+    c = _make(tmp_path, "c.txt", b"diff")
+    d = _make(tmp_path, "d.txt", b"unique size")
+    hashed = []
+    real_quick = dupes._quick_hash
+
+    def counting_quick(path, *args, **kwargs):
+        hashed.append(path)
+        return real_quick(path, *args, **kwargs)
+
+    monkeypatch.setattr(dupes, "_quick_hash", counting_quick)
+    stats = DupeStats()
+    groups = find_duplicates(
+        [a, FileRecord.from_path(b), c, FileRecord.from_path(d)], stats=stats
+    )
+    assert list(groups.values()) == [[a, b]]
+    assert d not in hashed
+    assert (stats.files, stats.unique_size, stats.unique_quick) == (4, 1, 1)
+    assert (stats.unique_full, stats.duplicates) == (0, 2)
+
+
+def test_parallel_hashing_matches_serial(tmp_path):
+    files = []
+    for i in range(12):
+        files.append(_make(tmp_path, f"a{i}.bin", bytes([i % 3]) * 200_000))
+        files.append(_make(tmp_path, f"b{i}.bin", bytes([i]) * 1000))
+    serial = find_duplicates(files)
+    assert find_duplicates(files, workers=4, max_inflight=128 * 1024) == serial
+    assert find_duplicates(files, workers=2, per_device=True) == serial
+    assert len(serial) == 3
+
+
+def test_progressive_stages_rule_out_differing_middles(tmp_path, monkeypatch):
+    from sorter import dupes
+    from sorter.dupes import DupeStats
+
+    head, tail = b"h" * 100_000, b"t" * 100_000
+    a = _make(tmp_path, "a.bin", head + b"a" * 1_000_000 + tail)
+    b = _make(tmp_path, "b.bin", head + b"b" * 1_000_000 + tail)
+    c = _make(tmp_path, "c.bin", head + b"a" * 1_000_000 + tail)
+    fully_hashed = []
+    real_full = dupes._full_hash
+
+    def counting_full(path, **kwargs):
+        fully_hashed.append(path)
+        return real_full(path, **kwargs)
+
+    monkeypatch.setattr(dupes, "_full_hash", counting_full)
+    stats = DupeStats()
+    groups = find_duplicates(
+        [a, b, c], stages=2, stage_samples=4, stage_block=4096, stats=stats
+    )
+    assert list(groups.values()) == [[a, c]]
+    assert stats.unique_quick == 0
+    assert stats.unique_sampled == 1
+    assert sorted(fully_hashed) == [a, c]
+    assert find_duplicates([a, b, c]) == groups
+
+
+def test_iter_duplicate_groups_yields_per_batch(tmp_path, monkeypatch):
+    from sorter import dupes
+
+    files = []
+    for i in range(4):
+        files.append(_make(tmp_path, f"a{i}.bin", bytes([i]) * (100 + i)))
+        files.append(_make(tmp_path, f"b{i}.bin", bytes([i]) * (100 + i)))
+    hashed = []
+    real_full = dupes._full_hash
+
+    def counting_full(path, **kwargs):
+        hashed.append(path)
+        return real_full(path, **kwargs)
+
+    monkeypatch.setattr(dupes, "_full_hash", counting_full)
+    groups = iter_duplicate_groups(files, batch_size=2)
+    digest, paths = next(groups)
+    assert paths == [files[0], files[1]]
+    # only the first size bucket has been hashed so far
+    assert sorted(hashed) == sorted(paths)
+    rest = dict(groups)
+    assert len(rest) == 3
+    assert {digest: paths, **rest} == find_duplicates(files)
@@ -52,9 +52,7 @@ def test_move_command_with_classification(tmp_path):
     assert result.exit_code == 0
     assert not (source_dir / "image.jpg").exists()
     assert not (source_dir / "document.pdf").exists()
-    assert (
-        dest_dir / "Images" / f"{source_dir.name}_2025-06-30_image.jpg"
-    ).exists()
+    assert (dest_dir / "Images" / f"{source_dir.name}_2025-06-30_image.jpg").exists()
     assert (
         dest_dir / "Documents" / f"{source_dir.name}_2025-06-30_document.pdf"
     ).exists()
@@ -171,3 +169,21 @@ def test_full_sort_operation(tmp_path):
     for original, target in mapping:
         assert not original.exists()
         assert target.exists()
+
+
+def test_move_dry_run_with_plan_workers(tmp_path):
+    source_dir = tmp_path / "source"
+    create_dummy_file(source_dir / "a" / "image.jpg")
+    create_dummy_file(source_dir / "b" / "image.jpg")
+    result = run_cli(
+        [
+            "move",
+            str(source_dir),
+            "--dest",
+            str(tmp_path / "destination"),
+            "--plan-workers",
+            "2",
+        ]
+    )
+    assert result.exit_code == 0
+    assert not (tmp_path / "destination").exists()
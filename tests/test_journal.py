@@ -0,0 +1,150 @@
+import hashlib
+import json
+
+import pytest
+
+from conftest import run_cli
+from sorter import rollback
+from sorter.journal import iter_entries, plan_path, read_progress, write_plan
+from sorter.mover import move_with_log, resume_moves
+
+
+def _files(tmp_path, n):
+    src_dir, out = tmp_path / "in", tmp_path / "out"
+    src_dir.mkdir()
+    mapping = []
+    for i in range(n):
+        src = src_dir / f"{i}.txt"
+        src.write_text(f"file {i}")
+        mapping.append((src, out / src.name))
+    return mapping
+
+
+def test_moves_are_committed_and_plan_removed(tmp_path):
+    mapping = _files(tmp_path, 3)
+    log_path = tmp_path / "log.jsonl"
+    move_with_log(mapping, show_progress=False, log_path=log_path)
+
+    intents, done = read_progress(log_path)
+    assert sorted(intents) == sorted(done) == [0, 1, 2]
+    assert not plan_path(log_path).exists()
+    assert len(list(iter_entries(log_path))) == 3
+    rollback(log_path)
+    assert all(src.exists() for src, _ in mapping)
+
+
+def test_interrupted_run_is_resumed(tmp_path, monkeypatch):
+    mapping = _files(tmp_path, 4)
+    log_path = tmp_path / "log.jsonl"
+    real_rename = __import__("os").rename
+    calls = []
+
+    def crash_on_third(a, b):
+        calls.append(a)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        real_rename(a, b)
+
+    monkeypatch.setattr("sorter.mover.os.rename", crash_on_third)
+    with pytest.raises(KeyboardInterrupt):
+        move_with_log(mapping, show_progress=False, log_path=log_path)
+    monkeypatch.setattr("sorter.mover.os.rename", real_rename)
+    assert plan_path(log_path).exists()
+    assert read_progress(log_path)[1] == {0, 1}
+
+    resume_moves(log_path, show_progress=False)
+    assert all(dst.exists() and not src.exists() for src, dst in mapping)
+    assert read_progress(log_path)[1] == {0, 1, 2, 3}
+    assert not plan_path(log_path).exists()
+    with pytest.raises(FileNotFoundError):
+        resume_moves(log_path, show_progress=False)
+
+    rollback(log_path)
+    assert all(src.exists() and not dst.exists() for src, dst in mapping)
+    assert sorted(p.name for p in mapping[0][0].parent.iterdir()) == [
+        "0.txt",
+        "1.txt",
+        "2.txt",
+        "3.txt",
+    ]
+
+
+def test_undo_skips_failed_move(tmp_path, monkeypatch):
+    mapping = _files(tmp_path, 2)
+    log_path = tmp_path / "log.jsonl"
+    real_rename = __import__("os").rename
+
+    def deny_second(a, b):
+        if str(a).endswith("1.txt"):
+            raise PermissionError(a)
+        real_rename(a, b)
+
+    monkeypatch.setattr("sorter.mover.os.rename", deny_second)
+    with pytest.raises(PermissionError):
+        move_with_log(mapping, show_progress=False, log_path=log_path)
+    assert [rec["seq"] for rec in iter_entries(log_path)] == [0]
+
+    rollback(log_path)
+    assert sorted(p.name for p in mapping[0][0].parent.iterdir()) == [
+        "0.txt",
+        "1.txt",
+    ]
+
+
+def test_resume_settles_moves_lost_in_a_crash(tmp_path):
+    mapping = _files(tmp_path, 4)
+    log_path = tmp_path / "log.jsonl"
+    write_plan(log_path, mapping)
+    (s0, d0), (s1, d1), (s2, d2), (s3, d3) = mapping
+    d0.parent.mkdir()
+    # moved and committed; moved without any record; copied across devices
+    # but the source still exists; never started
+    s0.rename(d0)
+    s1.rename(d1)
+    d2.write_bytes(s2.read_bytes())
+    digest = hashlib.sha256(s2.read_bytes()).hexdigest()
+    (d3.parent / f".{d3.name}.123.file-sorter-part").write_text("partial")
+    records = [
+        {"src": str(s0), "dst": str(d0), "sha256": None, "size": 6, "seq": 0},
+        {"op": "commit", "seq": 0},
+        {"src": str(s2), "dst": str(d2), "sha256": digest, "size": 6, "seq": 2},
+    ]
+    log_path.write_text("".join(json.dumps(r) + "\n" for r in records) + '{"op": "comm')
+
+    resume_moves(log_path, show_progress=False)
+    assert all(dst.exists() and not src.exists() for src, dst in mapping)
+    assert sorted(p.name for p in d0.parent.iterdir()) == [
+        "0.txt",
+        "1.txt",
+        "2.txt",
+        "3.txt",
+    ]
+    assert read_progress(log_path)[1] == {0, 1, 2, 3}
+
+
+def test_resume_command_without_plan(tmp_path):
+    log_path = tmp_path / "log.jsonl"
+    log_path.write_text("")
+    result = run_cli(["resume", str(log_path)])
+    assert result.exit_code == 1
+
+
+def test_resume_lists_each_directory_once(tmp_path, monkeypatch):
+    mapping = _files(tmp_path, 6)
+    log_path = tmp_path / "log.jsonl"
+    write_plan(log_path, mapping)
+    log_path.write_text("")
+    out = mapping[0][1].parent
+    out.mkdir()
+    (out / ".0.txt.99.file-sorter-part").write_text("partial")
+    listed = []
+    real_listdir = __import__("os").listdir
+    monkeypatch.setattr(
+        "sorter.mover.os.listdir", lambda p: listed.append(p) or real_listdir(p)
+    )
+
+    resume_moves(log_path, show_progress=False)
+    assert all(dst.exists() and not src.exists() for src, dst in mapping)
+    assert not (out / ".0.txt.99.file-sorter-part").exists()
+    # once to settle the unfinished moves, once in the preflight
+    assert listed.count(out) == 2
@@ -0,0 +1,83 @@
+import os
+
+from conftest import run_cli
+from sorter.config import Settings
+from sorter.library import LibraryIndex
+from sorter.mover import move_with_log
+from sorter.planner import Planner
+
+
+def _planner():
+    return Planner({"Docs": {"extensions": [".txt"]}}, Settings())
+
+
+def test_moves_are_indexed_and_flagged(tmp_path, caplog):
+    src, dest = tmp_path / "in", tmp_path / "lib"
+    src.mkdir()
+    (src / "a.txt").write_text("report")
+    index = LibraryIndex(dest, tmp_path / "library.db")
+    mapping = _planner().plan([src], dest, library=index)
+    move_with_log(
+        mapping, show_progress=False, log_path=tmp_path / "log.jsonl", library=index
+    )
+    (moved,) = [dst for _, dst in mapping]
+    assert len(index) == 1
+
+    (src / "copy.txt").write_text("report")
+    (src / "other.txt").write_text("notes!")
+    planner = _planner()
+    reopened = LibraryIndex(dest, tmp_path / "library.db")
+    with caplog.at_level("WARNING", logger="sorter.planner"):
+        mapping = planner.plan([src], dest, library=reopened)
+    assert len(mapping) == 2
+    assert planner.in_library == [(src / "copy.txt", moved)]
+    assert f"{src / 'copy.txt'} is already in the library as {moved}" in caplog.text
+
+    mapping = planner.plan([src], dest, library=reopened, skip_existing=True)
+    assert [s for s, _ in mapping] == [src / "other.txt"]
+
+
+def test_update_indexes_existing_library(tmp_path):
+    dest = tmp_path / "lib"
+    (dest / "Docs").mkdir(parents=True)
+    kept = dest / "Docs" / "a.txt"
+    kept.write_text("same")
+    gone = dest / "Docs" / "b.txt"
+    gone.write_text("gone")
+    index = LibraryIndex(dest, tmp_path / "library.db")
+    assert index.update() == (2, 0)
+    assert index.update() == (0, 0)
+
+    gone.unlink()
+    assert index.update() == (0, 1)
+    incoming = tmp_path / "new.txt"
+    incoming.write_text("same")
+    assert index.find(incoming) == kept
+
+    # changed since it was indexed: no longer a match
+    kept.write_text("SAME")
+    os.utime(kept, ns=(1, 1))
+    assert index.find(incoming) is None
+    assert len(index) == 0
+
+
+def test_nested_libraries_keep_their_own_entries(tmp_path):
+    outer = tmp_path / "lib"
+    inner = outer / "Docs"
+    inner.mkdir(parents=True)
+    (inner / "a.txt").write_text("x")
+    db = tmp_path / "library.db"
+    assert LibraryIndex(outer, db).update() == (1, 0)
+    assert LibraryIndex(inner, db).update() == (1, 0)
+    assert LibraryIndex(outer, db).update() == (0, 0)
+    assert len(LibraryIndex(outer, db)) == len(LibraryIndex(inner, db)) == 1
+
+
+def test_library_index_command(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    dest = tmp_path / "lib"
+    dest.mkdir()
+    (dest / "a.txt").write_text("x")
+    result = run_cli(["library", "index", str(dest)])
+    assert result.exit_code == 0
+    assert len(LibraryIndex(dest)) == 1
@@ -1,30 +1,239 @@
-from pathlib import Path
-from unittest.mock import MagicMock, mock_open, patch
+import hashlib
+import os
+import pathlib
+import stat
+from unittest.mock import patch
 
+import pytest
+
+from sorter import rollback
+from sorter.journal import iter_entries
 from sorter.mover import Mover, move_with_log
 
 
-@patch("shutil.move")
-@patch("pathlib.Path.exists", return_value=False)
-@patch("pathlib.Path.mkdir")
-@patch("sorter.mover.sha256sum", return_value="deadbeef")
-@patch("pathlib.Path.stat")
-def test_move_with_log_mocked(
-    mock_stat, mock_sha256, mock_mkdir, mock_exists, mock_move
-):
-    """move_with_log should create directories and call shutil.move."""
-    fake_stat = MagicMock(st_size=3)
-    mock_stat.return_value = fake_stat
-    m_open = mock_open()
-    with patch("pathlib.Path.open", m_open):
-        src = Path("/tmp/a.txt")
-        dst = Path("/tmp/out/a.txt")
-        log_path = Path("/tmp/log.jsonl")
+def test_move_with_log_renames_on_same_device(tmp_path):
+    """Same-device moves are plain renames that keep the inode."""
+    src = tmp_path / "a.txt"
+    src.write_text("abc")
+    ino = src.stat().st_ino
+    dst = tmp_path / "out" / "a.txt"
+    log_path = tmp_path / "log.jsonl"
+    with patch("sorter.mover._copy_hashed") as mock_copy:
         result = move_with_log([(src, dst)], show_progress=False, log_path=log_path)
 
-    mock_mkdir.assert_called_with(parents=True, exist_ok=True)
-    mock_move.assert_called_once_with(src, dst)
+    mock_copy.assert_not_called()
     assert result == log_path
+    assert not src.exists() and dst.stat().st_ino == ino
+    (entry,) = iter_entries(log_path)
+    assert entry["sha256"] == hashlib.sha256(b"abc").hexdigest()
+    assert (entry["size"], entry["category"]) == (3, "out")
+
+
+def test_move_with_log_skips_hashing_renames(tmp_path):
+    src = tmp_path / "a.txt"
+    src.write_text("abc")
+    dst = tmp_path / "out" / "a.txt"
+    log_path = tmp_path / "log.jsonl"
+    with patch("sorter.mover.sha256sum") as mock_sha:
+        move_with_log(
+            [(src, dst)], show_progress=False, log_path=log_path, hash_renames=False
+        )
+    mock_sha.assert_not_called()
+    (entry,) = iter_entries(log_path)
+    assert entry["sha256"] is None
+
+    rollback(log_path)
+    assert src.read_text() == "abc" and not dst.exists()
+
+
+def test_move_with_log_copies_and_hashes_across_devices(tmp_path, monkeypatch):
+    src = tmp_path / "a.bin"
+    data = os.urandom(3 * 1024 * 1024 + 7)
+    src.write_bytes(data)
+    os.utime(src, ns=(1_000_000_000, 1_000_000_000))
+    dst = tmp_path / "out" / "a.bin"
+    log_path = tmp_path / "log.jsonl"
+    real_stat = pathlib.Path.stat
+
+    def other_device(self, **kwargs):
+        st = real_stat(self, **kwargs)
+        if self == dst.parent:
+            fields = list(st)
+            fields[stat.ST_DEV] += 1
+            return os.stat_result(fields)
+        return st
+
+    reads = []
+    real_open = pathlib.Path.open
+
+    def counting_open(self, mode="r", *args, **kwargs):
+        if self == src:
+            reads.append(mode)
+        return real_open(self, mode, *args, **kwargs)
+
+    monkeypatch.setattr(pathlib.Path, "stat", other_device)
+    monkeypatch.setattr(pathlib.Path, "open", counting_open)
+    monkeypatch.setattr("sorter.mover.sha256sum", None)  # must not be needed
+    move_with_log([(src, dst)], show_progress=False, log_path=log_path)
+
+    assert reads == ["rb"]
+    assert not src.exists() and dst.read_bytes() == data
+    assert os.stat(dst).st_mtime_ns == 1_000_000_000
+    assert not list(dst.parent.glob(".*"))
+    (entry,) = iter_entries(log_path)
+    assert entry["sha256"] == hashlib.sha256(data).hexdigest()
+
+
+def test_rename_across_bind_mounts_falls_back_to_copy(tmp_path, monkeypatch):
+    import errno
+
+    src = tmp_path / "a.txt"
+    src.write_text("abc")
+    dst = tmp_path / "out" / "a.txt"
+    log_path = tmp_path / "log.jsonl"
+    synced = []
+    real_fsync = os.fsync
+
+    def no_rename(a, b):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr("sorter.mover.os.rename", no_rename)
+    monkeypatch.setattr(
+        "sorter.mover.os.fsync", lambda fd: synced.append(fd) or real_fsync(fd)
+    )
+    move_with_log([(src, dst)], show_progress=False, log_path=log_path)
+
+    assert not src.exists() and dst.read_text() == "abc"
+    assert len(synced) >= 2  # the copy and its directory
+    (entry,) = iter_entries(log_path)
+    assert entry["sha256"] == hashlib.sha256(b"abc").hexdigest()
+
+
+def test_copy_metadata_is_set_before_sync(tmp_path, monkeypatch):
+    import shutil
+
+    from sorter.mover import _copy_hashed
+
+    src = tmp_path / "a.txt"
+    src.write_text("abc")
+    os.utime(src, ns=(1_000_000_000, 1_000_000_000))
+    calls = []
+    real_copystat, real_fsync = shutil.copystat, os.fsync
+
+    def copystat(a, b):
+        calls.append("copystat")
+        real_copystat(a, b)
+
+    def fsync(fd):
+        calls.append("fsync")
+        real_fsync(fd)
+
+    monkeypatch.setattr("sorter.mover.shutil.copystat", copystat)
+    monkeypatch.setattr("sorter.mover.os.fsync", fsync)
+    _copy_hashed(src, tmp_path / "b.txt")
+    assert calls == ["copystat", "fsync"]
+    assert (tmp_path / "b.txt").stat().st_mtime_ns == 1_000_000_000
+
+
+def test_parallel_moves_respect_device_limits(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    srcs = []
+    for i in range(20):
+        src = tmp_path / "in" / f"{i}.txt"
+        src.parent.mkdir(exist_ok=True)
+        src.write_text(str(i))
+        srcs.append(src)
+    mapping = [(src, tmp_path / "out" / src.name) for src in srcs]
+    active, peak = [0], [0]
+    lock = threading.Lock()
+    real_rename = os.rename
+
+    def slow_rename(a, b):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        real_rename(a, b)
+
+    monkeypatch.setattr("sorter.mover.os.rename", slow_rename)
+    reported = []
+    log_path = tmp_path / "log.jsonl"
+    move_with_log(
+        mapping,
+        show_progress=False,
+        log_path=log_path,
+        progress_callback=lambda pct, p: reported.append((pct, p)),
+        workers=8,
+        per_dest=3,
+    )
+
+    assert 1 < peak[0] <= 3
+    assert all(dst.exists() for _, dst in mapping)
+    entries = list(iter_entries(log_path))
+    assert sorted(e["src"] for e in entries) == sorted(s.as_posix() for s in srcs)
+    assert [pct for pct, _ in reported] == sorted(pct for pct, _ in reported)
+    assert reported[-1][0] == 100 and {p for _, p in reported} == set(srcs)
+
+    rollback(log_path)
+    assert all(src.exists() for src in srcs)
+
+
+def test_parallel_moves_stop_on_error(tmp_path):
+    good = tmp_path / "a.txt"
+    good.write_text("a")
+    missing = tmp_path / "missing.txt"
+    out = tmp_path / "out"
+    mapping = [(missing, out / "m.txt"), (good, out / "a.txt")]
+    with pytest.raises(FileNotFoundError):
+        move_with_log(
+            mapping, show_progress=False, log_path=tmp_path / "log.jsonl", workers=2
+        )
+
+
+def test_preflight_reports_every_conflict(tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "a.txt").write_text("old")
+    srcs = [tmp_path / n for n in ("a.txt", "b.txt", "c.txt", "d.txt")]
+    for src in srcs:
+        src.write_text("new")
+    mapping = [
+        (srcs[0], out / "a.txt"),
+        (srcs[1], out / "Docs" / "b.txt"),
+        (srcs[2], out / "Docs" / "b.txt"),
+        (srcs[3], out / "A.TXT"),
+    ]
+    log_path = tmp_path / "log.jsonl"
+    with pytest.raises(FileExistsError, match="3 destinations"):
+        move_with_log(mapping, show_progress=False, log_path=log_path)
+    assert all(src.exists() for src in srcs)
+    assert not (out / "Docs").exists() and not log_path.exists()
+
+
+def test_preflight_lists_and_creates_each_directory_once(tmp_path, monkeypatch):
+    mapping = []
+    for i in range(30):
+        src = tmp_path / f"{i}.txt"
+        src.write_text(str(i))
+        mapping.append((src, tmp_path / "out" / f"cat{i % 3}" / src.name))
+    (tmp_path / "out").mkdir()
+    listed, made = [], []
+    real_listdir, real_mkdir = os.listdir, pathlib.Path.mkdir
+    monkeypatch.setattr(
+        "sorter.mover.os.listdir", lambda p: listed.append(p) or real_listdir(p)
+    )
+    monkeypatch.setattr(
+        pathlib.Path,
+        "mkdir",
+        lambda self, *a, **k: made.append(self) or real_mkdir(self, *a, **k),
+    )
+    move_with_log(mapping, show_progress=False, log_path=tmp_path / "log.jsonl")
+    assert len(listed) == 3 and len(made) == 3
+    assert all(dst.exists() for _, dst in mapping)
 
 
 @patch("shutil.move")
@@ -0,0 +1,16 @@
+from sorter.config import Settings
+from sorter.planner import Planner
+
+
+def test_parallel_planning_matches_serial_plan(tmp_path):
+    for i in range(600):
+        f = tmp_path / "in" / f"d{i % 7}" / f"{i // 7}.{('txt', 'jpg')[i % 2]}"
+        f.parent.mkdir(parents=True, exist_ok=True)
+        f.write_text("x")
+    rules = {"Images": {"extensions": [".jpg"]}}
+    args = ([tmp_path / "in"], tmp_path / "out")
+    serial = Planner(rules, Settings()).plan(*args, pattern="{stem}{ext}")
+    for extra in ({}, {"plan_processes": True}):
+        planner = Planner(rules, Settings(plan_workers=3, **extra))
+        assert planner.plan(*args, pattern="{stem}{ext}") == serial
+    assert len({dst for _, dst in serial}) == 600
@@ -124,3 +124,39 @@ def test_multiple_plugins_order(monkeypatch):
     manager = PluginManager(cfg)
     manager.rename_with_plugin(pathlib.Path("song.mp3"))
     assert calls == ["exif", "id3"]
+
+
+def test_exif_without_date_in_header_is_not_read_again(tmp_path, monkeypatch):
+    from sorter.header import FileHeader
+    from sorter.plugins.exif_renamer import ExifRenamer
+
+    tiff = b"II*\x00\x08\x00\x00\x00" + b"\x00\x00" + b"\x00\x00\x00\x00"
+    app1 = b"Exif\x00\x00" + tiff
+    jpeg = b"\xff\xd8\xff\xe1" + (len(app1) + 2).to_bytes(2, "big") + app1
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(jpeg + b"\xff\xda" + bytes(200_000))
+
+    def full_read(self, p):
+        raise AssertionError("whole file read")
+
+    monkeypatch.setattr(ExifRenamer, "rename", full_read)
+    assert ExifRenamer({"enabled": True}).rename_from_header(FileHeader(path)) is None
+
+
+def test_exif_parse_error_in_header_is_logged(tmp_path, monkeypatch, caplog):
+    from sorter.header import FileHeader
+    from sorter.plugins import exif_renamer
+    from sorter.plugins.exif_renamer import ExifRenamer
+
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(b"\xff\xd8\xff\xda" + bytes(100))
+
+    def broken(f, **kwargs):
+        raise ValueError("corrupt EXIF")
+
+    monkeypatch.setattr(exif_renamer.exifread, "process_file", broken)
+    manager = PluginManager({})
+    manager.renamer_plugins = [ExifRenamer({"enabled": True})]
+    with caplog.at_level("ERROR"):
+        assert manager.rename_with_plugin(path, header=FileHeader(path)) is None
+    assert "corrupt EXIF" in caplog.text
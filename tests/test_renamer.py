@@ -46,3 +46,102 @@ def test_custom_pattern(tmp_path):
     pat = "{date}-{stem}{ext}"
     new_path = generate_name(src, dest, pattern=pat)
     assert new_path.name.startswith("2000-01-01-holiday-photo")
+
+
+def test_record_source_skips_stat(tmp_path):
+    from sorter.scanner import FileRecord
+
+    # The file does not exist: all metadata must come from the record.
+    rec = FileRecord(tmp_path / "in" / "gone.txt", 1, 946684800 * 10**9, 0, 0, 0)
+    new_path = generate_name(rec, tmp_path / "out")
+    assert new_path.name == "in_2000-01-01_gone.txt"
+
+
+def test_allocator_lists_once_and_never_repeats(tmp_path, monkeypatch):
+    from sorter import NameAllocator
+
+    dest = tmp_path / "out"
+    dest.mkdir()
+    (dest / "a.txt").write_text("exists")
+    (dest / "a__3.txt").write_text("exists")
+    listed = []
+    real_listdir = os.listdir
+    monkeypatch.setattr(
+        "sorter.renamer.os.listdir", lambda p: listed.append(p) or real_listdir(p)
+    )
+    names = NameAllocator()
+    got = [names.allocate(dest, "A.txt").name for _ in range(4)]
+    assert got == ["A__2.txt", "A__4.txt", "A__5.txt", "A__6.txt"]
+    assert names.allocate(dest, "b.txt") == dest / "b.txt"
+    assert names.allocate(tmp_path / "new", "b.txt").name == "b.txt"
+    assert len(listed) == 2
+
+
+def test_planner_names_are_unique_within_a_plan(tmp_path):
+    from sorter.config import Settings
+    from sorter.planner import Planner
+
+    for sub in ("x", "y"):
+        _touch(tmp_path / "in" / sub / "in", "same.txt", mtime=946684800)
+    planner = Planner({}, Settings())
+    mapping = planner.plan([tmp_path / "in"], tmp_path / "out")
+    assert len({dst for _, dst in mapping}) == 2
+
+
+def test_generate_names_resolves_once_and_writes_nothing(tmp_path, monkeypatch):
+    from sorter import NameAllocator, generate_names
+
+    srcs = [
+        _touch(tmp_path / sub, name, mtime=946684800)
+        for sub, name in (("x", "a.txt"), ("y", "a.txt"), ("x", "b.txt"))
+    ]
+    dest = tmp_path / "out"
+    single = NameAllocator()
+    expected = [
+        generate_name(s, dest, pattern="{date}-{stem}{ext}", allocator=single)
+        for s in srcs
+    ]
+    resolved = []
+    real_resolve = pathlib.Path.resolve
+    monkeypatch.setattr(
+        pathlib.Path, "resolve", lambda p, *a: resolved.append(p) or real_resolve(p)
+    )
+    got = generate_names(srcs, dest, "{date}-{stem}{ext}")
+    assert got == expected
+    assert [p.name for p in got] == [
+        "2000-01-01-a.txt",
+        "2000-01-01-a__2.txt",
+        "2000-01-01-b.txt",
+    ]
+    assert len(resolved) == 1
+    assert not dest.exists()
+
+
+def test_pattern_with_unknown_token(tmp_path):
+    import pytest
+
+    src = _touch(tmp_path, "a.txt")
+    with pytest.raises(KeyError):
+        generate_name(src, tmp_path / "out", pattern="{nope}{ext}")
+    assert generate_name(src, tmp_path / "out", pattern="{stem:>3}{ext!s}").name == (
+        "  a.txt"
+    )
+
+
+def test_slug_fast_path_matches_slugify():
+    from sorter.renamer import _slug, _slugify
+
+    names = [
+        "IMG_0001",
+        "Holiday Photo (2)",
+        "  --Report__final--  ",
+        "a.b+c=d~e[1]",
+        "Tom's 1,000 notes & more",
+        "résumé Müller",
+        "日本語",
+        "",
+    ]
+    _slug.cache_clear()
+    assert [_slug(n) for n in names] == [_slugify(n) for n in names]
+    assert _slug("IMG_0001") == "img-0001"
+    assert _slug.cache_info().hits == 1
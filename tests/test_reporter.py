@@ -46,3 +46,16 @@ def test_report_json(tmp_path: pathlib.Path) -> None:
 
     df = pd.read_json(jsn_path)
     assert list(df.columns) == ["old_path", "new_path", "size_bytes", "modified_iso"]
+
+
+def test_report_uses_record_metadata(tmp_path: pathlib.Path) -> None:
+    from sorter.scanner import FileRecord
+
+    src = _create(tmp_path, "a.txt", 3)
+    rec = FileRecord(src, 42, 0, 0, 0, 0)
+    dst = tmp_path / "Docs" / "a.txt"
+    out = build_report([(rec, dst)], dest=tmp_path / "r.csv", fmt="csv")
+
+    df = pd.read_csv(out)
+    assert df["size_bytes"].tolist() == [42]
+    assert df["modified_iso"].tolist() == ["1970-01-01T00:00:00Z"]
@@ -35,3 +35,10 @@ def test_delete_flow(tmp_path):
     rq.upsert_files([f])
     rq.mark_delete(f)
     assert rq.select_for_review(now=int(time.time())) == []
+
+
+def test_upsert_accepts_iterator(tmp_path):
+    rq = ReviewQueue(db_path=tmp_path / "db.sqlite")
+    files = [_touch(tmp_path, f"f{i}.txt") for i in range(3)]
+    assert rq.upsert_files(iter(files)) == 3
+    assert set(rq.select_for_review(now=int(time.time()))) == set(files)
@@ -20,7 +20,7 @@ def test_checksum_mismatch(tmp_path, monkeypatch):
     }
     log.write_text(json.dumps(rec) + "\n")
 
-    monkeypatch.setattr(rollback_mod, "_sha256", lambda p: "actual")
+    monkeypatch.setattr(rollback_mod, "_sha256", lambda p, **k: "actual")
     with pytest.raises(ValueError):
         rollback(log, strict=True)
 
@@ -39,7 +39,7 @@ def test_checksum_mismatch_non_strict(tmp_path, monkeypatch):
     }
     log.write_text(json.dumps(rec) + "\n")
 
-    monkeypatch.setattr(rollback_mod, "_sha256", lambda p: "actual")
+    monkeypatch.setattr(rollback_mod, "_sha256", lambda p, **k: "actual")
 
     rollback(log, strict=False)
     assert src.exists() and src.read_text() == "y"
@@ -0,0 +1,95 @@
+import datetime
+import os
+import pathlib
+import shutil
+
+from sorter.config import Settings
+from sorter.planner import Planner
+from sorter.scan_index import ScanIndex
+from sorter.scanner import scan_changes, scan_paths
+
+
+def _age(*dirs: pathlib.Path, ts: int = 1_000_000_000) -> None:
+    for d in dirs:
+        os.utime(d, (ts, ts))
+
+
+def _tree(tmp_path: pathlib.Path) -> pathlib.Path:
+    root = tmp_path / "root"
+    for name in ["a.txt", "x/b.txt", "x/y/c.txt", "z/d.txt"]:
+        f = root / name
+        f.parent.mkdir(parents=True, exist_ok=True)
+        f.write_text("x")
+    _age(root, root / "x", root / "x" / "y", root / "z")
+    return root
+
+
+def test_first_scan_reports_everything(tmp_path):
+    root = _tree(tmp_path)
+    index = ScanIndex(tmp_path / "idx.db")
+    changes = scan_changes([root], index=index)
+    assert changes.added == scan_paths([root])
+    assert changes.removed == []
+
+
+def test_unchanged_directories_are_not_relisted(tmp_path, monkeypatch):
+    root = _tree(tmp_path)
+    index = ScanIndex(tmp_path / "idx.db")
+    scan_changes([root], index=index)
+
+    (root / "x" / "new.txt").write_text("n")
+    _age(root / "x", ts=1_100_000_000)
+
+    listed = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path):
+        listed.append(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    changes = scan_changes([root], index=index)
+    assert changes.added == [root / "x" / "new.txt"]
+    assert changes.removed == []
+    assert listed == [str(root / "x")]
+    assert scan_paths([root], index=index) == scan_paths([root])
+
+
+def test_removed_directory_reports_its_files(tmp_path):
+    root = _tree(tmp_path)
+    index = ScanIndex(tmp_path / "idx.db")
+    scan_changes([root], index=index)
+
+    shutil.rmtree(root / "x")
+    _age(root, ts=1_100_000_000)
+
+    changes = scan_changes([root], index=index)
+    assert changes.added == []
+    assert changes.removed == [root / "x" / "b.txt", root / "x" / "y" / "c.txt"]
+
+
+def test_records_from_index_reflect_in_place_rewrites(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    root = _tree(tmp_path)
+    a = root / "a.txt"
+    planner = Planner({}, Settings(incremental_scan=True))
+
+    def planned():
+        plan = planner.plan([root], tmp_path / "out", pattern="{date}", records=True)
+        return next((rec, dst) for rec, dst in plan if rec.path == a)
+
+    planned()  # fills the index
+    a.write_text("rewritten")
+    os.utime(a, (1_700_000_000, 1_700_000_000))
+    listed = []
+    real_scandir = os.scandir
+
+    def counting_scandir(path):
+        listed.append(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    rec, dst = planned()
+    assert str(root) not in listed
+    assert (rec.size, rec.mtime_ns) == (len("rewritten"), 1_700_000_000 * 10**9)
+    assert dst.name == datetime.date.fromtimestamp(1_700_000_000).isoformat()
@@ -51,3 +51,108 @@ def test_follow_symlinks(tmp_path):
     out2 = scan_paths([root], follow_symlinks=True)
     assert symlink not in out1 and target in out1
     assert target in out2  # real file always present
+
+
+def test_deep_tree_does_not_recurse(tmp_path, monkeypatch):
+    import inspect
+    import os
+    import sys
+
+    root = tmp_path / "deep"
+    current = root
+    os.mkdir(current)
+    for _ in range(200):
+        current = current / "d"
+        os.mkdir(current)
+    leaf = current / "leaf.txt"
+    leaf.write_text("x")
+
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(len(inspect.stack()) + 60)
+    try:
+        found = scan_paths([root])
+    finally:
+        sys.setrecursionlimit(limit)
+    assert found == [leaf]
+
+
+def test_hardlinks_reported_once(tmp_path):
+    root = tmp_path / "r"
+    root.mkdir()
+    original = root / "a.txt"
+    original.write_text("x")
+    (root / "b.txt").hardlink_to(original)
+    assert len(scan_paths([root])) == 1
+
+
+def test_iter_paths_streams(tmp_path):
+    import types
+
+    from sorter.scanner import iter_paths
+
+    root = tmp_path / "s"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.txt").write_text("x")
+    (root / "sub" / "b.txt").write_text("x")
+
+    stream = iter_paths([root])
+    assert isinstance(stream, types.GeneratorType)
+    assert sorted(stream) == scan_paths([root])
+
+
+def test_iter_paths_ordered(tmp_path):
+    from sorter.scanner import iter_paths
+
+    root = tmp_path / "o"
+    for name in ["b/z.txt", "a.txt", "b/a/c.txt", "c.txt", "b-x/d.txt", "B.txt"]:
+        f = root / name
+        f.parent.mkdir(parents=True, exist_ok=True)
+        f.write_text("x")
+    for single in (root / "c.txt", root / "a.txt", root / "b" / "a" / "c.txt"):
+        ordered = list(iter_paths([root, single], ordered=True))
+        assert ordered == scan_paths([root, single])
+        assert ordered == sorted(ordered)
+
+
+def test_parallel_scan_matches_sequential(tmp_path):
+    root = tmp_path / "p"
+    for d in range(5):
+        for i in range(20):
+            f = root / f"d{d}" / f"s{i % 3}" / f"f{i}.txt"
+            f.parent.mkdir(parents=True, exist_ok=True)
+            f.write_text("x")
+    (root / "d0" / "zz.txt").hardlink_to(root / "d4" / "s0" / "f0.txt")
+    (root / "d1" / "loop").symlink_to(root)
+
+    for follow in (False, True):
+        expected = scan_paths([root], follow_symlinks=follow)
+        for workers in (2, 8):
+            got = scan_paths([root], follow_symlinks=follow, workers=workers)
+            assert got == expected
+    assert root / "d0" / "zz.txt" in expected
+
+
+def test_ordered_parallel_rejected(tmp_path):
+    import pytest
+
+    from sorter.scanner import iter_paths
+
+    with pytest.raises(ValueError):
+        list(iter_paths([tmp_path], ordered=True, workers=2))
+
+
+def test_iter_records_carry_stat(tmp_path):
+    from sorter.scanner import iter_records
+
+    f = tmp_path / "a.bin"
+    f.write_bytes(b"12345")
+    (rec,) = iter_records([tmp_path])
+    st = f.stat()
+    assert rec.path == f
+    assert (rec.size, rec.mtime_ns, rec.dev, rec.ino, rec.mode) == (
+        5,
+        st.st_mtime_ns,
+        st.st_dev,
+        st.st_ino,
+        st.st_mode,
+    )
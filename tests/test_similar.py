@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from sorter.similar import BKTree, dhash, find_similar_images, hamming
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _gradient(path, size=(64, 48), flip=False, fmt=None):
+    img = Image.new("RGB", size)
+    w, h = size
+    for x in range(w):
+        for y in range(h):
+            v = int(255 * (w - x if flip else x) / w)
+            img.putpixel((x, y), (v, (v + y) % 256, 255 - v))
+    img.save(path, format=fmt)
+    return path
+
+
+def test_bktree_matches_linear_search():
+    rng = random.Random(0)
+    values = [rng.getrandbits(64) for _ in range(500)]
+    tree = BKTree(values)
+    assert len(tree) == len(set(values))
+    query = values[0] ^ 0b1011
+    expected = {v for v in values if hamming(v, query) <= 8}
+    assert set(tree.search(query, 8)) == expected
+
+
+def test_resized_and_reencoded_images_grouped(tmp_path):
+    original = _gradient(tmp_path / "a.png")
+    with Image.open(original) as img:
+        img.resize((128, 96)).save(tmp_path / "b.jpg", quality=70)
+    other = _gradient(tmp_path / "c.png", flip=True)
+    (tmp_path / "notes.txt").write_text("not an image")
+    broken = tmp_path / "broken.jpg"
+    broken.write_bytes(b"not really a jpeg")
+
+    assert hamming(dhash(original), dhash(tmp_path / "b.jpg")) <= 6
+    assert hamming(dhash(original), dhash(other)) > 6
+    files = sorted(tmp_path.iterdir())
+    groups = find_similar_images(files)
+    assert groups == [[original, tmp_path / "b.jpg"]]
+
+
+def test_image_hashes_cached(tmp_path, monkeypatch):
+    import os
+
+    from sorter import similar
+    from sorter.cache import ContentCache
+
+    a = _gradient(tmp_path / "a.png")
+    b = _gradient(tmp_path / "b.png")
+    for p in (a, b):
+        os.utime(p, ns=(1_000_000_000, 1_000_000_000))
+    cache = ContentCache(tmp_path / "cache.db")
+    assert find_similar_images([a, b], cache=cache) == [[a, b]]
+
+    monkeypatch.setattr(similar, "dhash", lambda p: 1 / 0)
+    assert find_similar_images([a, b], cache=cache, workers=2) == [[a, b]]
@@ -0,0 +1,197 @@
+import logging
+import sys
+import time
+
+import pytest
+
+from sorter.config import Settings
+from sorter.planner import Planner
+from sorter.watcher import InotifyBackend, PollingBackend, Watcher
+
+
+def _planner():
+    return Planner({"Docs": {"extensions": [".txt"]}}, Settings())
+
+
+def _wait(watcher, deadline=5.0):
+    end = time.monotonic() + deadline
+    moved = []
+    while not moved and time.monotonic() < end:
+        moved = watcher.step(0.05)
+    return moved
+
+
+def test_polling_watcher_moves_new_file(tmp_path):
+    src = tmp_path / "inbox"
+    dest = tmp_path / "sorted"
+    (src / "sub").mkdir(parents=True)
+    old = src / "old.txt"
+    old.write_text("x")
+
+    watcher = Watcher(
+        [src],
+        dest,
+        _planner(),
+        debounce=0,
+        log_dir=tmp_path,
+        backend=PollingBackend([src]),
+    )
+    new = src / "sub" / "new.txt"
+    time.sleep(0.01)
+    new.write_text("hello")
+
+    moved = _wait(watcher)
+    assert [s for s, _ in moved] == [new]
+    assert moved[0][1].parent == dest / "Docs"
+    assert moved[0][1].exists() and not new.exists()
+    # Files present before the watcher started are left alone.
+    assert old.exists()
+    assert list(tmp_path.glob("file-sort-log_*.jsonl"))
+
+
+def test_watcher_waits_for_file_to_settle(tmp_path):
+    src = tmp_path / "inbox"
+    src.mkdir()
+    now = [0.0]
+    watcher = Watcher(
+        [src],
+        tmp_path / "sorted",
+        _planner(),
+        debounce=2.0,
+        log_dir=tmp_path,
+        backend=PollingBackend([src]),
+        clock=lambda: now[0],
+    )
+    f = src / "download.txt"
+    f.write_text("part")
+    assert watcher.step(0) == []
+
+    now[0] = 1.0
+    assert watcher.step(0) == []
+    assert f.exists()
+
+    now[0] = 3.0
+    moved = watcher.step(0)
+    assert [s for s, _ in moved] == [f]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify only")
+def test_inotify_backend_reports_new_files(tmp_path):
+    src = tmp_path / "inbox"
+    src.mkdir()
+    backend = InotifyBackend([src])
+    try:
+        (src / "a.txt").write_text("x")
+        nested = src / "nested"
+        nested.mkdir()
+        (nested / "b.txt").write_text("y")
+        seen = set()
+        end = time.monotonic() + 5
+        while len(seen) < 2 and time.monotonic() < end:
+            seen.update(backend.poll(0.1))
+        assert seen == {src / "a.txt", nested / "b.txt"}
+    finally:
+        backend.close()
+
+
+class _ScriptedBackend:
+    """Report one batch of paths per poll, then stop the watcher."""
+
+    def __init__(self, batches):
+        self.batches = list(batches)
+
+    def poll(self, timeout):
+        if not self.batches:
+            raise KeyboardInterrupt
+        return self.batches.pop(0)
+
+    def close(self):
+        pass
+
+
+def test_watcher_keeps_running_after_failed_batch(tmp_path, monkeypatch, caplog):
+    from sorter import watcher as watcher_mod
+
+    src = tmp_path / "inbox"
+    src.mkdir()
+    a, b = src / "a.txt", src / "b.txt"
+    a.write_text("a")
+    b.write_text("b")
+    real_move = watcher_mod.move_with_log
+    calls = []
+
+    def fail_first(mapping, **kwargs):
+        calls.append(mapping)
+        if len(calls) == 1:
+            raise FileExistsError("taken")
+        return real_move(mapping, **kwargs)
+
+    monkeypatch.setattr(watcher_mod, "move_with_log", fail_first)
+    watcher = Watcher(
+        [src],
+        tmp_path / "sorted",
+        _planner(),
+        debounce=0,
+        log_dir=tmp_path,
+        backend=_ScriptedBackend([[a], [b]]),
+    )
+    with caplog.at_level(logging.ERROR, logger="sorter.watcher"):
+        with pytest.raises(KeyboardInterrupt):
+            watcher.run(timeout=0)
+    assert str(a) in caplog.text
+    # a is retried alongside b on the next flush.
+    assert [len(m) for m in calls] == [1, 2]
+    assert not a.exists() and not b.exists()
+    assert not list(tmp_path.glob("*.plan"))
+
+
+def test_watcher_retries_only_uncommitted_files(tmp_path, monkeypatch):
+    from sorter import watcher as watcher_mod
+
+    src = tmp_path / "inbox"
+    src.mkdir()
+    a, b = src / "a.txt", src / "b.txt"
+    a.write_text("a")
+    b.write_text("b")
+    real_move = watcher_mod.move_with_log
+    calls = []
+
+    def fail_after_first(mapping, **kwargs):
+        calls.append([rec.path for rec, _ in mapping])
+        if len(calls) == 1:
+            real_move(mapping[:1], **kwargs)
+            raise OSError("disk full")
+        return real_move(mapping, **kwargs)
+
+    monkeypatch.setattr(watcher_mod, "move_with_log", fail_after_first)
+    watcher = Watcher(
+        [src],
+        tmp_path / "sorted",
+        _planner(),
+        debounce=0,
+        log_dir=tmp_path,
+        backend=_ScriptedBackend([[a, b], []]),
+    )
+    assert [s for s, _ in watcher.step(0)] == [a]
+    assert [s for s, _ in watcher.step(0)] == [b]
+    assert calls == [[a, b], [b]]
+    assert not list(tmp_path.glob("*.plan"))
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify only")
+def test_inotify_overflow_rescans_only_recent_files(tmp_path):
+    from sorter.watcher import _EVENT, _IN_Q_OVERFLOW
+
+    src = tmp_path / "inbox"
+    (src / "sub").mkdir(parents=True)
+    old = src / "sub" / "old.txt"
+    old.write_text("x")
+    time.sleep(0.3)
+    backend = InotifyBackend([src])
+    try:
+        new = src / "sub" / "new.txt"
+        new.write_text("y")
+        changed = backend._parse(_EVENT.pack(-1, _IN_Q_OVERFLOW, 0, 0))
+        assert changed == [new]
+    finally:
+        backend.close()